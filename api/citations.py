@@ -0,0 +1,176 @@
+"""
+NDJSON streaming for bulk citation validation.
+NDJSON request bodies are spooled to a temporary file before the response
+starts, with line length and body size capped while they arrive. Results
+are then read back from the file and written in batches, so a large audit
+is validated in a single pass without holding the whole input or output
+in memory.
+"""
+
+import asyncio
+import json
+import tempfile
+from json.encoder import encode_basestring_ascii
+from typing import AsyncIterator, BinaryIO, Iterable, Iterator, List, Optional
+
+from url_whitelist_config import CitationValidator
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+RESULT_BATCH_LINES = 1000
+MAX_LINE_BYTES = 16 * 1024
+SPOOL_MEMORY_BYTES = 1024 * 1024
+READ_BLOCK_BYTES = 64 * 1024
+
+
+class CitationLimitError(ValueError):
+    """A citation request body exceeded the line length or body size limit."""
+
+
+def parse_citation_line(line: str) -> Optional[str]:
+    """
+    Read one URL from an NDJSON line.
+
+    A line may hold a JSON string, an object with a "url" key, or a bare
+    URL. Lines that are not valid JSON are taken as bare text, so they show
+    up in the results as not whitelisted rather than being dropped.
+    """
+    line = line.strip()
+    if not line:
+        return None
+    if line[0] in '"{':
+        try:
+            value = json.loads(line)
+        except ValueError:
+            return line
+        if isinstance(value, dict):
+            value = value.get("url")
+        return value if isinstance(value, str) else None
+    return line
+
+
+async def spool_body(
+    chunks: AsyncIterator[bytes],
+    max_line_bytes: int = MAX_LINE_BYTES,
+    max_body_bytes: Optional[int] = None,
+) -> BinaryIO:
+    """
+    Copy a request body to a temporary file, checking limits as it arrives.
+
+    The body is read completely before a response starts: once a streaming
+    response is running, the server's disconnect listener also receives
+    from the client, so body messages would be lost.
+
+    Returns:
+        The file, rewound; the caller closes it
+
+    Raises:
+        CitationLimitError: a line is longer than max_line_bytes, or the body
+            is larger than max_body_bytes
+    """
+    body = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+    body_bytes = 0
+    line_bytes = 0
+    try:
+        async for chunk in chunks:
+            body_bytes += len(chunk)
+            if max_body_bytes is not None and body_bytes > max_body_bytes:
+                raise CitationLimitError(f"Request body exceeds {max_body_bytes} bytes")
+            lines = chunk.split(b"\n")
+            if len(lines) > 1:
+                longest = max(line_bytes + len(lines[0]), max(map(len, lines[1:-1]), default=0))
+                if longest > max_line_bytes:
+                    raise CitationLimitError(f"Line exceeds {max_line_bytes} bytes")
+                line_bytes = 0
+            line_bytes += len(lines[-1])
+            if line_bytes > max_line_bytes:
+                raise CitationLimitError(f"Line exceeds {max_line_bytes} bytes")
+            # Past SPOOL_MEMORY_BYTES the file is on disk; keep writes off the event loop
+            await asyncio.get_running_loop().run_in_executor(None, body.write, chunk)
+    except BaseException:
+        body.close()
+        raise
+    body.seek(0)
+    return body
+
+
+def iter_url_batches(body: BinaryIO, block_bytes: int = READ_BLOCK_BYTES) -> Iterator[List[str]]:
+    """Read URLs from a spooled NDJSON body, one list per block; closes the file."""
+    pending = b""
+    try:
+        while True:
+            block = body.read(block_bytes)
+            if not block:
+                break
+            lines = (pending + block).split(b"\n")
+            # The unfinished last line is at most MAX_LINE_BYTES, checked by spool_body
+            pending = lines.pop()
+            yield _parse_lines(lines)
+        if pending:
+            yield _parse_lines([pending])
+    finally:
+        body.close()
+
+
+def _parse_lines(lines: List[bytes]) -> List[str]:
+    urls = []
+    for line in lines:
+        url = parse_citation_line(line.decode("utf-8", errors="replace"))
+        if url is not None:
+            urls.append(url)
+    return urls
+
+
+def encode_result(result: dict) -> str:
+    """Encode one validation result as an NDJSON line (same output as json.dumps)."""
+    return '{"url": %s, "is_valid": %s, "message": %s}\n' % (
+        encode_basestring_ascii(result["url"]),
+        "true" if result["is_valid"] else "false",
+        encode_basestring_ascii(result["message"]),
+    )
+
+
+def encode_summary(validator: CitationValidator) -> str:
+    """Encode the closing summary line."""
+    return json.dumps({"summary": validator.summary()}) + "\n"
+
+
+def validate_batch(validator: CitationValidator, urls: Iterable[str]) -> List[str]:
+    """Validate URLs and return the NDJSON lines for new results."""
+    check = validator.check
+    lines = []
+    for url in urls:
+        result = check(url)
+        if result is not None:
+            lines.append(encode_result(result))
+    return lines
+
+
+def iter_ndjson_results(validator: CitationValidator, urls: Iterable[str]) -> Iterator[str]:
+    """
+    Stream NDJSON results for a list of URLs.
+
+    Yields chunks of up to RESULT_BATCH_LINES results, then a summary line.
+    """
+    urls = list(urls)
+    for start in range(0, len(urls), RESULT_BATCH_LINES):
+        lines = validate_batch(validator, urls[start:start + RESULT_BATCH_LINES])
+        if lines:
+            yield "".join(lines)
+    yield encode_summary(validator)
+
+
+def iter_ndjson_batches(validator: CitationValidator, url_batches: Iterable[List[str]]) -> Iterator[str]:
+    """
+    Stream NDJSON results for batches of URLs read from a request body.
+
+    Yields chunks of at least RESULT_BATCH_LINES results, then a summary line.
+    """
+    buffered: List[str] = []
+    for urls in url_batches:
+        buffered.extend(validate_batch(validator, urls))
+        if len(buffered) >= RESULT_BATCH_LINES:
+            yield "".join(buffered)
+            buffered = []
+    buffered.append(encode_summary(validator))
+    yield "".join(buffered)
@@ -18,16 +18,98 @@ class Settings:
     ANTHROPIC_API_KEY: Optional[str] = os.getenv("ANTHROPIC_API_KEY")
     CLAUDE_MODEL: str = os.getenv("CLAUDE_MODEL", "claude-3-5-sonnet-20241022")
     
+    # LLM Client
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+    LLM_MAX_CONNECTIONS: int = int(os.getenv("LLM_MAX_CONNECTIONS", "64"))
+    LLM_TIMEOUT_SECONDS: float = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    
     # File Upload Limits
     MAX_FILE_SIZE_MB: int = int(os.getenv("MAX_FILE_SIZE_MB", "10"))
     MAX_FILE_SIZE_BYTES: int = MAX_FILE_SIZE_MB * 1024 * 1024
     MAX_TEXT_CHARS: int = int(os.getenv("MAX_TEXT_CHARS", "100000"))
     
+    # PDF Extraction
+    PDF_EXTRACT_WORKERS: int = int(os.getenv("PDF_EXTRACT_WORKERS", "0"))  # 0 = CPU count
+    PDF_EXTRACT_BATCH_PAGES: int = int(os.getenv("PDF_EXTRACT_BATCH_PAGES", "8"))
+    PDF_PARALLEL_MIN_PAGES: int = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16"))
+    
+    # Extraction Cache
+    EXTRACTION_CACHE_ENABLED: bool = os.getenv("EXTRACTION_CACHE_ENABLED", "true").lower() == "true"
+    EXTRACTION_CACHE_DIR: str = os.getenv("EXTRACTION_CACHE_DIR", "/tmp/pipewrench_extraction_cache")
+    EXTRACTION_CACHE_MAX_MB: int = int(os.getenv("EXTRACTION_CACHE_MAX_MB", "512"))
+    
+    # Drawing Processing (as-built OCR) Service
+    DRAWING_CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("DRAWING_CONNECT_TIMEOUT_SECONDS", "5"))
+    DRAWING_READ_TIMEOUT_SECONDS: float = float(os.getenv("DRAWING_READ_TIMEOUT_SECONDS", "120"))
+    DRAWING_MAX_RETRIES: int = int(os.getenv("DRAWING_MAX_RETRIES", "3"))
+    DRAWING_MAX_CONNECTIONS: int = int(os.getenv("DRAWING_MAX_CONNECTIONS", "10"))
+    DRAWING_BREAKER_THRESHOLD: int = int(os.getenv("DRAWING_BREAKER_THRESHOLD", "5"))
+    DRAWING_BREAKER_RESET_SECONDS: float = float(os.getenv("DRAWING_BREAKER_RESET_SECONDS", "30"))
+    
+    # Background Jobs (as-built OCR)
+    JOBS_DB_PATH: str = os.getenv("JOBS_DB_PATH", "/tmp/pipewrench_jobs.sqlite3")
+    JOBS_DIR: str = os.getenv("JOBS_DIR", "/tmp/pipewrench_jobs")
+    JOBS_WORKERS: int = int(os.getenv("JOBS_WORKERS", "2"))
+    JOBS_PAGE_CONCURRENCY: int = int(os.getenv("JOBS_PAGE_CONCURRENCY", "4"))
+    # Seconds a worker holds a claimed job without renewing it before
+    # another worker may take the job over.
+    JOBS_LEASE_SECONDS: float = float(os.getenv("JOBS_LEASE_SECONDS", "60"))
+    # Hosts job webhooks may call ("hooks.example.com" or ".example.com"); empty disables webhooks
+    JOBS_WEBHOOK_ALLOWED_HOSTS: list = [
+        host.strip().lower() for host in os.getenv("JOBS_WEBHOOK_ALLOWED_HOSTS", "").split(",") if host.strip()
+    ]
+    
+    # Organization whitelists: "org_id:key" pairs, comma separated. Only these
+    # organizations have custom whitelists, and the key (sent as X-Org-Key)
+    # authorizes changes to that organization's list.
+    ORG_API_KEYS: dict = {
+        org.strip(): key.strip()
+        for org, _, key in (pair.partition(":") for pair in os.getenv("ORG_API_KEYS", "").split(","))
+        if org.strip() and key.strip()
+    }
+    # Authorizes changes to the shared custom whitelist and to any organization's
+    WHITELIST_ADMIN_KEY: Optional[str] = os.getenv("WHITELIST_ADMIN_KEY") or None
+    
+    # Document Retrieval
+    RETRIEVAL_CHUNK_CHARS: int = int(os.getenv("RETRIEVAL_CHUNK_CHARS", "1500"))
+    RETRIEVAL_CHUNK_OVERLAP: int = int(os.getenv("RETRIEVAL_CHUNK_OVERLAP", "200"))
+    RETRIEVAL_TOP_K: int = int(os.getenv("RETRIEVAL_TOP_K", "6"))
+    
     # Session Configuration
     SESSION_TIMEOUT_HOURS: int = int(os.getenv("SESSION_TIMEOUT_HOURS", "24"))
-    SESSION_CLEANUP_INTERVAL_SECONDS: int = 3600  # Clean up every hour
+    SESSION_CLEANUP_INTERVAL_SECONDS: int = int(os.getenv("SESSION_CLEANUP_INTERVAL_SECONDS", "300"))
+    SESSION_BACKEND: str = os.getenv("SESSION_BACKEND", "memory")  # memory, sqlite or redis
+    SESSION_SQLITE_PATH: str = os.getenv("SESSION_SQLITE_PATH", "/tmp/pipewrench_sessions.sqlite3")
+    SESSION_REDIS_URL: str = os.getenv("SESSION_REDIS_URL", "redis://localhost:6379/0")
+    
+    # Reports
+    REPORT_CACHE_MAX_MB: int = int(os.getenv("REPORT_CACHE_MAX_MB", "64"))
+    REPORT_CACHE_MAX_ENTRY_MB: int = int(os.getenv("REPORT_CACHE_MAX_ENTRY_MB", "8"))
+    REPORT_WORKERS: int = int(os.getenv("REPORT_WORKERS", "2"))
+    
+    # Session Memory Budgets (memory backend only)
+    SESSION_MEMORY_BUDGET_MB: int = int(os.getenv("SESSION_MEMORY_BUDGET_MB", "8"))
+    SESSION_GLOBAL_MEMORY_BUDGET_MB: int = int(os.getenv("SESSION_GLOBAL_MEMORY_BUDGET_MB", "256"))
+    SESSION_SPILL_ITEM_KB: int = int(os.getenv("SESSION_SPILL_ITEM_KB", "256"))
+    SESSION_KEEP_RECENT_QUESTIONS: int = int(os.getenv("SESSION_KEEP_RECENT_QUESTIONS", "10"))
+    SESSION_SPILL_DIR: str = os.getenv("SESSION_SPILL_DIR", "/tmp/pipewrench_session_spill")
+    
+    # Response Cache
+    RESPONSE_CACHE_ENABLED: bool = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+    RESPONSE_CACHE_PATH: str = os.getenv("RESPONSE_CACHE_PATH", "/tmp/pipewrench_responses.sqlite3")
+    RESPONSE_CACHE_TTL_SECONDS: int = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "86400"))
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "5000"))
+    
+    # Semantic Cache (near-duplicate questions, local embeddings only)
+    SEMANTIC_CACHE_ENABLED: bool = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+    SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.85"))
+    SEMANTIC_CACHE_MODEL: Optional[str] = os.getenv("SEMANTIC_CACHE_MODEL")
+    SEMANTIC_CACHE_MAX_ENTRIES: int = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+    SEMANTIC_CACHE_MAX_SCOPES: int = int(os.getenv("SEMANTIC_CACHE_MAX_SCOPES", "64"))
     
     # Application Settings
+    APP_VERSION: str = "2.0.1"
     DEBUG: bool = os.getenv("DEBUG", "false").lower() == "true"
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "production")
     
@@ -39,6 +121,9 @@ class Settings:
     
     # Request Size Limits
     MAX_REQUEST_SIZE_MB: int = 50
+    # Bulk citation validation: JSON bodies are read whole, NDJSON is streamed
+    CITATIONS_MAX_JSON_MB: int = int(os.getenv("CITATIONS_MAX_JSON_MB", "10"))
+    CITATIONS_MAX_STREAM_MB: int = int(os.getenv("CITATIONS_MAX_STREAM_MB", "200"))
     
     @classmethod
     def validate(cls) -> None:
@@ -56,9 +141,12 @@ class Settings:
             "environment": cls.ENVIRONMENT,
             "debug": cls.DEBUG,
             "claude_model": cls.CLAUDE_MODEL,
+            "llm_max_concurrency": cls.LLM_MAX_CONCURRENCY,
+            "session_backend": cls.SESSION_BACKEND,
             "max_file_size_mb": cls.MAX_FILE_SIZE_MB,
             "max_text_chars": cls.MAX_TEXT_CHARS,
             "session_timeout_hours": cls.SESSION_TIMEOUT_HOURS,
+            "response_cache_enabled": cls.RESPONSE_CACHE_ENABLED,
             "api_key_configured": bool(cls.ANTHROPIC_API_KEY),
         }
 
@@ -0,0 +1,196 @@
+"""
+Async client for the as-built drawing processing (OCR) service.
+Uses a keep-alive connection pool with connect/read timeouts, retries
+transient failures with jittered exponential backoff, and trips a circuit
+breaker so requests fail fast while the service is down.
+"""
+
+import asyncio
+import random
+import time
+from typing import Callable, Optional
+
+import httpx
+
+from config import settings
+from utils import logger
+
+
+class DrawingServiceError(Exception):
+    """Raised when the drawing processing service cannot process a file."""
+
+
+class CircuitOpenError(DrawingServiceError):
+    """Raised when the circuit breaker is open and calls are short-circuited."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+    
+    After failure_threshold failures in a row the circuit opens and calls
+    are rejected until reset_timeout has passed; then a single trial call is
+    let through (half-open) and its outcome closes or re-opens the circuit.
+    Other calls are rejected while the trial is in flight.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at = 0.0
+        self._state = self.CLOSED
+        self._probing = False
+    
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+        return self._state
+    
+    def allow(self) -> bool:
+        """Return True if a call may be attempted; half-open, only the first caller may."""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+    
+    def release(self) -> None:
+        """End a trial call that finished without an outcome (e.g. cancelled)."""
+        self._probing = False
+    
+    def record_success(self) -> None:
+        self._probing = False
+        self._failures = 0
+        self._state = self.CLOSED
+    
+    def record_failure(self) -> None:
+        self._probing = False
+        self._failures += 1
+        if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            self._state = self.OPEN
+            self._opened_at = self._clock()
+            logger.warning("Drawing processing circuit opened")
+
+
+class DrawingProcessingClient:
+    """Pooled async client for the drawing processing /parse endpoint."""
+    
+    RETRY_STATUS_CODES = {429, 502, 503, 504}
+    
+    def __init__(
+        self,
+        url: str,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 120.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        max_connections: int = 10,
+        breaker: Optional[CircuitBreaker] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.url = url
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            transport=transport,
+        )
+    
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given retry attempt."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+    
+    async def parse(
+        self,
+        filename: str,
+        content: bytes,
+        content_type: Optional[str] = "application/pdf",
+        ocr_method: str = "textract",
+    ) -> str:
+        """
+        Send a drawing to the OCR service and return the extracted text.
+        
+        Raises:
+            CircuitOpenError: the service has been failing and is not being called
+            DrawingServiceError: the file could not be processed
+        """
+        trial = self.breaker.state == CircuitBreaker.HALF_OPEN
+        if not self.breaker.allow():
+            raise CircuitOpenError("Drawing processing service unavailable")
+        try:
+            return await self._parse(filename, content, content_type, ocr_method)
+        finally:
+            if trial:
+                # Frees the trial slot if the call ended without an outcome (cancelled)
+                self.breaker.release()
+    
+    async def _parse(self, filename: str, content: bytes, content_type: Optional[str], ocr_method: str) -> str:
+        last_error = ""
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                await asyncio.sleep(self._backoff(attempt - 1))
+            try:
+                response = await self._client.post(
+                    self.url,
+                    files={"file": (filename, content, content_type)},
+                    data={"ocr_method": ocr_method},
+                )
+            except httpx.TransportError as e:
+                last_error = f"{type(e).__name__}: {e}"
+                logger.warning(f"Drawing processing attempt {attempt + 1} failed: {last_error}")
+                continue
+            
+            if response.status_code == 200:
+                self.breaker.record_success()
+                return response.text
+            if response.status_code in self.RETRY_STATUS_CODES or response.status_code >= 500:
+                last_error = f"HTTP {response.status_code}"
+                logger.warning(f"Drawing processing attempt {attempt + 1} failed: {last_error}")
+                continue
+            
+            # The service is up but rejected this file; don't retry or trip the breaker
+            self.breaker.record_success()
+            raise DrawingServiceError(f"Drawing processing rejected file: HTTP {response.status_code}")
+        
+        self.breaker.record_failure()
+        raise DrawingServiceError(f"Drawing processing failed after {self.max_retries + 1} attempts: {last_error}")
+    
+    async def aclose(self) -> None:
+        """Close the connection pool."""
+        await self._client.aclose()
+
+
+def create_drawing_client(url: str) -> DrawingProcessingClient:
+    """Create a client configured from settings."""
+    return DrawingProcessingClient(
+        url,
+        connect_timeout=settings.DRAWING_CONNECT_TIMEOUT_SECONDS,
+        read_timeout=settings.DRAWING_READ_TIMEOUT_SECONDS,
+        max_retries=settings.DRAWING_MAX_RETRIES,
+        max_connections=settings.DRAWING_MAX_CONNECTIONS,
+        breaker=CircuitBreaker(
+            failure_threshold=settings.DRAWING_BREAKER_THRESHOLD,
+            reset_timeout=settings.DRAWING_BREAKER_RESET_SECONDS,
+        ),
+    )
@@ -0,0 +1,113 @@
+"""
+Content-addressed cache of document extraction results for PipeWrench AI.
+Extracted pages, page count and chunks are stored on local disk keyed by
+the SHA-256 of the uploaded bytes, the extractor version, the extraction
+mode and the chunking settings, so re-uploads of known files skip PDF
+parsing and OCR.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Optional
+
+from utils import logger
+
+
+class ExtractionCache:
+    """Gzipped-JSON files on disk with size-bounded LRU eviction."""
+    
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+    
+    @staticmethod
+    def make_key(
+        content_sha256: str,
+        extractor_version: str,
+        mode: str,
+        chunk_chars: int = 0,
+        chunk_overlap: int = 0,
+    ) -> str:
+        """
+        Build the cache key for file contents extracted in a given mode.
+
+        Cached entries include retrieval chunks, so the chunk size and overlap
+        are part of the key; changing either re-extracts instead of serving
+        chunks cut with the old settings.
+        """
+        raw = f"{content_sha256}:{extractor_version}:{mode}:{chunk_chars}:{chunk_overlap}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json.gz")
+    
+    def get(self, key: str) -> Optional[dict]:
+        """Return the cached extraction for key, or None."""
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                value = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Discarding unreadable extraction cache entry {key}: {e}")
+            self._remove(path)
+            return None
+        # Touch so eviction is least-recently-used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+    
+    def set(self, key: str, value: dict) -> None:
+        """Store an extraction result, then evict old entries over the size limit."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as f:
+                f.write(json.dumps(value).encode("utf-8"))
+            os.replace(tmp_path, self._path(key))
+        except Exception as e:
+            logger.error(f"Failed to write extraction cache entry {key}: {e}")
+            self._remove(tmp_path)
+            return
+        self._evict()
+    
+    def _evict(self) -> None:
+        with self._lock:
+            entries = []
+            total = 0
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.name.endswith(".json.gz"):
+                        continue
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+            if total <= self.max_bytes:
+                return
+            entries.sort()
+            removed = 0
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+                removed += 1
+            logger.info(f"Evicted {removed} extraction cache entries")
+    
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
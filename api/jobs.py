@@ -0,0 +1,405 @@
+"""
+Background job queue for long-running document processing (as-built OCR).
+Jobs are persisted in a local SQLite database and processed by a pool of
+asyncio workers, with per-page progress and optional webhook notification
+on completion. A claimed job is leased to one worker, which renews the
+lease while it runs; jobs whose lease lapses (their worker died) are
+claimed again by any worker sharing the database.
+"""
+
+import asyncio
+import ipaddress
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from utils import logger
+
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+DEFAULT_LEASE_SECONDS = 60.0
+
+
+class CallbackURLError(ValueError):
+    """A webhook callback URL that the server must not call."""
+
+
+def _host_allowed(host: str, allowed_hosts: Iterable[str]) -> bool:
+    """Match a host against entries like "hooks.example.com" or ".example.com"."""
+    for allowed in allowed_hosts:
+        if host == allowed or (allowed.startswith(".") and host.endswith(allowed)):
+            return True
+    return False
+
+
+def _check_addresses(host: str, addresses: Iterable[str]) -> None:
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%", 1)[0])
+        if not ip.is_global or ip.is_multicast:
+            raise CallbackURLError(f"Callback host {host} resolves to non-public address {ip}")
+
+
+def _parse_callback_url(url: str, allowed_hosts: Iterable[str]) -> tuple:
+    parts = urlsplit(url)
+    if parts.scheme != "https":
+        raise CallbackURLError("Callback URL must use https")
+    host = (parts.hostname or "").lower()
+    if not host or parts.username or parts.password:
+        raise CallbackURLError("Callback URL must name a host without credentials")
+    if not _host_allowed(host, allowed_hosts):
+        raise CallbackURLError(f"Callback host {host} is not allowed")
+    try:
+        port = parts.port or 443
+    except ValueError:
+        raise CallbackURLError("Callback URL has an invalid port")
+    return host, port
+
+
+def validate_callback_url(url: str, allowed_hosts: Iterable[str]) -> None:
+    """
+    Check a webhook URL before accepting a job.
+
+    The URL must be https, its host must be on the allowlist, and every
+    address it resolves to must be public (no loopback, private,
+    link-local or metadata addresses). Raises CallbackURLError otherwise.
+    """
+    host, port = _parse_callback_url(url, allowed_hosts)
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except OSError:
+        raise CallbackURLError(f"Callback host {host} does not resolve")
+    _check_addresses(host, (info[4][0] for info in infos))
+
+
+async def check_callback_url(url: str, allowed_hosts: Iterable[str]) -> None:
+    """validate_callback_url without blocking the event loop (re-checked before sending)."""
+    host, port = _parse_callback_url(url, allowed_hosts)
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except OSError:
+        raise CallbackURLError(f"Callback host {host} does not resolve")
+    _check_addresses(host, (info[4][0] for info in infos))
+
+
+class JobQueue:
+    """SQLite-backed job queue."""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " kind TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " callback_url TEXT,"
+            " pages_total INTEGER NOT NULL DEFAULT 0,"
+            " pages TEXT NOT NULL DEFAULT '[]',"
+            " result TEXT,"
+            " error TEXT,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " owner TEXT,"
+            " lease_expires REAL)"
+        )
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("owner", "TEXT"), ("lease_expires", "REAL")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+    
+    def enqueue(self, kind: str, payload: dict, callback_url: Optional[str] = None) -> str:
+        """Add a job and return its ID."""
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, status, payload, callback_url, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, json.dumps(payload), callback_url, now, now),
+            )
+        return job_id
+    
+    def claim(self, owner: str = "", lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Optional[dict]:
+        """
+        Atomically take the oldest claimable job and lease it to owner.
+
+        Claimable jobs are queued ones and running ones whose lease expired
+        because their worker stopped renewing it.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE status = ?"
+                    " OR (status = ? AND (lease_expires IS NULL OR lease_expires < ?))"
+                    " ORDER BY created_at LIMIT 1",
+                    (QUEUED, RUNNING, now),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, owner = ?, lease_expires = ?, updated_at = ? WHERE id = ?",
+                        (RUNNING, owner, now + lease_seconds, now, row["id"]),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(row["id"]) if row is not None else None
+    
+    def set_pages_total(self, job_id: str, pages_total: int) -> None:
+        """Record the number of pages and mark each one pending."""
+        self._update(job_id, pages_total=pages_total, pages=json.dumps(["pending"] * pages_total))
+    
+    def set_page_status(self, job_id: str, page_index: int, status: str) -> None:
+        """Record the status of one page (0-based index)."""
+        with self._lock:
+            row = self._conn.execute("SELECT pages FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            pages = json.loads(row["pages"])
+            if 0 <= page_index < len(pages):
+                pages[page_index] = status
+            self._conn.execute(
+                "UPDATE jobs SET pages = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(pages), time.time(), job_id),
+            )
+    
+    def renew(self, job_id: str, owner: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        """Extend a running job's lease; False if owner no longer holds it."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND owner = ? AND status = ?",
+                (now + lease_seconds, now, job_id, owner, RUNNING),
+            )
+        return cursor.rowcount == 1
+    
+    def release(self, job_id: str, owner: str) -> bool:
+        """Put a job owner is giving up (e.g. at shutdown) back on the queue."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, owner = NULL, lease_expires = NULL, updated_at = ?"
+                " WHERE id = ? AND owner = ? AND status = ?",
+                (QUEUED, time.time(), job_id, owner, RUNNING),
+            )
+        return cursor.rowcount == 1
+    
+    def complete(self, job_id: str, result: dict, owner: Optional[str] = None) -> bool:
+        """Mark a job completed; with owner, only if that worker still holds it."""
+        return self._finish(job_id, owner, status=COMPLETED, result=json.dumps(result))
+    
+    def fail(self, job_id: str, error: str, owner: Optional[str] = None) -> bool:
+        """Mark a job failed; with owner, only if that worker still holds it."""
+        return self._finish(job_id, owner, status=FAILED, error=error)
+    
+    def _finish(self, job_id: str, owner: Optional[str], **fields) -> bool:
+        if owner is None:
+            self._update(job_id, lease_expires=None, **fields)
+            return True
+        fields.update(lease_expires=None, updated_at=time.time())
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ? AND owner = ? AND status = ?",
+                (*fields.values(), job_id, owner, RUNNING),
+            )
+        return cursor.rowcount == 1
+    
+    def get(self, job_id: str) -> Optional[dict]:
+        """Return a job as a dict, or None if unknown."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        pages = json.loads(row["pages"])
+        return {
+            "job_id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "payload": json.loads(row["payload"]),
+            "callback_url": row["callback_url"],
+            "pages_total": row["pages_total"],
+            "pages_done": sum(1 for status in pages if status in (COMPLETED, FAILED)),
+            "pages": pages,
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "owner": row["owner"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+    
+    def _update(self, job_id: str, **fields) -> None:
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id)
+            )
+    
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+async def gather_or_cancel(aws: Iterable[Awaitable]) -> list:
+    """
+    Run awaitables concurrently and return their results in order.
+
+    Unlike asyncio.gather, the first failure (or cancelling the caller)
+    cancels the awaitables still running instead of leaving them to finish.
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    if not tasks:
+        return []
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    finally:
+        pending = [task for task in tasks if not task.done()]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    for task in tasks:
+        if not task.cancelled() and task.exception() is not None:
+            raise task.exception()
+    return [task.result() for task in tasks]
+
+
+JobHandler = Callable[[dict, JobQueue], Awaitable[dict]]
+JobCleanup = Callable[[dict], None]
+
+
+class JobWorkerPool:
+    """
+    Pool of asyncio workers that process jobs from a JobQueue.
+
+    Several pools (in one or many processes) can share a queue: each has
+    its own owner ID and renews the lease on the jobs it runs every
+    lease_seconds / 3.
+    """
+    
+    def __init__(
+        self,
+        queue: JobQueue,
+        handler: JobHandler,
+        concurrency: int = 2,
+        poll_interval: float = 1.0,
+        webhook_hosts: Iterable[str] = (),
+        cleanup: Optional[JobCleanup] = None,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    ):
+        self.queue = queue
+        self.handler = handler
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.webhook_hosts = tuple(webhook_hosts)
+        # Called once a job is completed or failed, e.g. to delete its input
+        # files; a cancelled job keeps them so it can be retried
+        self.cleanup = cleanup
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+    
+    def start(self) -> None:
+        """Start the workers on the running event loop."""
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+    
+    def notify(self) -> None:
+        """Wake idle workers after a job is enqueued."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+    
+    async def stop(self) -> None:
+        """Cancel the workers and wait for them to exit."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+    
+    async def _worker(self) -> None:
+        while True:
+            job = self.queue.claim(self.owner, self.lease_seconds)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.run_job(job)
+    
+    async def _heartbeat(self, job_id: str, work: asyncio.Future, lease_lost: List[bool]) -> None:
+        """Renew a job's lease while it runs; cancel it if the lease is lost."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not self.queue.renew(job_id, self.owner, self.lease_seconds):
+                lease_lost.append(True)
+                work.cancel()
+                return
+    
+    async def run_job(self, job: dict) -> None:
+        """Run one claimed job, record its outcome and send its webhook."""
+        job_id = job["job_id"]
+        work = asyncio.ensure_future(self.handler(job, self.queue))
+        lease_lost: List[bool] = []
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, work, lease_lost))
+        try:
+            result = await work
+        except asyncio.CancelledError:
+            if not lease_lost:
+                # The pool is stopping: hand the job back for the next worker
+                self.queue.release(job_id, self.owner)
+                raise
+            logger.warning(f"Job {job_id} lost its lease; abandoned to its new owner")
+            return
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            recorded = self.queue.fail(job_id, str(e), owner=self.owner)
+        else:
+            recorded = self.queue.complete(job_id, result, owner=self.owner)
+            if recorded:
+                logger.info(f"Job {job_id} completed")
+        finally:
+            heartbeat.cancel()
+        if not recorded:
+            logger.warning(f"Job {job_id} finished after losing its lease; result discarded")
+            return
+        if self.cleanup is not None:
+            try:
+                self.cleanup(job)
+            except Exception as e:
+                logger.warning(f"Cleanup for job {job_id} failed: {e}")
+        if job.get("callback_url"):
+            await send_webhook(job["callback_url"], self.queue.get(job_id), self.webhook_hosts)
+
+
+async def send_webhook(url: str, job: dict, allowed_hosts: Iterable[str]) -> None:
+    """POST a job's final status to its callback URL, logging failures."""
+    body = {key: job[key] for key in ("job_id", "status", "pages_total", "pages_done", "result", "error")}
+    try:
+        # Re-check: the allowlist or DNS may have changed since the job was queued
+        await check_callback_url(url, allowed_hosts)
+        async with httpx.AsyncClient(timeout=10.0, follow_redirects=False) as client:
+            response = await client.post(url, json=body)
+            response.raise_for_status()
+    except Exception as e:
+        logger.warning(f"Webhook for job {job['job_id']} to {url} failed: {e}")
@@ -0,0 +1,154 @@
+"""
+LLM client for PipeWrench AI.
+Provides a shared, connection-pooled AsyncAnthropic client, a per-process
+limit on the number of concurrent model calls, and request building with
+prompt caching for the system prompt.
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
+
+from config import settings
+from utils import logger
+
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+_client: Optional[AsyncAnthropic] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def get_async_client(api_key: Optional[str] = None) -> AsyncAnthropic:
+    """
+    Get the shared AsyncAnthropic client.
+    
+    A user-supplied API key returns a copy of the client with that key that
+    still shares the same HTTP connection pool.
+    """
+    global _client
+    if _client is None:
+        http_client = DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_CONNECTIONS,
+            ),
+            timeout=httpx.Timeout(settings.LLM_TIMEOUT_SECONDS, connect=10.0),
+        )
+        _client = AsyncAnthropic(
+            api_key=settings.ANTHROPIC_API_KEY,
+            http_client=http_client,
+            max_retries=settings.LLM_MAX_RETRIES,
+        )
+    if api_key:
+        return _client.with_options(api_key=api_key)
+    return _client
+
+
+def get_llm_semaphore() -> asyncio.Semaphore:
+    """Get the semaphore bounding concurrent LLM calls in this process."""
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+    return _semaphore
+
+
+def build_message_request(
+    query: str,
+    context: str,
+    system_prompt: str,
+    model: Optional[str] = None,
+    max_tokens: int = 1024,
+) -> Dict[str, Any]:
+    """
+    Build messages.create arguments with a prompt-cache breakpoint.
+    
+    Only the system prompt, which is stable per department/role/whitelist,
+    is marked cacheable. Document context is the top-k retrieved chunks and
+    changes with every query, so caching it would only pay cache-write
+    costs; it is sent uncached ahead of the question. The model defaults to
+    settings.CLAUDE_MODEL.
+    """
+    user_content = []
+    if context:
+        user_content.append({"type": "text", "text": f"Document context: {context}"})
+    user_content.append({"type": "text", "text": f"User query: {query}"})
+    
+    return {
+        "model": model or settings.CLAUDE_MODEL,
+        "max_tokens": max_tokens,
+        "system": [{"type": "text", "text": system_prompt, "cache_control": CACHE_CONTROL}],
+        "messages": [
+            {"role": "assistant", "content": "Use user query and document context to generate response."},
+            {"role": "user", "content": user_content},
+        ],
+    }
+
+
+def summarize_usage(usage: Any) -> Dict[str, Any]:
+    """Summarize token usage, including prompt-cache reads and writes."""
+    cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+    cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+    if cache_read:
+        cache_status = "hit"
+    elif cache_write:
+        cache_status = "write"
+    else:
+        cache_status = "miss"
+    return {
+        "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+        "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+        "cache_read_input_tokens": cache_read,
+        "cache_creation_input_tokens": cache_write,
+        "cache_status": cache_status,
+    }
+
+
+def log_usage(usage: Dict[str, Any]) -> None:
+    """Log prompt-cache status and token counts for one LLM call."""
+    logger.info(
+        f"LLM usage - cache: {usage['cache_status']}, "
+        f"input: {usage['input_tokens']}, "
+        f"cache_read: {usage['cache_read_input_tokens']}, "
+        f"cache_write: {usage['cache_creation_input_tokens']}, "
+        f"output: {usage['output_tokens']}"
+    )
+
+
+async def create_message(api_key: Optional[str] = None, **kwargs: Any):
+    """Call messages.create on the shared client, honoring the concurrency limit."""
+    client = get_async_client(api_key)
+    async with get_llm_semaphore():
+        return await client.messages.create(**kwargs)
+
+
+async def stream_message(
+    api_key: Optional[str] = None,
+    usage_out: Optional[Dict[str, Any]] = None,
+    **kwargs: Any,
+) -> AsyncIterator[str]:
+    """
+    Stream text deltas from messages.stream, honoring the concurrency limit.
+    
+    If usage_out is given it is filled with the summarized token usage once
+    the stream completes.
+    """
+    client = get_async_client(api_key)
+    async with get_llm_semaphore():
+        async with client.messages.stream(**kwargs) as stream:
+            async for text in stream.text_stream:
+                yield text
+            if usage_out is not None:
+                final = await stream.get_final_message()
+                usage_out.update(summarize_usage(final.usage))
+                log_usage(usage_out)
+
+
+async def close_async_client() -> None:
+    """Close the shared client and its connection pool."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
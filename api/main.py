@@ -4,83 +4,146 @@ FastAPI application with improved error handling, logging, and production readin
 """
 # Force redeploy timestamp: 2025-10-31 13:15:00 UTC - URL whitelist fix
 
-from fastapi import FastAPI, Form, UploadFile, File, HTTPException, Request
-from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi.middleware.cors import CORSMiddleware
-from anthropic import Anthropic, APIError
+from fastapi import FastAPI, Form, UploadFile, File, Header, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+from anthropic import APIError
+import asyncio
+import hashlib
+import hmac
+import itertools
 import os
+import shutil
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Optional
+from functools import lru_cache
+from typing import AsyncIterator, List, Optional, Tuple
 import io
-import re
-from urllib.parse import urlparse
-import requests
+import json
+import uuid
 import dotenv
-import os
 import anthropic
+import docx
+import PyPDF2
+from fastapi.concurrency import run_in_threadpool
+
+from config import settings
+from department_prompts_config import get_department_list, get_department_prompt
+from drawing_client import create_drawing_client
+from llm import (
+    build_message_request,
+    close_async_client,
+    create_message,
+    log_usage,
+    stream_message,
+    summarize_usage,
+)
+from models import (
+    DocumentUploadResponse,
+    ErrorResponse,
+    HealthCheckResponse,
+    SessionCreateResponse,
+    SessionStatusResponse,
+    SystemInfoResponse,
+)
+from response_cache import ResponseCache, document_fingerprint, make_cache_key
+from citations import (
+    NDJSON_MEDIA_TYPE,
+    CitationLimitError,
+    iter_ndjson_batches,
+    iter_ndjson_results,
+    iter_url_batches,
+    spool_body,
+)
+from extraction_cache import ExtractionCache
+from jobs import CallbackURLError, JobQueue, JobWorkerPool, gather_or_cancel, validate_callback_url
+from job_roles_config import get_all_roles, get_role_info
+from pdf_extraction import (
+    EXTRACTOR_VERSION,
+    PDFExtractionError,
+    UploadTooLargeError,
+    aiter_pdf_pages,
+    count_pages,
+    remove_spooled,
+    shutdown_extraction_pool,
+    split_pdf_pages,
+    spool_to_disk,
+)
+from retrieval import build_retrieval_context, chunk_page, chunk_pages
+from reports import (
+    REPORT_FORMATS,
+    CachedReport,
+    ReportCache,
+    choose_encoding,
+    etag_matches,
+    get_report_pool,
+    iter_compressed,
+    render_export,
+    render_report,
+    report_etag,
+    report_payload,
+    shutdown_report_pool,
+)
+from semantic_cache import SemanticCache, get_embedder
+from url_scanner import StreamingURLScanner, scan_text
+from session_records import DocumentRecord
+from utils import (
+    SessionManager,
+    format_file_size,
+    get_file_extension,
+    logger,
+    validate_file_extension,
+)
+from url_whitelist_config import (
+    ORG_ID_PATTERN,
+    CitationValidator,
+    UnknownOrganizationError,
+    WhitelistSnapshot,
+    add_custom_url,
+    get_custom_urls,
+    get_whitelist_index,
+    get_whitelist_snapshot,
+    remove_custom_url,
+)
 
 dotenv.load_dotenv()
 
-app = FastAPI()
 
-# ============================================================================
-# CONFIGURATION: ENVIRONMENT VARIABLES AND CLIENTS
-# ============================================================================
-DRAWING_PROCESSING_API_URL = os.getenv("DRAWING_PROCESSING_API_URL", "http://localhost:8001/parse")
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Run background OCR job workers and session eviction; release pooled resources on shutdown."""
+    job_workers.start()
+    session_cleanup_task = asyncio.create_task(session_manager.run_cleanup_loop())
+    try:
+        yield
+    finally:
+        session_cleanup_task.cancel()
+        try:
+            await session_cleanup_task
+        except asyncio.CancelledError:
+            pass
+        await job_workers.stop()
+        await close_async_client()
+        await drawing_client.aclose()
+        shutdown_extraction_pool()
+        shutdown_report_pool()
+
 
-anthropic_client = anthropic.Anthropic()
+app = FastAPI(lifespan=lifespan)
 
 # ============================================================================
-# CONFIGURATION: JOB ROLES
+# CONFIGURATION: ENVIRONMENT VARIABLES AND CLIENTS
 # ============================================================================
+DRAWING_PROCESSING_API_URL = os.getenv("DRAWING_PROCESSING_API_URL", "http://localhost:8001/parse")
 
-JOB_ROLES = {
-    "general": {
-        "name": "General DPW Staff",
-        "context": "You are assisting general Department of Public Works staff with municipal infrastructure questions."
-    },
-    "director": {
-        "name": "DPW Director",
-        "context": "You are assisting a DPW Director with strategic planning, policy decisions, and departmental oversight."
-    },
-    "engineer": {
-        "name": "Civil Engineer",
-        "context": "You are assisting a licensed civil engineer with technical engineering standards, design specifications, and compliance requirements."
-    },
-    "project_manager": {
-        "name": "Project Manager",
-        "context": "You are assisting a project manager with construction management, scheduling, budgeting, and contractor coordination."
-    },
-    "inspector": {
-        "name": "Construction Inspector",
-        "context": "You are assisting a construction inspector with field inspection procedures, quality control, and compliance verification."
-    },
-    "maintenance": {
-        "name": "Maintenance Supervisor",
-        "context": "You are assisting a maintenance supervisor with asset management, preventive maintenance, and repair operations."
-    },
-    "environmental": {
-        "name": "Environmental Compliance Officer",
-        "context": "You are assisting an environmental compliance officer with EPA regulations, stormwater management, and environmental permits."
-    },
-    "safety": {
-        "name": "Safety Officer",
-        "context": "You are assisting a safety officer with OSHA compliance, workplace safety, and accident prevention."
-    }
-}
-
-def get_role_list():
-    """Return list of available roles"""
-    return [{"id": role_id, "name": role_data["name"]} for role_id, role_data in JOB_ROLES.items()]
-
-def get_role_context(role_id: str) -> str:
-    """Get context for a specific role"""
-    return JOB_ROLES.get(role_id, JOB_ROLES["general"])["context"]
+drawing_client = create_drawing_client(DRAWING_PROCESSING_API_URL)
 
+# LLM calls go through the shared, pooled async client in llm.py
 
 # Helper Functions
-def build_system_prompt(department_key: str, role_key: Optional[str]) -> str:
-    """Build system prompt with department and role context."""
+@lru_cache(maxsize=256)
+def _build_system_prompt_cached(department_key: str, role_key: Optional[str], whitelist: WhitelistSnapshot) -> str:
+    """Build the system prompt for one (department, role, whitelist snapshot)."""
     base = get_department_prompt(department_key)
     role_txt = ""
     if role_key:
@@ -90,109 +153,119 @@ def build_system_prompt(department_key: str, role_key: Optional[str]) -> str:
             role_txt = f"\n\nROLE CONTEXT:\n- Title: {role.get('title', role_key)}\n- Focus Areas:\n" + \
                       "\n".join(f"  - {a}" for a in areas)
     
+    domains = whitelist.domains
     whitelist_notice = f"\n\nURL RESTRICTIONS:\n" \
                       f"- Only cite and reference sources from approved whitelist\n" \
                       f"- Include the specific URL for each citation\n" \
                       f"- If info is not in whitelist, clearly state that it cannot be verified from approved sources\n" \
                       f"- All child pages of whitelisted URLs are permitted\n" \
-                      f"- Total Whitelisted URLs: {get_total_whitelisted_urls()}\n" \
-                      f"- Approved Domains: {', '.join(sorted(list(get_whitelisted_domains()))[:25])}" + \
-                      ("..." if len(get_whitelisted_domains()) > 25 else "")
+                      f"- Total Whitelisted URLs: {whitelist.count}\n" \
+                      f"- Approved Domains: {', '.join(domains[:25])}" + \
+                      ("..." if len(domains) > 25 else "")
     
     return base + role_txt + whitelist_notice
 
 
-def enforce_whitelist_on_text(text: str) -> str:
-    """Enforce URL whitelist compliance on text."""
-    bad_urls = []
-    for url in set(URL_REGEX.findall(text or "")):
-        url_clean = url.rstrip('.,);]')
-        if not is_url_whitelisted(url_clean):
-            bad_urls.append(url_clean)
-    
-    if not bad_urls:
-        return text
+def build_system_prompt(department_key: str, role_key: Optional[str], org_id: Optional[str] = None) -> str:
+    """
+    Build system prompt with department and role context.
     
-    note = "\n\n[COMPLIANCE NOTICE]\n" \
-           "The following URLs are not in the approved whitelist and must not be cited:\n" + \
-           "\n".join(f"- {u}" for u in sorted(bad_urls)) + \
-           "\n\nPlease revise citations to use only approved sources."
-    
-    return text + note
-
-
-Always reference EPA regulations (40 CFR), state environmental rules, and environmental best practices."""
-    },
-    "safety": {
-        "name": "Safety & Training",
-        "prompt": """You are a specialized AI assistant for Safety & Training.
-
-**Your Expertise:**
-- OSHA regulations (29 CFR 1926, 1910)
-- Workplace safety programs
-- Confined space entry
-- Trenching and excavation safety
-- Personal protective equipment
-- Safety training requirements
-- Accident investigation
-
-**Key Responsibilities:**
-- Guide OSHA compliance
-- Recommend safety procedures
-- Assist with training program development
-- Explain PPE requirements
-- Support incident prevention
-
-Always reference OSHA standards (29 CFR), ANSI standards, and safety best practices."""
-    },
-    "administration": {
-        "name": "Administration & Planning",
-        "prompt": """You are a specialized AI assistant for DPW Administration & Planning.
-
-**Your Expertise:**
-- Capital improvement planning
-- Budget development
-- Asset management
-- Performance metrics
-- Grant administration
-- Public communication
-- Strategic planning
-
-**Key Responsibilities:**
-- Guide planning processes
-- Assist with budget preparation
-- Explain grant requirements
-- Support asset management programs
-- Address administrative procedures
-
-Always reference applicable federal grant requirements, municipal finance best practices, and planning standards."""
-    }
-}
+    Prompts are memoized per (department, role, whitelist snapshot), so adding
+    or removing a custom URL automatically invalidates cached prompts.
+    """
+    return _build_system_prompt_cached(department_key, role_key or None, get_whitelist_snapshot(org_id))
+
+
+def compliance_notice(text: str, org_id: Optional[str] = None) -> str:
+    """Return the compliance notice for non-whitelisted URLs in text, or ""."""
+    return scan_text(text, get_whitelist_index(org_id) if org_id else None).notice()
 
-def get_department_prompt(department_id: str) -> str:
-    """Get specialized prompt for department"""
-    return DEPARTMENT_PROMPTS.get(department_id, {}).get("prompt", "")
 
-def get_all_departments():
-    """Return list of all departments"""
-    return [{"id": dept_id, "name": dept_data["name"]} for dept_id, dept_data in DEPARTMENT_PROMPTS.items()]
+def enforce_whitelist_on_text(text: str, org_id: Optional[str] = None) -> str:
+    """Enforce URL whitelist compliance on text."""
+    return text + compliance_notice(text, org_id)
+
+
+def resolve_whitelist(org_id: Optional[str]) -> WhitelistSnapshot:
+    """Get an organization's whitelist snapshot (404 if unregistered, 400 if invalid)."""
+    try:
+        return get_whitelist_snapshot(org_id)
+    except UnknownOrganizationError:
+        raise HTTPException(status_code=404, detail="Unknown organization")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid organization ID")
+
+
+def require_whitelist_key(org_id: Optional[str], key: Optional[str]) -> None:
+    """
+    Authorize a custom whitelist change.
+    
+    An organization's list needs its ORG_API_KEYS key; the shared list (no
+    org_id) needs WHITELIST_ADMIN_KEY, which also works for any organization.
+    """
+    if not key:
+        raise HTTPException(status_code=401, detail="X-Org-Key header required")
+    candidates = [settings.WHITELIST_ADMIN_KEY]
+    if org_id is not None:
+        candidates.append(settings.ORG_API_KEYS.get(org_id))
+    if not any(
+        expected and hmac.compare_digest(key.encode("utf-8"), expected.encode("utf-8"))
+        for expected in candidates
+    ):
+        raise HTTPException(status_code=403, detail="Key does not authorize changes to this whitelist")
+
 
 # ============================================================================
 # SESSION STORAGE
 # ============================================================================
 
-# In-memory session storage (use Redis/database in production)
-sessions: Dict[str, Dict] = {}
+# Backend is chosen by SESSION_BACKEND (memory, sqlite or redis)
+session_manager = SessionManager()
+
+# ============================================================================
+# RESPONSE CACHE
+# ============================================================================
+
+response_cache: Optional[ResponseCache] = (
+    ResponseCache(
+        settings.RESPONSE_CACHE_PATH,
+        settings.RESPONSE_CACHE_TTL_SECONDS,
+        settings.RESPONSE_CACHE_MAX_ENTRIES,
+    )
+    if settings.RESPONSE_CACHE_ENABLED else None
+)
+
+extraction_cache: Optional[ExtractionCache] = (
+    ExtractionCache(settings.EXTRACTION_CACHE_DIR, settings.EXTRACTION_CACHE_MAX_MB * 1024 * 1024)
+    if settings.EXTRACTION_CACHE_ENABLED else None
+)
+
+semantic_cache: Optional[SemanticCache] = (
+    SemanticCache(
+        get_embedder(settings.SEMANTIC_CACHE_MODEL),
+        threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+        max_entries_per_scope=settings.SEMANTIC_CACHE_MAX_ENTRIES,
+        max_scopes=settings.SEMANTIC_CACHE_MAX_SCOPES,
+    )
+    if settings.SEMANTIC_CACHE_ENABLED else None
+)
+
+report_cache = ReportCache(settings.REPORT_CACHE_MAX_MB * 1024 * 1024)
 
 # ============================================================================
 # PYDANTIC MODELS
 # ============================================================================
 
+MAX_QUESTION_CHARS = 2000
+
 class QueryRequest(BaseModel):
     session_id: Optional[str] = None
-    query: str
+    query: str = Field(..., min_length=1, max_length=MAX_QUESTION_CHARS)
     role: Optional[str] = "general"
     department: Optional[str] = None
+    api_key: Optional[str] = None
+    no_cache: bool = False
+    org_id: Optional[str] = Field(None, pattern=ORG_ID_PATTERN.pattern)
 
 class UploadResponse(BaseModel):
     session_id: str
@@ -200,10 +273,41 @@ class UploadResponse(BaseModel):
     pages: int
     message: str
     is_asbuilt: bool = False
+    job_id: Optional[str] = None
 
 class CustomURLRequest(BaseModel):
-    session_id: str
+    session_id: Optional[str] = None
     url: str
+    org_id: Optional[str] = Field(None, pattern=ORG_ID_PATTERN.pattern)
+    include_children: bool = True
+    description: str = ""
+
+
+INDEX_HTML_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "index.html")
+
+
+@app.get("/", response_class=HTMLResponse)
+async def home():
+    """Serve the web UI."""
+    try:
+        with open(INDEX_HTML_PATH, encoding="utf-8") as f:
+            return HTMLResponse(f.read())
+    except OSError as e:
+        logger.error(f"Failed to load index.html: {e}")
+        return HTMLResponse("<h1>PipeWrench AI is temporarily unavailable</h1>", status_code=503)
+
+
+@app.get("/health", response_model=HealthCheckResponse)
+async def health_check():
+    """Health check for monitoring."""
+    return HealthCheckResponse(
+        status="healthy",
+        timestamp=datetime.now().isoformat(),
+        version=settings.APP_VERSION,
+        environment=settings.ENVIRONMENT,
+        api_key_configured=bool(settings.ANTHROPIC_API_KEY),
+        active_sessions=session_manager.get_session_count(),
+    )
 
 
 @app.get("/api/departments")
@@ -230,71 +334,230 @@ async def list_roles():
         raise HTTPException(status_code=500, detail="Failed to retrieve roles")
 
 
+def conditional_json_response(request: Request, body: bytes, etag: str) -> Response:
+    """Serve a prebuilt JSON body with an ETag, or 304 if the client has it."""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@lru_cache(maxsize=64)
+def _system_info_body(whitelist: WhitelistSnapshot) -> Tuple[bytes, str]:
+    """Render /api/system once per whitelist snapshot, returning (body, etag)."""
+    body = SystemInfoResponse(
+        total_whitelisted_urls=whitelist.count,
+        whitelisted_domains=list(whitelist.domains),
+        roles=get_all_roles(),
+        departments=[d["value"] for d in get_department_list()],
+        config=settings.get_info()
+    ).model_dump_json().encode("utf-8")
+    # Config and roles are fixed per process, so hash them in with the whitelist
+    return body, f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+
+
+@lru_cache(maxsize=64)
+def _whitelist_overview_body(whitelist: WhitelistSnapshot) -> bytes:
+    """Render /api/whitelist once per whitelist snapshot."""
+    return json.dumps({
+        "count": whitelist.count,
+        "domains": whitelist.domains,
+        "sample": [entry["url"] for entry in whitelist.entries[:50]],
+    }).encode("utf-8")
+
+
 @app.get("/api/system", response_model=SystemInfoResponse)
-async def system_info():
+async def system_info(request: Request, org_id: Optional[str] = None):
     """Get system configuration information."""
+    whitelist = resolve_whitelist(org_id)
     try:
-        return SystemInfoResponse(
-            total_whitelisted_urls=get_total_whitelisted_urls(),
-            whitelisted_domains=sorted(list(get_whitelisted_domains())),
-            roles=get_all_roles(),
-            departments=[d["value"] for d in get_department_list()],
-            config=settings.get_info()
-        )
+        body, etag = _system_info_body(whitelist)
+        return conditional_json_response(request, body, etag)
     except Exception as e:
         logger.error(f"Failed to get system info: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve system information")
 
 
 @app.get("/api/whitelist")
-async def whitelist_overview():
+async def whitelist_overview(request: Request, org_id: Optional[str] = None):
     """Get overview of whitelisted URLs."""
+    whitelist = resolve_whitelist(org_id)
     try:
-        all_urls = WHITELISTED_URLS
-        sample_urls = [entry["url"] for entry in all_urls[:50]]
-        
-        return {
-            "count": get_total_whitelisted_urls(),
-            "domains": sorted(list(get_whitelisted_domains())),
-            "sample": sample_urls,
-        }
+        return conditional_json_response(request, _whitelist_overview_body(whitelist), whitelist.etag)
     except Exception as e:
         logger.error(f"Failed to get whitelist: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve whitelist")
 
-def extract_text_from_asbuilt_pdf(file: UploadFile) -> str:
-    """Extract text from as-built drawing PDF (specialized processing)"""
-    file.file.seek(0)
-    response = requests.post(
-        DRAWING_PROCESSING_API_URL,
-        files={
-            "file": (file.filename, file.file, file.content_type)
-        },
-        data={
-            "ocr_method": "textract"
-        }
+
+@app.get("/api/whitelist/entries")
+async def whitelist_entries(
+    domain: Optional[str] = None,
+    prefix: Optional[str] = None,
+    q: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    org_id: Optional[str] = None,
+):
+    """
+    Browse whitelist entries a page at a time in (host, path) order.
+
+    Filter by exact host (domain), host or URL prefix (prefix) and
+    case-insensitive substring (q); pass next_cursor back to get the next page.
+    """
+    whitelist = resolve_whitelist(org_id)
+    try:
+        page = whitelist.browse(domain, prefix, q, cursor, limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    page["version"] = whitelist.version
+    return page
+
+
+def check_content_length(request: Request, max_bytes: int) -> None:
+    """Reject a request whose declared Content-Length exceeds max_bytes with a 413."""
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Request body exceeds {max_bytes} bytes")
+
+
+async def read_body_limited(request: Request, max_bytes: int) -> bytes:
+    """Read a whole request body, rejecting it with a 413 once it exceeds max_bytes."""
+    check_content_length(request, max_bytes)
+    parts = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Request body exceeds {max_bytes} bytes")
+        parts.append(chunk)
+    return b"".join(parts)
+
+
+@app.post("/api/citations/validate")
+async def validate_citations_bulk(request: Request, org_id: Optional[str] = None):
+    """
+    Validate citation URLs in bulk.
+
+    Accepts a JSON body ({"urls": [...]} or a bare list) of up to
+    CITATIONS_MAX_JSON_MB, or an NDJSON / plain-text body with one URL per
+    line of up to CITATIONS_MAX_STREAM_MB, which is spooled to a temporary
+    file before validation starts. Responds with NDJSON: one result per
+    distinct URL, then a summary line. Oversized bodies and over-long lines
+    are rejected with a 413.
+    """
+    validator = CitationValidator(resolve_whitelist(org_id).index)
+    if request.headers.get("content-type", "").startswith("application/json"):
+        raw = await read_body_limited(request, settings.CITATIONS_MAX_JSON_MB * 1024 * 1024)
+        try:
+            body = json.loads(raw)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid JSON body")
+        urls = body.get("urls") if isinstance(body, dict) else body
+        if not isinstance(urls, list) or not all(isinstance(url, str) for url in urls):
+            raise HTTPException(status_code=400, detail='Expected {"urls": [...]} or a list of URL strings')
+        stream = iter_ndjson_results(validator, urls)
+    else:
+        max_bytes = settings.CITATIONS_MAX_STREAM_MB * 1024 * 1024
+        check_content_length(request, max_bytes)
+        try:
+            body = await spool_body(request.stream(), max_body_bytes=max_bytes)
+        except CitationLimitError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        stream = iter_ndjson_batches(validator, iter_url_batches(body))
+    return StreamingResponse(stream, media_type=NDJSON_MEDIA_TYPE)
+
+
+@app.get("/api/custom-urls")
+async def list_custom_urls(org_id: Optional[str] = None):
+    """List the custom whitelist URLs of an organization (or the shared list)."""
+    resolve_whitelist(org_id)
+    return {"org_id": org_id, "urls": get_custom_urls(org_id)}
+
+
+@app.post("/api/custom-url/add")
+async def add_custom_whitelist_url(request: CustomURLRequest, x_org_key: Optional[str] = Header(None)):
+    """Add a URL to an organization's custom whitelist (or the shared list)."""
+    require_whitelist_key(request.org_id, x_org_key)
+    result = await run_in_threadpool(
+        add_custom_url, request.url, request.include_children, request.description, request.org_id
     )
+    if not result["success"]:
+        raise HTTPException(status_code=400, detail=result["message"])
+    return result
 
-    if response.status_code != 200:
-        raise HTTPException(status_code=400, detail="Error processing as-built PDF")
-    data = response.text
-    return data
 
-def generate_llm_response(query: str, context: str, system_prompt: str, has_document: bool) -> str:
+@app.post("/api/custom-url/remove")
+async def remove_custom_whitelist_url(request: CustomURLRequest, x_org_key: Optional[str] = Header(None)):
+    """Remove a URL from an organization's custom whitelist (or the shared list)."""
+    require_whitelist_key(request.org_id, x_org_key)
+    result = await run_in_threadpool(remove_custom_url, request.url, request.org_id)
+    if not result["success"]:
+        raise HTTPException(status_code=400, detail=result["message"])
+    return result
+
+
+@app.get("/api/sessions/stats")
+async def session_stats():
+    """Get active session count and resident vs. spilled session memory."""
+    return session_manager.get_memory_stats()
+
+
+@app.post("/api/session/create", response_model=SessionCreateResponse)
+async def create_session():
+    """Create a new session."""
+    return SessionCreateResponse(session_id=session_manager.create_session())
+
+
+@app.get("/api/session/{session_id}")
+async def get_session(session_id: str):
+    """Get a session's documents and Q&A history."""
+    session = session_manager.get_session(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return {
+        "session_id": session_id,
+        "created_at": session["created_at"].isoformat(),
+        "last_accessed": session["last_accessed"].isoformat(),
+        "documents": [dict(doc.items()) for doc in session["documents"]],
+        "questions": [dict(qa.items()) for qa in session["questions"]],
+    }
+
+
+@app.get("/api/session/{session_id}/status", response_model=SessionStatusResponse)
+async def get_session_status(session_id: str):
+    """Get a session's document and question counts."""
+    status = session_manager.get_session_status(session_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return status
+
+
+@app.delete("/api/session/{session_id}")
+async def delete_session(session_id: str):
+    """Delete a session."""
+    if not session_manager.delete_session(session_id):
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return {"session_id": session_id, "deleted": True}
+
+async def generate_llm_response(
+    query: str,
+    context: str,
+    system_prompt: str,
+    has_document: bool,
+    api_key: Optional[str] = None,
+) -> Tuple[str, dict]:
+    """Generate an answer, returning (text, usage) with prompt-cache stats."""
     try:
-        message = anthropic_client.messages.create(
-            model="claude-sonnet-4-5",
-            max_tokens=1024,
-            system=system_prompt,
-            messages=[
-                {"role": "assistant", "content": "Use user query and document context to generate response."},
-                {"role": "user", "content": f"User query: {query}\nDocument context: {context}"}
-            ]
+        message = await create_message(
+            api_key=api_key,
+            **build_message_request(query, context, system_prompt)
         )
+        usage = summarize_usage(message.usage)
+        log_usage(usage)
 
         if message.content and len(message.content) > 0:
             # Get the first text block
-            return message.content[0].text
+            return message.content[0].text, usage
         else:
             raise HTTPException(status_code=500, detail="Empty response from LLM")
             
@@ -303,51 +566,189 @@ def generate_llm_response(query: str, context: str, system_prompt: str, has_docu
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating LLM response: {str(e)}")
 
+
+def extract_pdf_pages(content: bytes) -> List[str]:
+    """Extract the text of each page of a PDF"""
+    reader = PyPDF2.PdfReader(io.BytesIO(content))
+    return [page.extract_text() or "" for page in reader.pages]
+
+
+def extract_text_from_pdf(content: bytes) -> Tuple[str, int]:
+    """Extract text from a PDF, returning (text, page_count)"""
+    pages = extract_pdf_pages(content)
+    return "\n\n".join(pages)[:settings.MAX_TEXT_CHARS], len(pages)
+
+
+def extract_document_text(filename: str, content: bytes) -> str:
+    """Extract text from an uploaded .txt, .pdf or .docx document"""
+    ext = get_file_extension(filename)
+    if ext == ".pdf":
+        return extract_text_from_pdf(content)[0]
+    if ext == ".docx":
+        document = docx.Document(io.BytesIO(content))
+        return "\n".join(paragraph.text for paragraph in document.paragraphs)
+    return content.decode("utf-8", errors="ignore")
+
 # ============================================================================
 # API ENDPOINTS
 # ============================================================================
 
+async def process_asbuilt_job(job: dict, queue: JobQueue) -> dict:
+    """OCR an as-built drawing set page by page and attach it to its session."""
+    payload = job["payload"]
+    page_pdfs = await run_in_threadpool(split_pdf_pages, payload["path"])
+    queue.set_pages_total(job["job_id"], len(page_pdfs))
+    limit = asyncio.Semaphore(settings.JOBS_PAGE_CONCURRENCY)
+    
+    async def ocr_page(index: int, content: bytes) -> str:
+        try:
+            async with limit:
+                queue.set_page_status(job["job_id"], index, "running")
+                text = await drawing_client.parse(
+                    f"page-{index + 1}-{payload['filename']}", content, "application/pdf"
+                )
+        except asyncio.CancelledError:
+            queue.set_page_status(job["job_id"], index, "cancelled")
+            raise
+        except Exception:
+            queue.set_page_status(job["job_id"], index, "failed")
+            raise
+        queue.set_page_status(job["job_id"], index, "completed")
+        return text
+    
+    # One failed page fails the job, so the remaining pages are cancelled
+    pages = await gather_or_cancel(ocr_page(i, content) for i, content in enumerate(page_pdfs))
+    
+    extracted = {
+        "pages": pages,
+        "page_count": len(pages),
+        "chunks": chunk_pages(pages),
+        "fingerprint": document_fingerprint("\f".join(pages)),
+    }
+    if extraction_cache is not None and payload.get("cache_key"):
+        await run_in_threadpool(extraction_cache.set, payload["cache_key"], extracted)
+    
+    session_manager.create_session(
+        session_id=payload["session_id"],
+        filename=payload["filename"],
+        chunks=extracted["chunks"],
+        fingerprint=extracted["fingerprint"],
+        page_count=extracted["page_count"],
+        uploaded_at=datetime.now().isoformat(),
+        is_asbuilt=True
+    )
+    return {"session_id": payload["session_id"], "pages": extracted["page_count"]}
+
+
+os.makedirs(settings.JOBS_DIR, exist_ok=True)
+job_queue = JobQueue(settings.JOBS_DB_PATH)
+job_workers = JobWorkerPool(
+    job_queue,
+    process_asbuilt_job,
+    concurrency=settings.JOBS_WORKERS,
+    webhook_hosts=settings.JOBS_WEBHOOK_ALLOWED_HOSTS,
+    lease_seconds=settings.JOBS_LEASE_SECONDS,
+    # The spooled PDF is kept until the job finishes so an interrupted job can rerun
+    cleanup=lambda job: remove_spooled(job["payload"]["path"]),
+)
+
+
 @app.post("/upload")
-async def upload_document(file: UploadFile = File(...), is_asbuilt: bool = False):
+async def upload_document(
+    file: UploadFile = File(...),
+    is_asbuilt: bool = False,
+    callback_url: Optional[str] = None,
+):
     """Upload and process PDF document"""
     
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are supported")
+    if callback_url:
+        if not settings.JOBS_WEBHOOK_ALLOWED_HOSTS:
+            raise HTTPException(status_code=400, detail="Callback URLs are not enabled")
+        try:
+            await run_in_threadpool(validate_callback_url, callback_url, settings.JOBS_WEBHOOK_ALLOWED_HOSTS)
+        except CallbackURLError as e:
+            raise HTTPException(status_code=400, detail=str(e))
     
-    # Validate inputs
-    if not question or len(question.strip()) == 0:
-        raise HTTPException(status_code=400, detail="Question cannot be empty")
-    
-    # Extract text
-    if is_asbuilt:
-        # Specialized processing for as-built drawings can be added here
-        file.file.seek(0)
-        text = extract_text_from_asbuilt_pdf(file)
-    else:
-        # Read file
-        text = extract_text_from_pdf(content)
+    # Spool to disk so extraction workers can memory-map the file
+    try:
+        path, content_sha256 = await run_in_threadpool(spool_to_disk, file.file, settings.MAX_FILE_SIZE_BYTES)
+    except UploadTooLargeError:
+        raise HTTPException(status_code=413, detail=f"File exceeds {settings.MAX_FILE_SIZE_MB} MB limit")
+    try:
+        # Known files skip extraction and OCR entirely
+        cache_key = None
+        extracted = None
+        if extraction_cache is not None:
+            cache_key = extraction_cache.make_key(
+                content_sha256, EXTRACTOR_VERSION, "asbuilt" if is_asbuilt else "text",
+                settings.RETRIEVAL_CHUNK_CHARS, settings.RETRIEVAL_CHUNK_OVERLAP,
+            )
+            extracted = await run_in_threadpool(extraction_cache.get, cache_key)
+        
+        if extracted is None and is_asbuilt:
+            # OCR can take minutes: hand the file to a background job
+            page_count = await run_in_threadpool(count_pages, path)
+            job_path = os.path.join(settings.JOBS_DIR, f"{uuid.uuid4()}.pdf")
+            # JOBS_DIR may be on another filesystem than the temp directory
+            await run_in_threadpool(shutil.move, path, job_path)
+            session_id = str(uuid.uuid4())
+            job_id = job_queue.enqueue(
+                "asbuilt_ocr",
+                {
+                    "path": job_path,
+                    "filename": file.filename,
+                    "session_id": session_id,
+                    "cache_key": cache_key,
+                },
+                callback_url=callback_url,
+            )
+            job_workers.notify()
+            return UploadResponse(
+                session_id=session_id,
+                filename=file.filename,
+                pages=page_count,
+                message=f"Processing {file.filename} ({page_count} pages) in the background",
+                is_asbuilt=True,
+                job_id=job_id
+            )
+        
+        if extracted is None:
+            # Chunk pages as they come off the process pool
+            pages = []
+            chunks = []
+            async for page_number, page_text in aiter_pdf_pages(path):
+                pages.append(page_text)
+                chunks.extend(chunk_page(page_number, page_text))
+            page_count = len(pages)
+            
+            extracted = {
+                "pages": pages,
+                "page_count": page_count,
+                "chunks": chunks,
+                "fingerprint": document_fingerprint("\f".join(pages)),
+            }
+            if cache_key:
+                await run_in_threadpool(extraction_cache.set, cache_key, extracted)
+        else:
+            logger.info(f"Extraction cache hit for {file.filename}")
+    except PDFExtractionError as e:
+        raise HTTPException(status_code=400, detail=f"Could not read {file.filename}: {e}")
+    finally:
+        remove_spooled(path)
     
-    # Get or create Anthropic client
-    anthropic_client = None
-    if api_key:
-        try:
-            anthropic_client = Anthropic(api_key=api_key)
-        except Exception as e:
-            logger.error(f"Failed to create client with provided API key: {e}")
-            raise HTTPException(status_code=400, detail="Invalid API key provided")
-    else:
-        anthropic_client = client
+    page_count = extracted["page_count"]
     
     # Store in session
-    sessions[session_id] = {
-        "filename": file.filename,
-        "text": text,
-        "uploaded_at": "timestamp_here",
-        "is_asbuilt": is_asbuilt
-    }
-    
-    # Build system prompt
-    system_prompt = build_system_prompt(department, role)
+    session_id = session_manager.create_session(
+        filename=file.filename,
+        chunks=extracted["chunks"],
+        fingerprint=extracted["fingerprint"],
+        page_count=page_count,
+        uploaded_at=datetime.now().isoformat(),
+        is_asbuilt=is_asbuilt
+    )
     
     return UploadResponse(
         session_id=session_id,
@@ -357,14 +758,119 @@ async def upload_document(file: UploadFile = File(...), is_asbuilt: bool = False
         is_asbuilt=is_asbuilt
     )
 
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """Get the status and per-page progress of a background job."""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "pages_total": job["pages_total"],
+        "pages_done": job["pages_done"],
+        "pages": job["pages"],
+        "session_id": job["payload"]["session_id"],
+        "result": job["result"],
+        "error": job["error"],
+    }
+
+
+def get_document_context(request: QueryRequest) -> Tuple[str, str]:
+    """
+    Get (context, fingerprint) for the session's uploaded document.
+    
+    Context is the top-k chunks relevant to the query, with page references;
+    both values are empty if the session has no document.
+    """
+    session = session_manager.get_session(request.session_id) if request.session_id else None
+    if not session or not session.get("chunks"):
+        return "", ""
+    context = build_retrieval_context(request.query, session["fingerprint"], session["chunks"])
+    return context, session["fingerprint"]
+
+
+def get_query_cache_key(request: QueryRequest, doc_fingerprint: str) -> Optional[str]:
+    """Return the response-cache key for a query, or None if caching is off."""
+    if response_cache is None or request.no_cache:
+        return None
+    return make_cache_key(
+        request.query,
+        request.department or "general_public_works",
+        request.role,
+        doc_fingerprint,
+        get_whitelist_snapshot(request.org_id).version,
+    )
+
+
+def get_semantic_scope(request: QueryRequest, has_document: bool) -> Optional[tuple]:
+    """Return the semantic-cache scope for a query, or None if it does not apply."""
+    if semantic_cache is None or request.no_cache or has_document:
+        return None
+    return (request.department or "general_public_works", request.role, get_whitelist_snapshot(request.org_id).version)
+
+
+def record_question(request: QueryRequest, answer: str) -> None:
+    """Add an answered query to the session's Q&A history for reports."""
+    if request.session_id:
+        session_manager.add_question(
+            request.session_id,
+            request.query,
+            answer,
+            request.department or "general_public_works",
+            request.role,
+        )
+
+
 @app.post("/query")
 async def query_documents(request: QueryRequest):
     """Query with or without uploaded documents"""
     
-    # Get document context if session exists
-    document_text = ""
-    has_document = False
+    resolve_whitelist(request.org_id)
+    # Get relevant document excerpts if session has a document
+    document_text, doc_fingerprint = get_document_context(request)
+    has_document = bool(doc_fingerprint)
+    
+    cache_key = get_query_cache_key(request, doc_fingerprint)
+    if cache_key:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            record_question(request, cached["answer"])
+            return {**cached, "session_id": request.session_id, "cached": True}
     
+    semantic_scope = get_semantic_scope(request, has_document)
+    if semantic_scope:
+        match = semantic_cache.lookup(semantic_scope, request.query)
+        if match is not None:
+            cached, similarity = match
+            record_question(request, cached["answer"])
+            return {**cached, "session_id": request.session_id, "cached": True, "similarity": similarity}
+    
+    try:
+        system_prompt = build_system_prompt(request.department or "general_public_works", request.role, request.org_id)
+        response, usage = await generate_llm_response(
+            request.query, document_text, system_prompt, has_document, api_key=request.api_key
+        )
+        
+        sources = ["whitelisted_urls"]
+        if has_document:
+            sources.insert(0, "uploaded_document")
+        
+        result = {
+            "answer": enforce_whitelist_on_text(response, request.org_id),
+            "sources": sources,
+            "usage": usage,
+        }
+        if cache_key:
+            response_cache.set(cache_key, result)
+        if semantic_scope:
+            semantic_cache.add(semantic_scope, request.query, result)
+        record_question(request, result["answer"])
+        
+        return {**result, "session_id": request.session_id, "cached": False}
+    except HTTPException:
+        raise
     except APIError as e:
         logger.error(f"Anthropic API error: {e}")
         raise HTTPException(
@@ -379,13 +885,115 @@ async def query_documents(request: QueryRequest):
         )
 
 
+@app.post("/api/query")
+async def query_form(
+    question: str = Form(""),
+    department: str = Form("general_public_works"),
+    role: Optional[str] = Form(None),
+    session_id: Optional[str] = Form(None),
+    api_key: Optional[str] = Form(None),
+):
+    """Form-encoded variant of /query."""
+    question = question.strip()
+    if not question:
+        raise HTTPException(status_code=400, detail="Question is required")
+    if len(question) > MAX_QUESTION_CHARS:
+        raise HTTPException(status_code=400, detail=f"Question exceeds {MAX_QUESTION_CHARS} characters")
+    result = await query_documents(QueryRequest(
+        session_id=session_id,
+        query=question,
+        role=role,
+        department=department,
+        api_key=api_key,
+    ))
+    return {**result, "department": department, "timestamp": datetime.now().isoformat()}
+
+
+def format_sse(data: dict, event: Optional[str] = None) -> str:
+    """Format a Server-Sent Events frame with a JSON payload."""
+    frame = f"event: {event}\n" if event else ""
+    return frame + f"data: {json.dumps(data)}\n\n"
+
+
+@app.post("/query/stream")
+async def query_documents_stream(request: QueryRequest):
+    """Stream the answer to a query as Server-Sent Events"""
+    
+    resolve_whitelist(request.org_id)
+    document_text, doc_fingerprint = get_document_context(request)
+    has_document = bool(doc_fingerprint)
+    
+    system_prompt = build_system_prompt(request.department or "general_public_works", request.role, request.org_id)
+    sources = ["whitelisted_urls"]
+    if has_document:
+        sources.insert(0, "uploaded_document")
+    
+    cache_key = get_query_cache_key(request, doc_fingerprint)
+    cached = response_cache.get(cache_key) if cache_key else None
+    semantic_scope = get_semantic_scope(request, has_document)
+    if cached is None and semantic_scope:
+        match = semantic_cache.lookup(semantic_scope, request.query)
+        cached = match[0] if match is not None else None
+    
+    async def cached_stream():
+        record_question(request, cached["answer"])
+        yield format_sse({"text": cached["answer"]}, event="delta")
+        yield format_sse(
+            {"sources": cached["sources"], "session_id": request.session_id, "usage": cached["usage"], "cached": True},
+            event="done",
+        )
+    
+    async def event_stream():
+        parts = []
+        usage = {}
+        scanner = StreamingURLScanner(get_whitelist_index(request.org_id) if request.org_id else None)
+        try:
+            async for delta in stream_message(
+                api_key=request.api_key,
+                usage_out=usage,
+                **build_message_request(request.query, document_text, system_prompt)
+            ):
+                parts.append(delta)
+                scanner.feed(delta)
+                yield format_sse({"text": delta}, event="delta")
+            
+            scanner.finish()
+            answer = "".join(parts)
+            notice = scanner.notice()
+            if notice:
+                yield format_sse({"text": notice}, event="delta")
+            result = {"answer": answer + notice, "sources": sources, "usage": usage}
+            if cache_key:
+                response_cache.set(cache_key, result)
+            if semantic_scope:
+                semantic_cache.add(semantic_scope, request.query, result)
+            record_question(request, result["answer"])
+            yield format_sse(
+                {"sources": sources, "session_id": request.session_id, "usage": usage, "cached": False},
+                event="done",
+            )
+        except APIError as e:
+            logger.error(f"Anthropic API error during streaming query: {e}")
+            yield format_sse({"detail": "AI service error. Please try again later."}, event="error")
+        except Exception as e:
+            logger.error(f"Unexpected error in streaming query: {e}")
+            yield format_sse({"detail": "An unexpected error occurred. Please try again."}, event="error")
+    
+    return StreamingResponse(
+        cached_stream() if cached is not None else event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.post("/api/document/upload")
-async def upload_document(
+async def upload_and_analyze_document(
     file: UploadFile = File(...),
     session_id: str = Form(...),
     department: str = Form("general_public_works"),
     role: Optional[str] = Form(None),
-    api_key: Optional[str] = Form(None)
+    api_key: Optional[str] = Form(None),
+    org_id: Optional[str] = Form(None)
 ):
     """Upload and analyze a document."""
     logger.info(f"Document upload - File: {file.filename}, Session: {session_id}")
@@ -394,18 +1002,46 @@ async def upload_document(
     session = session_manager.get_session(session_id)
     if session is None:
         raise HTTPException(status_code=404, detail="Session not found or expired")
+    resolve_whitelist(org_id)
     
-    # Generate response (replace with actual LLM call)
-    if has_document:
-        # response = generate_llm_response(request.query, document_text, system_prompt, has_document)
-        response = generate_llm_response(request.query, document_text, system_prompt, has_document)
-    else:
-        response = generate_mock_response(request.query, document_text, system_prompt, has_document)
-
-    sources = ["whitelisted_urls"]
-    if has_document:
-        sources.insert(0, "uploaded_document")
+    if not validate_file_extension(file.filename):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file type. Allowed: {', '.join(sorted(settings.ALLOWED_FILE_EXTENSIONS))}"
+        )
     
+    try:
+        content = await file.read()
+        if len(content) > settings.MAX_FILE_SIZE_BYTES:
+            raise HTTPException(status_code=413, detail=f"File exceeds {settings.MAX_FILE_SIZE_MB} MB limit")
+        
+        text = await run_in_threadpool(extract_document_text, file.filename, content)
+        system_prompt = build_system_prompt(department, role, org_id)
+        analysis, _ = await generate_llm_response(
+            "Analyze this document and summarize the key procedures, standards, and institutional knowledge it contains.",
+            text[:settings.MAX_TEXT_CHARS],
+            system_prompt,
+            True,
+            api_key=api_key,
+        )
+        analysis = enforce_whitelist_on_text(analysis, org_id)
+        
+        file_size = format_file_size(len(content))
+        session_manager.add_document(session_id, DocumentRecord(
+            filename=file.filename,
+            department=department,
+            role=role,
+            analysis=analysis,
+            file_size=file_size,
+            uploaded_at=datetime.now(),
+        ))
+        
+        return DocumentUploadResponse(
+            filename=file.filename,
+            analysis=analysis,
+            department=department,
+            file_size=file_size,
+        )
     except HTTPException:
         raise
     except APIError as e:
@@ -422,427 +1058,74 @@ async def upload_document(
         )
 
 
+def report_response(body: bytes, media_type: str, headers: dict, encoding: str) -> Response:
+    """Build a report response, compressing the body if the client allows."""
+    if encoding != "identity":
+        headers = {**headers, "Content-Encoding": encoding}
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
 @app.post("/api/report/generate")
-async def generate_report(session_id: str = Form(...)):
-    """Generate HTML report for a session."""
-    logger.info(f"Generating report for session: {session_id}")
+async def generate_report(request: Request, session_id: str = Form(...), format: str = Form("html")):
+    """Generate an HTML, JSON or PDF report for a session."""
+    logger.info(f"Generating {format} report for session: {session_id}")
+    
+    if format not in REPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format. Allowed: {', '.join(REPORT_FORMATS)}")
     
     session = session_manager.get_session(session_id)
     if session is None:
         raise HTTPException(status_code=404, detail="Session not found or expired")
     
+    # Reports change only when the session version does
+    version = session.get("version", 0)
+    etag = report_etag(session_id, version, format)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    
+    media_type = REPORT_FORMATS[format]
+    encoding = choose_encoding(request.headers.get("accept-encoding"))
+    cache_key = (session_id, version, format)
+    cached = report_cache.get(cache_key)
+    if cached is not None:
+        return report_response(await run_in_threadpool(cached.encoded, encoding), media_type, headers, encoding)
+    
     try:
-        # Build HTML report with sanitization
-        html_report = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <title>PipeWrench AI - Knowledge Capture Report</title>
-    <meta charset="UTF-8">
-    <style>
-        body {{ 
-            font-family: Arial, sans-serif; 
-            margin: 40px; 
-            line-height: 1.6; 
-            background: #f5f5f5;
-        }}
-        .container {{
-            max-width: 900px;
-            margin: 0 auto;
-            background: white;
-            padding: 40px;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }}
-        h1 {{ 
-            color: #1e40af; 
-            border-bottom: 3px solid #3b82f6;
-            padding-bottom: 10px;
-        }}
-        h2 {{ 
-            color: #3b82f6; 
-            margin-top: 30px; 
-            border-bottom: 1px solid #e5e7eb;
-            padding-bottom: 5px;
-        }}
-        .question {{ 
-            background: #eff6ff; 
-            padding: 15px; 
-            margin: 20px 0; 
-            border-left: 4px solid #3b82f6;
-            border-radius: 4px;
-        }}
-        .answer {{ 
-            margin: 10px 0; 
-            white-space: pre-wrap;
-            padding: 10px;
-            background: white;
-        }}
-        .document {{ 
-            background: #fef3c7; 
-            padding: 15px; 
-            margin: 20px 0; 
-            border-left: 4px solid #f59e0b;
-            border-radius: 4px;
-        }}
-        .metadata {{ 
-            color: #6b7280; 
-            font-size: 0.9em;
-            font-style: italic;
-        }}
-        .stats {{
-            background: #f0f9ff;
-            padding: 15px;
-            border-radius: 4px;
-            margin: 20px 0;
-        }}
-        .footer {{
-            margin-top: 40px;
-            padding-top: 20px;
-            border-top: 2px solid #e5e7eb;
-            text-align: center;
-            color: #6b7280;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>🏗️ Municipal DPW Knowledge Capture System</h1>
-            <p>AI-Powered Infrastructure Knowledge Base with Source Verification</p>
-        </div>
-
-        <div id="alertBox" class="alert"></div>
-
-        <!-- Upload Section (Optional) -->
-        <div class="card">
-            <h2>📄 Upload Document (Optional)</h2>
-            <p style="color: #666; margin-bottom: 15px;">Upload a PDF to query your own documents, or skip to query whitelisted sources directly.</p>
-            <div class="upload-zone" id="uploadZone">
-                <div class="upload-icon">📁</div>
-                <div>Drag & drop your PDF here or click to browse</div>
-                <div style="color: #999; font-size: 0.9em; margin-top: 10px;">PDF files only</div>
-                <input type="file" id="fileInput" accept=".pdf" onchange="handleFileSelect(event)">
-            </div>
-
-            <!-- As-Built Checkbox -->
-            <div style="margin-top: 15px; padding: 15px; background: #f0f8ff; border-radius: 8px;">
-                <label style="display: flex; align-items: center; cursor: pointer; font-weight: 500; color: #333;">
-                    <input type="checkbox" id="asBuiltCheckbox" style="width: auto; margin-right: 10px; cursor: pointer;">
-                    <span>📐 This is an As-Built/Record Drawing</span>
-                </label>
-                <p style="margin: 8px 0 0 32px; color: #666; font-size: 0.9em;">
-                    Check this if uploading construction as-built drawings or record documents
-                </p>
-            </div>
-        </div>
-        
-        <h2>📄 Documents Analyzed ({len(session["documents"])})</h2>
-"""
-        
-        for i, doc in enumerate(session["documents"], 1):
-            role_display = f" • {sanitize_html(doc['role'])}" if doc.get('role') else ""
-            file_size_display = f" ({doc['file_size']})" if doc.get('file_size') else ""
-            html_report += f"""
-        <div class="document">
-            <strong>Document {i}:</strong> {sanitize_html(doc['filename'])}{file_size_display}<br>
-            <strong>Department:</strong> {sanitize_html(doc['department'])}{role_display}<br>
-            <div class="answer">
-                <strong>Analysis:</strong><br>
-                {sanitize_html(doc['analysis'])}
-            </div>
-            <p class="metadata">Uploaded: {doc['uploaded_at']}</p>
-        </div>
-"""
+        if format != "html":
+            payload = await run_in_threadpool(report_payload, session, session_id)
+            body = await asyncio.get_running_loop().run_in_executor(
+                get_report_pool(), render_export, format, payload
+            )
+            report = CachedReport(body, media_type)
+            report_cache.set(cache_key, report)
+            return report_response(await run_in_threadpool(report.encoded, encoding), media_type, headers, encoding)
         
-        html_report += f"""
-        <h2>💬 Questions & Answers ({len(session["questions"])})</h2>
-"""
+        chunks = render_report(session, session_id)
+        # Render the first chunk eagerly so template errors still return a 500
+        first = next(chunks, "")
         
-        for i, qa in enumerate(session["questions"], 1):
-            role_display = f" • {sanitize_html(qa['role'])}" if qa.get('role') else ""
-            html_report += f"""
-        <div class="question">
-            <strong>Q{i} ({sanitize_html(qa['department'])}{role_display}):</strong> {sanitize_html(qa['question'])}
-            <div class="answer">
-                <strong>Answer:</strong><br>
-                {sanitize_html(qa['answer'])}
-            </div>
-            <p class="metadata">Asked: {qa['timestamp']}</p>
-        </div>
-"""
-        
-        html_report += """
-        <div class="footer">
-            <p><strong>PipeWrench AI</strong> - Municipal DPW Knowledge Capture System</p>
-            <p>Built with Claude 3.5 Sonnet by Anthropic</p>
-        </div>
-    </div>
-
-    <script>
-        let sessionId = null;
-
-        // Load configuration
-        async function loadConfiguration() {
-            try {
-                const rolesResponse = await fetch('/roles');
-                const roles = await rolesResponse.json();
-                const roleSelect = document.getElementById('roleSelect');
-                roleSelect.innerHTML = roles.map(role => 
-                    `<option value="${role.id}">${role.name}</option>`
-                ).join('');
-
-                const deptsResponse = await fetch('/departments');
-                const depts = await deptsResponse.json();
-                const deptSelect = document.getElementById('departmentSelect');
-                deptSelect.innerHTML = '<option value="">Select Department</option>' +
-                    depts.map(dept => 
-                        `<option value="${dept.id}">${dept.name}</option>`
-                    ).join('');
-            } catch (error) {
-                console.error('Error loading configuration:', error);
-            }
-        }
-
-        // Drag and drop
-        const uploadZone = document.getElementById('uploadZone');
-
-        uploadZone.addEventListener('click', () => {
-            document.getElementById('fileInput').click();
-        });
-
-        uploadZone.addEventListener('dragover', (e) => {
-            e.preventDefault();
-            uploadZone.classList.add('dragover');
-        });
-
-        uploadZone.addEventListener('dragleave', () => {
-            uploadZone.classList.remove('dragover');
-        });
-
-        uploadZone.addEventListener('drop', (e) => {
-            e.preventDefault();
-            uploadZone.classList.remove('dragover');
-            const files = e.dataTransfer.files;
-            if (files.length > 0) {
-                handleFile(files[0]);
-            }
-        });
-
-        function handleFileSelect(event) {
-            const file = event.target.files[0];
-            if (file) {
-                handleFile(file);
-            }
-        }
-
-        async function handleFile(file) {
-            if (!file.name.endsWith('.pdf')) {
-                showAlert('Please upload a PDF file', 'error');
-                return;
-            }
-
-            const formData = new FormData();
-            formData.append('file', file);
-
-            // Get checkbox value
-            const isAsBuilt = document.getElementById('asBuiltCheckbox').checked;
-
-            showAlert('Uploading and processing document...', 'info');
-
-            try {
-                // Send is_asbuilt as query parameter
-                const url = `/upload?is_asbuilt=${isAsBuilt}`;
-                const response = await fetch(url, {
-                    method: 'POST',
-                    body: formData
-                });
-
-                const data = await response.json();
-
-                if (response.ok) {
-                    sessionId = data.session_id;
-                    showAlert(`✅ ${data.message}`, 'success');
-                    document.getElementById('responseSection').style.display = 'block';
-                    
-                    // Generate temporary session ID for custom URLs
-                    if (!sessionId) {
-                        sessionId = 'temp_' + Date.now();
-                    }
-                    loadCustomUrls();
-                } else {
-                    showAlert(`Error: ${data.detail}`, 'error');
-                }
-            } catch (error) {
-                showAlert(`Error uploading file: ${error.message}`, 'error');
-            }
-        }
-
-        async function submitQuery() {
-            const query = document.getElementById('queryInput').value.trim();
-            if (!query) {
-                showAlert('Please enter a question', 'error');
-                return;
-            }
-
-            const role = document.getElementById('roleSelect').value;
-            const department = document.getElementById('departmentSelect').value;
-
-            // Generate temporary session ID if none exists
-            if (!sessionId) {
-                sessionId = 'temp_' + Date.now();
-            }
-
-            showAlert('Processing your question...', 'info');
-
-            try {
-                const response = await fetch('/query', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json'
-                    },
-                    body: JSON.stringify({
-                        session_id: sessionId,
-                        query: query,
-                        role: role,
-                        department: department || null
-                    })
-                });
-
-                const data = await response.json();
-
-                if (response.ok) {
-                    document.getElementById('responseBox').textContent = data.answer;
-                    document.getElementById('responseSection').style.display = 'block';
-                    showAlert('✅ Response generated', 'success');
-                } else {
-                    showAlert(`Error: ${data.detail}`, 'error');
-                }
-            } catch (error) {
-                showAlert(`Error: ${error.message}`, 'error');
-            }
-        }
-
-        function handleQueryKeyPress(event) {
-            if (event.key === 'Enter') {
-                submitQuery();
-            }
-        }
-
-        async function addCustomUrl() {
-            const urlInput = document.getElementById('customUrlInput');
-            const url = urlInput.value.trim();
-
-            if (!url) {
-                showAlert('Please enter a URL', 'error');
-                return;
-            }
-
-            // Generate temporary session ID if none exists
-            if (!sessionId) {
-                sessionId = 'temp_' + Date.now();
-            }
-
-            try {
-                const response = await fetch('/custom-url/add', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json'
-                    },
-                    body: JSON.stringify({
-                        session_id: sessionId,
-                        url: url
-                    })
-                });
-
-                const data = await response.json();
-
-                if (response.ok) {
-                    showAlert('✅ URL added successfully', 'success');
-                    urlInput.value = '';
-                    loadCustomUrls();
-                } else {
-                    showAlert(`Error: ${data.detail}`, 'error');
-                }
-            } catch (error) {
-                showAlert(`Error: ${error.message}`, 'error');
-            }
-        }
-
-        async function loadCustomUrls() {
-            if (!sessionId) return;
-
-            try {
-                const response = await fetch(`/custom-url/list/${sessionId}`);
-                const data = await response.json();
-
-                const listDiv = document.getElementById('customUrlList');
-                if (data.custom_urls.length === 0) {
-                    listDiv.innerHTML = '<p style="color: #666; font-size: 0.9em; margin-top: 10px;">No custom URLs added yet</p>';
-                } else {
-                    listDiv.innerHTML = data.custom_urls.map(url => `
-                        <div class="url-item">
-                            <span>${url}</span>
-                            <button class="btn-remove" onclick="removeCustomUrl('${url}')">Remove</button>
-                        </div>
-                    `).join('');
-                }
-            } catch (error) {
-                console.error('Error loading custom URLs:', error);
-            }
-        }
-
-        async function removeCustomUrl(url) {
-            try {
-                const response = await fetch('/custom-url/remove', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json'
-                    },
-                    body: JSON.stringify({
-                        session_id: sessionId,
-                        url: url
-                    })
-                });
-
-                if (response.ok) {
-                    showAlert('✅ URL removed', 'success');
-                    loadCustomUrls();
-                } else {
-                    showAlert('Error removing URL', 'error');
-                }
-            } catch (error) {
-                showAlert(`Error: ${error.message}`, 'error');
-            }
-        }
-
-        function showAlert(message, type) {
-            const alertBox = document.getElementById('alertBox');
-            alertBox.textContent = message;
-            alertBox.className = `alert alert-${type} show`;
-
-            if (type === 'success') {
-                setTimeout(() => {
-                    alertBox.classList.remove('show');
-                }, 5000);
-            }
-        }
-
-        function toggleFooter() {
-            const content = document.getElementById('footerContent');
-            const arrow = document.getElementById('footerArrow');
-            content.classList.toggle('show');
-            arrow.classList.toggle('expanded');
-        }
-
-        // Initialize
-        loadConfiguration();
-    </script>
-</body>
-</html>
-"""
+        def stream():
+            # Tee the raw HTML so small enough reports are cached once complete
+            parts = []
+            size = 0
+            limit = settings.REPORT_CACHE_MAX_ENTRY_MB * 1024 * 1024
+            for chunk in itertools.chain([first], chunks):
+                data = chunk.encode("utf-8")
+                if parts is not None:
+                    size += len(data)
+                    if size <= limit:
+                        parts.append(data)
+                    else:
+                        parts = None
+                yield data
+            if parts is not None:
+                report_cache.set(cache_key, CachedReport(b"".join(parts), media_type))
+            logger.info(f"Report generated successfully for session {session_id}")
         
-        logger.info(f"Report generated successfully for session {session_id}")
-        return HTMLResponse(content=html_report)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return StreamingResponse(iter_compressed(stream(), encoding), media_type=media_type, headers=headers)
     
     except Exception as e:
         logger.error(f"Failed to generate report: {e}")
@@ -862,7 +1145,7 @@ async def global_exception_handler(request: Request, exc: Exception):
         content=ErrorResponse(
             error="Internal Server Error",
             detail="An unexpected error occurred. Please try again later."
-        ).dict()
+        ).model_dump()
     )
 
 
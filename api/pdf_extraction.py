@@ -0,0 +1,203 @@
+"""
+PDF text extraction engine for PipeWrench AI.
+Spools uploads to disk, memory-maps them, and extracts pages in parallel
+across a process pool (threads where processes are unavailable), yielding
+pages in order as soon as they are ready so chunking and indexing can
+start before the whole file is done.
+"""
+
+import asyncio
+import hashlib
+import io
+import mmap
+import os
+import tempfile
+import time
+from concurrent.futures import Executor
+from typing import AsyncIterator, BinaryIO, Iterator, List, Optional, Tuple
+
+import PyPDF2
+
+from config import settings
+from utils import create_process_pool, logger
+
+
+# Bump when extraction output changes, so cached results are not reused
+EXTRACTOR_VERSION = "pypdf2-pages-1"
+
+# Errors PyPDF2 raises on malformed input besides its own PyPdfError
+_MALFORMED_PDF_ERRORS = (PyPDF2.errors.PyPdfError, ValueError, KeyError, IndexError, TypeError, AttributeError)
+
+_pool: Optional[Executor] = None
+
+
+class PDFExtractionError(ValueError):
+    """An upload that is empty or not a readable PDF."""
+
+
+class UploadTooLargeError(ValueError):
+    """An upload larger than the configured size limit."""
+
+
+def spool_to_disk(source: BinaryIO, max_bytes: Optional[int] = None) -> Tuple[str, str]:
+    """
+    Copy an upload stream to a temporary file.
+    
+    Returns:
+        (path, sha256 hex digest of the contents)
+    
+    Raises:
+        UploadTooLargeError: the stream is longer than max_bytes; nothing is
+            left on disk
+    """
+    source.seek(0)
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(prefix="pipewrench-", suffix=".pdf", delete=False) as f:
+        try:
+            while True:
+                block = source.read(1024 * 1024)
+                if not block:
+                    break
+                size += len(block)
+                if max_bytes is not None and size > max_bytes:
+                    raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+                digest.update(block)
+                f.write(block)
+        except BaseException:
+            f.close()
+            remove_spooled(f.name)
+            raise
+        return f.name, digest.hexdigest()
+
+
+def _open_reader(path: str) -> Tuple[PyPDF2.PdfReader, mmap.mmap]:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # mmap cannot map an empty file
+            raise PDFExtractionError("File is empty")
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return PyPDF2.PdfReader(buffer), buffer
+    except _MALFORMED_PDF_ERRORS as e:
+        buffer.close()
+        raise PDFExtractionError(f"Not a readable PDF: {e}") from e
+
+
+def count_pages(path: str) -> int:
+    """Count the pages of a spooled PDF."""
+    reader, buffer = _open_reader(path)
+    try:
+        return len(reader.pages)
+    finally:
+        buffer.close()
+
+
+def extract_page_range(path: str, start: int, stop: int) -> List[str]:
+    """Extract text for pages [start, stop) of a spooled PDF (runs in workers)."""
+    reader, buffer = _open_reader(path)
+    try:
+        return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+    except _MALFORMED_PDF_ERRORS as e:
+        raise PDFExtractionError(f"Could not read PDF pages {start + 1}-{stop}: {e}") from e
+    finally:
+        buffer.close()
+
+
+def split_pdf_pages(path: str) -> List[bytes]:
+    """Split a spooled PDF into single-page PDF documents."""
+    reader, buffer = _open_reader(path)
+    try:
+        pages = []
+        for page in reader.pages:
+            writer = PyPDF2.PdfWriter()
+            writer.add_page(page)
+            out = io.BytesIO()
+            writer.write(out)
+            pages.append(out.getvalue())
+        return pages
+    finally:
+        buffer.close()
+
+
+def get_extraction_pool() -> Executor:
+    """Get the shared process pool used for page extraction (threads if unavailable)."""
+    global _pool
+    if _pool is None:
+        _pool = create_process_pool(settings.PDF_EXTRACT_WORKERS or None, "pdf-extract")
+    return _pool
+
+
+def shutdown_extraction_pool() -> None:
+    """Shut down the shared process pool."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+def _page_batches(page_count: int, batch_size: int) -> List[Tuple[int, int]]:
+    return [(start, min(start + batch_size, page_count)) for start in range(0, page_count, batch_size)]
+
+
+def _log_rate(page_count: int, started: float) -> None:
+    elapsed = time.perf_counter() - started
+    rate = page_count / elapsed if elapsed > 0 else float("inf")
+    logger.info(f"Extracted {page_count} PDF pages in {elapsed:.2f}s ({rate:.1f} pages/sec)")
+
+
+def iter_pdf_pages(path: str, executor: Optional[Executor] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page_number, text) for a spooled PDF, in page order.
+    
+    Batches of pages are extracted in parallel on the executor (the shared
+    process pool by default); small documents are extracted inline.
+    """
+    started = time.perf_counter()
+    page_count = count_pages(path)
+    if page_count < settings.PDF_PARALLEL_MIN_PAGES:
+        for offset, text in enumerate(extract_page_range(path, 0, page_count)):
+            yield offset + 1, text
+    else:
+        executor = executor or get_extraction_pool()
+        futures = [
+            executor.submit(extract_page_range, path, start, stop)
+            for start, stop in _page_batches(page_count, settings.PDF_EXTRACT_BATCH_PAGES)
+        ]
+        page_number = 0
+        for future in futures:
+            for text in future.result():
+                page_number += 1
+                yield page_number, text
+    _log_rate(page_count, started)
+
+
+async def aiter_pdf_pages(path: str, executor: Optional[Executor] = None) -> AsyncIterator[Tuple[int, str]]:
+    """Async variant of iter_pdf_pages that never blocks the event loop."""
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    page_count = await loop.run_in_executor(None, count_pages, path)
+    if page_count < settings.PDF_PARALLEL_MIN_PAGES:
+        pages = await loop.run_in_executor(None, extract_page_range, path, 0, page_count)
+        for offset, text in enumerate(pages):
+            yield offset + 1, text
+    else:
+        executor = executor or get_extraction_pool()
+        futures = [
+            loop.run_in_executor(executor, extract_page_range, path, start, stop)
+            for start, stop in _page_batches(page_count, settings.PDF_EXTRACT_BATCH_PAGES)
+        ]
+        page_number = 0
+        for future in futures:
+            for text in await future:
+                page_number += 1
+                yield page_number, text
+    _log_rate(page_count, started)
+
+
+def remove_spooled(path: str) -> None:
+    """Delete a spooled upload, ignoring errors."""
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
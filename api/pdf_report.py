@@ -0,0 +1,88 @@
+"""
+Minimal PDF writer for session reports.
+Lays out plain text in Helvetica on US Letter pages with no third-party
+dependencies. Characters outside Latin-1 are replaced.
+"""
+
+import textwrap
+from typing import Iterable, List
+
+
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+MARGIN = 54
+FONT_SIZE = 10
+LEADING = 13
+WRAP_CHARS = 95
+LINES_PER_PAGE = (PAGE_HEIGHT - 2 * MARGIN) // LEADING
+
+
+def _escape(line: str) -> bytes:
+    data = line.encode("latin-1", errors="replace")
+    return data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def wrap_lines(text: str, width: int = WRAP_CHARS) -> List[str]:
+    """Wrap text to the page width, keeping blank lines."""
+    lines = []
+    for paragraph in (text or "").splitlines() or [""]:
+        lines.extend(textwrap.wrap(paragraph, width) or [""])
+    return lines
+
+
+def _page_stream(lines: List[str]) -> bytes:
+    out = [b"BT /F1 %d Tf %d TL %d %d Td" % (FONT_SIZE, LEADING, MARGIN, PAGE_HEIGHT - MARGIN)]
+    for line in lines:
+        out.append(b"(" + _escape(line) + b") Tj T*")
+    out.append(b"ET")
+    return b"\n".join(out)
+
+
+def build_text_pdf(lines: Iterable[str], title: str = "") -> bytes:
+    """
+    Build a PDF document from lines of text.
+
+    Args:
+        lines: Pre-wrapped lines; wrap_lines() produces suitable input
+        title: Document title stored in the PDF info dictionary
+
+    Returns:
+        PDF file contents
+    """
+    lines = list(lines) or [""]
+    pages = [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)]
+
+    # Objects 1-4 are fixed; each page adds a content stream and a page object
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Title (" + _escape(title) + b") /Producer (PipeWrench AI) >>",
+    ]
+    kids = []
+    for page_lines in pages:
+        stream = _page_stream(page_lines)
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % (PAGE_WIDTH, PAGE_HEIGHT, len(objects))
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), len(kids)
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R /Info 4 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, xref
+    )
+    return bytes(out)
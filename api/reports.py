@@ -0,0 +1,317 @@
+"""
+Session report rendering for PipeWrench AI.
+HTML reports are rendered from a precompiled Jinja2 template and streamed
+out in chunks, so memory stays flat however many questions a session holds.
+JSON and PDF exports are rendered in a process pool. Finished reports are
+cached per session version and served compressed.
+"""
+
+import gzip
+import json
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Executor
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, Optional
+
+import jinja2
+
+from config import settings
+from pdf_report import build_text_pdf, wrap_lines
+from utils import create_process_pool, iter_sanitized_html, sanitize_html
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+REPORT_CHUNK_CHARS = 16 * 1024
+
+
+@lru_cache(maxsize=1)
+def get_template_environment() -> jinja2.Environment:
+    """
+    Get the Jinja2 environment used for reports.
+
+    Autoescaping is off: every user-supplied value goes through the
+    sanitize filter, which is sanitize_html, so output escaping matches
+    the rest of the app exactly. Long bodies use sanitize_chunks, which
+    escapes and emits them a slice at a time.
+    """
+    env = jinja2.Environment(
+        loader=jinja2.FileSystemLoader(TEMPLATES_DIR),
+        autoescape=False,
+        trim_blocks=True,
+        auto_reload=False,
+    )
+    env.filters["sanitize"] = sanitize_html
+    env.filters["sanitize_chunks"] = iter_sanitized_html
+    return env
+
+
+def get_report_template() -> jinja2.Template:
+    """Get the compiled session report template."""
+    return get_template_environment().get_template("report.html")
+
+
+def render_report(
+    session,
+    session_id: str,
+    generated_at: Optional[datetime] = None,
+    chunk_chars: int = REPORT_CHUNK_CHARS,
+) -> Iterator[str]:
+    """
+    Render a session report incrementally.
+
+    Args:
+        session: Session mapping with "documents" and "questions"
+        session_id: Session ID shown in the report header
+        generated_at: Report timestamp (defaults to now)
+        chunk_chars: Approximate size of each yielded chunk
+
+    Yields:
+        HTML fragments that concatenate to the full report
+    """
+    documents = session.get("documents") or []
+    questions = session.get("questions") or []
+    stream = get_report_template().generate(
+        session_id=session_id,
+        generated_at=(generated_at or datetime.now()).strftime("%Y-%m-%d %H:%M:%S"),
+        document_count=len(documents),
+        question_count=len(questions),
+        documents=documents,
+        questions=questions,
+    )
+    buffer = []
+    size = 0
+    for fragment in stream:
+        buffer.append(fragment)
+        size += len(fragment)
+        if size >= chunk_chars:
+            yield "".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer)
+
+
+# ============================================================================
+# EXPORT FORMATS
+# ============================================================================
+
+REPORT_FORMATS = {
+    "html": "text/html; charset=utf-8",
+    "json": "application/json",
+    "pdf": "application/pdf",
+}
+
+_pool: Optional[Executor] = None
+
+
+def report_payload(session, session_id: str, generated_at: Optional[datetime] = None) -> dict:
+    """
+    Flatten a session into plain data for the JSON and PDF renderers.
+
+    Spilled entries are paged in and records become dicts, so the payload
+    can be sent to worker processes.
+    """
+    def plain(item) -> dict:
+        return {key: item.get(key) for key in item.keys()}
+
+    return {
+        "session_id": session_id,
+        "generated_at": (generated_at or datetime.now()).isoformat(),
+        "documents": [plain(doc) for doc in session.get("documents") or []],
+        "questions": [plain(qa) for qa in session.get("questions") or []],
+    }
+
+
+def render_report_json(payload: dict) -> bytes:
+    """Render a report payload as JSON."""
+    return json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+
+
+def render_report_pdf(payload: dict) -> bytes:
+    """Render a report payload as a plain-text PDF."""
+    lines = [
+        "PipeWrench AI - Knowledge Capture Report",
+        f"Session: {payload['session_id']}",
+        f"Generated: {payload['generated_at']}",
+        "",
+        f"Documents Analyzed ({len(payload['documents'])})",
+    ]
+    for i, doc in enumerate(payload["documents"], 1):
+        role = f" - {doc['role']}" if doc.get("role") else ""
+        lines.append("")
+        lines.extend(wrap_lines(f"Document {i}: {doc.get('filename')} ({doc.get('department')}{role})"))
+        lines.extend(wrap_lines(doc.get("analysis") or ""))
+        lines.append(f"Uploaded: {doc.get('uploaded_at')}")
+    lines.extend(["", f"Questions & Answers ({len(payload['questions'])})"])
+    for i, qa in enumerate(payload["questions"], 1):
+        role = f" - {qa['role']}" if qa.get("role") else ""
+        lines.append("")
+        lines.extend(wrap_lines(f"Q{i} ({qa.get('department')}{role}): {qa.get('question')}"))
+        lines.extend(wrap_lines(qa.get("answer") or ""))
+        lines.append(f"Asked: {qa.get('timestamp')}")
+    return build_text_pdf(lines, title=f"PipeWrench AI Report {payload['session_id']}")
+
+
+def render_export(fmt: str, payload: dict) -> bytes:
+    """Render a JSON or PDF export (runs in worker processes)."""
+    if fmt == "json":
+        return render_report_json(payload)
+    if fmt == "pdf":
+        return render_report_pdf(payload)
+    raise ValueError(f"Unsupported report format: {fmt}")
+
+
+def get_report_pool() -> Executor:
+    """Get the shared process pool used for report exports (threads if unavailable)."""
+    global _pool
+    if _pool is None:
+        _pool = create_process_pool(settings.REPORT_WORKERS, "reports")
+    return _pool
+
+
+def shutdown_report_pool() -> None:
+    """Shut down the shared report process pool."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+# ============================================================================
+# CACHING AND COMPRESSION
+# ============================================================================
+
+def report_etag(session_id: str, version: int, fmt: str) -> str:
+    """
+    ETag for a report.
+
+    Reports only change when the session version does, so the tag is known
+    before rendering and a matching If-None-Match skips rendering entirely.
+    It is weak because the same tag covers every content encoding.
+    """
+    return f'W/"{session_id}-{version}-{fmt}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> str:
+    """Pick "br", "gzip" or "identity" from an Accept-Encoding header."""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        accepted.add(name.strip().lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return "identity"
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a whole body for the given content encoding."""
+    if encoding == "br":
+        return brotli.compress(body)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6)
+    return body
+
+
+def iter_compressed(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    """Compress a stream of chunks incrementally."""
+    if encoding == "identity":
+        yield from chunks
+        return
+    if encoding == "br":
+        compressor = brotli.Compressor()
+        for chunk in chunks:
+            data = compressor.process(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
+        return
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class CachedReport:
+    """A rendered report with its compressed variants."""
+
+    __slots__ = ("body", "media_type", "_encoded")
+
+    def __init__(self, body: bytes, media_type: str):
+        self.body = body
+        self.media_type = media_type
+        self._encoded: Dict[str, bytes] = {"identity": body}
+
+    def encoded(self, encoding: str) -> bytes:
+        data = self._encoded.get(encoding)
+        if data is None:
+            data = self._encoded[encoding] = compress(self.body, encoding)
+        return data
+
+    @property
+    def size(self) -> int:
+        return sum(len(data) for data in self._encoded.values())
+
+
+class ReportCache:
+    """In-process LRU of rendered reports keyed by (session, version, format)."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, CachedReport]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[CachedReport]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: tuple, report: CachedReport) -> None:
+        with self._lock:
+            # Older versions of the same session/format are now stale
+            session_id, _, fmt = key
+            for stale in [k for k in self._entries if k[0] == session_id and k[2] == fmt]:
+                del self._entries[stale]
+            self._entries[key] = report
+            self._evict()
+
+    def _evict(self) -> None:
+        total = sum(entry.size for entry in self._entries.values())
+        while self._entries and total > self.max_bytes:
+            _, entry = self._entries.popitem(last=False)
+            total -= entry.size
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,127 @@
+"""
+Answer cache for PipeWrench AI.
+Stores LLM answers in a local SQLite database keyed by the normalized
+question and everything else that shapes the answer, with TTL expiry and
+LRU eviction so repeated questions are served without a model call.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Optional
+
+from utils import logger
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Normalize a question for cache lookup (case, whitespace, end punctuation)."""
+    text = unicodedata.normalize("NFKC", question or "").lower()
+    text = _WHITESPACE.sub(" ", text).strip()
+    return text.rstrip("?.! ")
+
+
+def document_fingerprint(text: Optional[str]) -> str:
+    """Return a SHA-256 fingerprint of document text, or "" if there is none."""
+    if not text:
+        return ""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_cache_key(
+    question: str,
+    department: Optional[str],
+    role: Optional[str],
+    doc_fingerprint: str,
+    whitelist_version: str,
+) -> str:
+    """Build the cache key for a query and the context it was asked in."""
+    parts = [
+        normalize_question(question),
+        department or "",
+        role or "",
+        doc_fingerprint,
+        whitelist_version,
+    ]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed answer cache with TTL expiry and LRU eviction."""
+    
+    def __init__(self, path: str, ttl_seconds: int, max_entries: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)"
+        )
+    
+    def get(self, key: str) -> Optional[dict]:
+        """Return the cached value for key, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM responses WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl_seconds),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+        return json.loads(row[0])
+    
+    def set(self, key: str, value: dict) -> None:
+        """Store a value, then drop expired and least recently used entries."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+            self._conn.execute(
+                "DELETE FROM responses WHERE created_at <= ?", (now - self.ttl_seconds,)
+            )
+            overflow = self._count() - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    " SELECT key FROM responses ORDER BY accessed_at ASC LIMIT ?)",
+                    (overflow,),
+                )
+                logger.debug(f"Evicted {overflow} cached responses")
+    
+    def clear(self) -> None:
+        """Remove all cached responses."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+    
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._count()
+    
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
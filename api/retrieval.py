@@ -0,0 +1,148 @@
+"""
+Chunked retrieval over uploaded documents for PipeWrench AI.
+Documents are split into page-tagged chunks at upload time and indexed with
+BM25, so each query only sends the top-k relevant chunks to the model.
+"""
+
+import math
+import re
+from collections import Counter, OrderedDict
+from typing import Dict, List, Sequence, Tuple
+
+from config import settings
+
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens."""
+    return _TOKEN.findall(text.lower())
+
+
+def _split_page(text: str, chunk_chars: int, overlap: int) -> List[str]:
+    """Split one page into overlapping chunks, breaking on whitespace."""
+    text = text.strip()
+    if not text:
+        return []
+    if len(text) <= chunk_chars:
+        return [text]
+    
+    pieces = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_chars, len(text))
+        if end < len(text):
+            cut = text.rfind(" ", start + chunk_chars // 2, end)
+            if cut > start:
+                end = cut
+        pieces.append(text[start:end].strip())
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+        space = text.find(" ", start, end)
+        if space != -1:
+            start = space + 1
+    return [piece for piece in pieces if piece]
+
+
+def chunk_page(
+    page_number: int,
+    text: str,
+    chunk_chars: int = None,
+    overlap: int = None,
+) -> List[dict]:
+    """Split a single page into chunks tagged with its 1-based page number."""
+    chunk_chars = chunk_chars or settings.RETRIEVAL_CHUNK_CHARS
+    overlap = settings.RETRIEVAL_CHUNK_OVERLAP if overlap is None else overlap
+    return [
+        {"page": page_number, "text": piece}
+        for piece in _split_page(text or "", chunk_chars, overlap)
+    ]
+
+
+def chunk_pages(
+    pages: Sequence[str],
+    chunk_chars: int = None,
+    overlap: int = None,
+) -> List[dict]:
+    """
+    Split page texts into chunks tagged with their 1-based page number.
+    
+    Returns:
+        List of {"page": int, "text": str} dicts in document order
+    """
+    chunks = []
+    for page_number, page_text in enumerate(pages, 1):
+        chunks.extend(chunk_page(page_number, page_text, chunk_chars, overlap))
+    return chunks
+
+
+class BM25Index:
+    """Okapi BM25 index over a list of chunks."""
+    
+    def __init__(self, chunks: Sequence[dict], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._lengths: List[int] = []
+        
+        for chunk_id, chunk in enumerate(chunks):
+            counts = Counter(tokenize(chunk["text"]))
+            self._lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self._postings.setdefault(term, []).append((chunk_id, tf))
+        
+        n = len(chunks)
+        self._avg_length = (sum(self._lengths) / n) if n else 0.0
+        self._idf = {
+            term: math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+    
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """Return up to k (chunk_id, score) pairs, best first."""
+        scores: Dict[int, float] = {}
+        avg = self._avg_length or 1.0
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf[term]
+            for chunk_id, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[chunk_id] / avg)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+# Built indexes keyed by document fingerprint, so sessions only store chunks
+_index_cache: "OrderedDict[str, BM25Index]" = OrderedDict()
+_INDEX_CACHE_SIZE = 32
+
+
+def get_document_index(fingerprint: str, chunks: Sequence[dict]) -> BM25Index:
+    """Get (or build and cache) the BM25 index for a document's chunks."""
+    index = _index_cache.get(fingerprint)
+    if index is None:
+        index = BM25Index(chunks)
+        _index_cache[fingerprint] = index
+        if len(_index_cache) > _INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    else:
+        _index_cache.move_to_end(fingerprint)
+    return index
+
+
+def build_retrieval_context(query: str, fingerprint: str, chunks: Sequence[dict], k: int = None) -> str:
+    """
+    Build document context from the top-k chunks for a query.
+    
+    Chunks are returned in document order, each prefixed with its page
+    reference. Falls back to the first k chunks if nothing matches.
+    """
+    if not chunks:
+        return ""
+    k = k or settings.RETRIEVAL_TOP_K
+    hits = get_document_index(fingerprint, chunks).search(query, k)
+    chunk_ids = sorted(chunk_id for chunk_id, _ in hits) or list(range(min(k, len(chunks))))
+    return "\n\n".join(f"[Page {chunks[i]['page']}]\n{chunks[i]['text']}" for i in chunk_ids)
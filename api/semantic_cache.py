@@ -0,0 +1,193 @@
+"""
+Semantic answer cache for PipeWrench AI.
+Embeds questions locally (optional sentence-transformers model, or a
+hashing vectorizer fallback) and returns a prior answer when a new question
+is a near-duplicate of one already answered in the same scope.
+No network calls are made.
+"""
+
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from response_cache import normalize_question
+from utils import logger
+
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:\.[a-z0-9]+)*")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it of on or "
+    "our should the to we what when where which who why with".split()
+)
+
+
+def _tokens(text: str) -> List[str]:
+    """Tokenize a question, dropping stopwords."""
+    return [t for t in _TOKEN.findall(normalize_question(text)) if t not in _STOPWORDS]
+
+
+def _numbers(text: str) -> frozenset:
+    """Numeric tokens in a question (depths, CFR parts, etc.) that must match exactly."""
+    return frozenset(t for t in _TOKEN.findall(normalize_question(text)) if any(c.isdigit() for c in t))
+
+
+class HashingEmbedder:
+    """Feature-hashing embedder over word unigrams and bigrams."""
+    
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+    
+    def embed(self, text: str) -> np.ndarray:
+        """Return an L2-normalized float32 vector for text."""
+        tokens = _tokens(text)
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in features:
+            h = zlib.crc32(feature.encode("utf-8"))
+            vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+
+class SentenceTransformerEmbedder:
+    """Embedder backed by a locally available sentence-transformers model."""
+    
+    def __init__(self, model_name: str):
+        # Never reach out to the model hub; the model must already be on disk
+        os.environ.setdefault("HF_HUB_OFFLINE", "1")
+        from sentence_transformers import SentenceTransformer
+        
+        self._model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self._model.get_sentence_embedding_dimension()
+    
+    def embed(self, text: str) -> np.ndarray:
+        """Return an L2-normalized float32 vector for text."""
+        vector = self._model.encode(normalize_question(text), normalize_embeddings=True)
+        return np.asarray(vector, dtype=np.float32)
+
+
+def get_embedder(model_name: Optional[str] = None):
+    """Return a local model embedder if configured and available, else the hashing fallback."""
+    if model_name:
+        try:
+            return SentenceTransformerEmbedder(model_name)
+        except Exception as e:
+            logger.warning(f"Semantic cache model '{model_name}' unavailable, using hashing embedder: {e}")
+    return HashingEmbedder()
+
+
+class _ScopeIndex:
+    """
+    Ring of question vectors and their cached values.
+    
+    The vector array starts small and doubles as entries are added, so a
+    scope only pays for capacity rows once it actually holds that many;
+    when full, the oldest entries are overwritten.
+    """
+    
+    INITIAL_ROWS = 16
+    
+    def __init__(self, dim: int, capacity: int):
+        self.capacity = capacity
+        self.vectors = np.zeros((min(capacity, self.INITIAL_ROWS), dim), dtype=np.float32)
+        self.values: List[dict] = []
+        self.numbers: List[frozenset] = []
+        self.size = 0
+        self.next = 0
+    
+    def add(self, vector: np.ndarray, numbers: frozenset, value: dict) -> None:
+        if self.size < self.capacity:
+            if self.size == len(self.vectors):
+                grown = np.zeros((min(self.capacity, 2 * self.size), self.vectors.shape[1]), dtype=np.float32)
+                grown[:self.size] = self.vectors
+                self.vectors = grown
+            position = self.size
+            self.values.append(value)
+            self.numbers.append(numbers)
+            self.size += 1
+        else:
+            position = self.next
+            self.values[position] = value
+            self.numbers[position] = numbers
+            self.next = (self.next + 1) % self.capacity
+        self.vectors[position] = vector
+    
+    def best(self, vector: np.ndarray, numbers: frozenset, candidates: int = 8) -> Optional[Tuple[int, float]]:
+        """Return the most similar entry whose numeric tokens match, or None."""
+        scores = self.vectors[:self.size] @ vector
+        if self.size > candidates:
+            top = np.argpartition(-scores, candidates)[:candidates]
+            top = top[np.argsort(-scores[top])]
+        else:
+            top = np.argsort(-scores)
+        for position in top:
+            if self.numbers[position] == numbers:
+                return int(position), float(scores[position])
+        return None
+
+
+class SemanticCache:
+    """
+    Near-duplicate question cache with one NumPy index per scope.
+    
+    A scope is typically (department, role, whitelist version). Lookups
+    return the cached value of the most similar prior question when cosine
+    similarity is at least the threshold and both questions mention the
+    same numbers, so "6 ft trench" never answers "12 ft trench".
+    
+    At most max_scopes scopes are kept; the least recently used scope is
+    dropped when a new one is added.
+    """
+    
+    def __init__(
+        self,
+        embedder=None,
+        threshold: float = 0.85,
+        max_entries_per_scope: int = 1000,
+        max_scopes: int = 64,
+    ):
+        self.embedder = embedder or HashingEmbedder()
+        self.threshold = threshold
+        self.max_entries_per_scope = max_entries_per_scope
+        self.max_scopes = max_scopes
+        self._indexes: "OrderedDict[Hashable, _ScopeIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def lookup(self, scope: Hashable, question: str) -> Optional[Tuple[dict, float]]:
+        """Return (value, similarity) for the closest prior question, or None."""
+        if scope not in self._indexes:
+            return None
+        vector = self.embedder.embed(question)
+        with self._lock:
+            index = self._indexes.get(scope)
+            if index is None or index.size == 0:
+                return None
+            self._indexes.move_to_end(scope)
+            match = index.best(vector, _numbers(question))
+            if match is None or match[1] < self.threshold:
+                return None
+            return index.values[match[0]], match[1]
+    
+    def add(self, scope: Hashable, question: str, value: dict) -> None:
+        """Cache value as the answer to question within scope."""
+        vector = self.embedder.embed(question)
+        with self._lock:
+            index = self._indexes.get(scope)
+            if index is None:
+                index = self._indexes[scope] = _ScopeIndex(len(vector), self.max_entries_per_scope)
+                if len(self._indexes) > self.max_scopes:
+                    self._indexes.popitem(last=False)
+            else:
+                self._indexes.move_to_end(scope)
+            index.add(vector, _numbers(question), value)
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(index.size for index in self._indexes.values())
@@ -0,0 +1,315 @@
+"""
+Memory budgets for in-process sessions.
+Large document entries, old Q&A pairs and retrieval chunks are compressed
+to an on-disk spill store when a session (or the process as a whole)
+exceeds its budget, and are paged back transparently when read.
+"""
+
+import os
+import shutil
+import socket
+import threading
+import uuid
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from session_records import decode_session, encode_session
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate the in-memory weight of a session value in bytes."""
+    return len(encode_session(value))
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SpillStore:
+    """
+    Directory of zlib-compressed JSON blobs.
+
+    Blobs are only meaningful to the store that wrote them, so each store
+    writes to its own "<hostname>-<pid>-<token>" subdirectory of root and
+    purges stale subdirectories when it is created.
+    """
+
+    # Subdirectories of stores open in this process
+    _open_directories = set()
+
+    def __init__(self, root: str, level: int = 6):
+        self.root = root
+        self.directory = os.path.join(
+            root, f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        )
+        self.level = level
+        self.spilled_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self.purge_stale()
+        os.makedirs(self.directory, exist_ok=True)
+        SpillStore._open_directories.add(self.directory)
+
+    def _is_stale(self, name: str) -> bool:
+        host, _, rest = name.rpartition("-")
+        host, _, pid = host.rpartition("-")
+        if host != socket.gethostname() or not pid.isdigit():
+            return False
+        if int(pid) == os.getpid():
+            # A previous process with our PID, e.g. after a container restart
+            return os.path.join(self.root, name) not in SpillStore._open_directories
+        return not _pid_alive(int(pid))
+
+    def purge_stale(self) -> int:
+        """
+        Delete blobs left by earlier processes on this host.
+
+        Removes subdirectories of processes that are no longer running and
+        blobs written directly to root by older versions.
+
+        Returns:
+            Number of blobs removed
+        """
+        removed = 0
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.endswith(".z") and os.path.isfile(path):
+                os.unlink(path)
+                removed += 1
+            elif os.path.isdir(path) and self._is_stale(name):
+                removed += sum(len(files) for _, _, files in os.walk(path))
+                shutil.rmtree(path, ignore_errors=True)
+        return removed
+
+    def _path(self, ref: str) -> str:
+        return os.path.join(self.directory, ref + ".z")
+
+    def put(self, value: Any) -> tuple:
+        """Write a value and return (ref, compressed size)."""
+        ref = uuid.uuid4().hex
+        data = zlib.compress(encode_session(value).encode("utf-8"), self.level)
+        with open(self._path(ref), "wb") as f:
+            f.write(data)
+        with self._lock:
+            self.spilled_bytes += len(data)
+        return ref, len(data)
+
+    def get(self, ref: str) -> Any:
+        """Read a value back."""
+        with open(self._path(ref), "rb") as f:
+            return decode_session(zlib.decompress(f.read()).decode("utf-8"))
+
+    def delete(self, ref: str, stored_bytes: int) -> None:
+        """Remove a spilled value."""
+        try:
+            os.unlink(self._path(ref))
+        except OSError:
+            return
+        with self._lock:
+            self.spilled_bytes -= stored_bytes
+
+
+class _Spilled:
+    """Placeholder for a list item that lives in the spill store."""
+
+    __slots__ = ("ref", "size", "stored_bytes")
+
+    def __init__(self, ref: str, size: int, stored_bytes: int):
+        self.ref = ref
+        self.size = size
+        self.stored_bytes = stored_bytes
+
+
+class SpillableList:
+    """
+    Append-mostly list whose items can be moved to a SpillStore.
+
+    Reads page spilled items back from disk without making them resident
+    again, so iterating a large history does not undo the spill.
+    """
+
+    def __init__(self, spill_store: SpillStore, items: Iterable[Any] = ()):
+        self._store = spill_store
+        self._items: List[Any] = []
+        self._sizes: List[int] = []
+        self.resident_bytes = 0
+        for item in items:
+            self.append(item)
+
+    def append(self, item: Any) -> None:
+        size = estimate_size(item)
+        self._items.append(item)
+        self._sizes.append(size)
+        self.resident_bytes += size
+
+    def extend(self, items: Iterable[Any]) -> None:
+        for item in items:
+            self.append(item)
+
+    def _load(self, item: Any) -> Any:
+        return self._store.get(item.ref) if isinstance(item, _Spilled) else item
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[Any]:
+        for item in self._items:
+            yield self._load(item)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._load(item) for item in self._items[index]]
+        return self._load(self._items[index])
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (list, SpillableList)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"SpillableList(len={len(self)}, spilled={self.spilled_count})"
+
+    @property
+    def spilled_count(self) -> int:
+        return sum(1 for item in self._items if isinstance(item, _Spilled))
+
+    def spill(self, index: int) -> int:
+        """Move one item to disk, returning the resident bytes freed."""
+        item = self._items[index]
+        if isinstance(item, _Spilled):
+            return 0
+        size = self._sizes[index]
+        ref, stored_bytes = self._store.put(item)
+        self._items[index] = _Spilled(ref, size, stored_bytes)
+        self.resident_bytes -= size
+        return size
+
+    def spill_larger_than(self, threshold: int) -> int:
+        """Spill every resident item bigger than threshold bytes."""
+        return sum(
+            self.spill(i) for i, size in enumerate(self._sizes)
+            if size > threshold and not isinstance(self._items[i], _Spilled)
+        )
+
+    def spill_oldest(self, target_bytes: int, keep_recent: int = 0) -> int:
+        """Spill the oldest items until resident bytes fit target_bytes."""
+        freed = 0
+        for i in range(max(0, len(self._items) - keep_recent)):
+            if self.resident_bytes <= target_bytes:
+                break
+            freed += self.spill(i)
+        return freed
+
+    def release(self) -> None:
+        """Delete every spilled item from the store."""
+        for item in self._items:
+            if isinstance(item, _Spilled):
+                self._store.delete(item.ref, item.stored_bytes)
+        self._items = []
+        self._sizes = []
+        self.resident_bytes = 0
+
+
+class MemoryBudget:
+    """
+    Per-session and global memory budgets for session documents, Q&A and
+    retrieval chunks.
+
+    Args:
+        spill_store: Where spilled items are written
+        session_bytes: Resident bytes allowed per session
+        global_bytes: Resident bytes allowed across all sessions
+        large_item_bytes: Document entries above this size are always spilled
+        keep_recent: Newest Q&A entries kept resident under budget pressure
+    """
+
+    # Spilled in this order under pressure: chunks last, since every query
+    # reads some of them back
+    SPILLABLE_FIELDS = ("documents", "questions", "chunks")
+
+    def __init__(
+        self,
+        spill_store: SpillStore,
+        session_bytes: int,
+        global_bytes: int,
+        large_item_bytes: int,
+        keep_recent: int = 10,
+    ):
+        self.spill_store = spill_store
+        self.session_bytes = session_bytes
+        self.global_bytes = global_bytes
+        self.large_item_bytes = large_item_bytes
+        self.keep_recent = keep_recent
+        self._resident: Dict[str, int] = {}
+        self.resident_bytes = 0
+
+    def _lists(self, session: dict) -> List[SpillableList]:
+        lists = []
+        for field in self.SPILLABLE_FIELDS:
+            value = session.get(field)
+            if isinstance(value, list):
+                value = session[field] = SpillableList(self.spill_store, value)
+            if isinstance(value, SpillableList):
+                lists.append(value)
+        return lists
+
+    def _record(self, session_id: str, resident: int) -> None:
+        self.resident_bytes += resident - self._resident.get(session_id, 0)
+        self._resident[session_id] = resident
+
+    def enforce(self, session_id: str, session: dict) -> None:
+        """Apply the per-session budget and record the session's resident size."""
+        lists = self._lists(session)
+        documents = session.get("documents")
+        if isinstance(documents, SpillableList):
+            documents.spill_larger_than(self.large_item_bytes)
+        resident = sum(items.resident_bytes for items in lists)
+        for items in lists:
+            if resident <= self.session_bytes:
+                break
+            resident -= items.spill_oldest(
+                items.resident_bytes - (resident - self.session_bytes), self.keep_recent
+            )
+        self._record(session_id, resident)
+
+    def enforce_global(self, sessions: Iterable[tuple]) -> int:
+        """
+        Spill from the given (session_id, session) pairs, least recently
+        used first, until the global budget is met.
+
+        Returns:
+            Resident bytes freed
+        """
+        freed = 0
+        for session_id, session in sessions:
+            if self.resident_bytes <= self.global_bytes:
+                break
+            for items in self._lists(session):
+                freed += items.spill_oldest(0)
+            self._record(session_id, 0)
+        return freed
+
+    def release(self, session_id: str, session: Optional[dict]) -> None:
+        """Forget a deleted session and remove its spilled data."""
+        if session is not None:
+            for field in self.SPILLABLE_FIELDS:
+                value = session.get(field)
+                if isinstance(value, SpillableList):
+                    value.release()
+        self._record(session_id, 0)
+        del self._resident[session_id]
+
+    def metrics(self) -> dict:
+        """Return resident and spilled byte counts."""
+        return {
+            "resident_bytes": self.resident_bytes,
+            "spilled_bytes": self.spill_store.spilled_bytes,
+            "session_budget_bytes": self.session_bytes,
+            "global_budget_bytes": self.global_bytes,
+        }
@@ -0,0 +1,178 @@
+"""
+Compact record types for session data.
+Sessions, documents and Q&A entries are __slots__ objects instead of dicts:
+department and role strings are interned and timestamps are stored as epoch
+floats. Each record still supports the mapping operations the rest of the
+app uses (record["field"], .get(), "field" in record, assignment).
+"""
+
+import json
+import sys
+from datetime import datetime
+from typing import Any, Iterator, Optional
+
+
+_MISSING = object()
+
+
+def _to_epoch(value: Any) -> Optional[float]:
+    if value is None or isinstance(value, float):
+        return value
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        return datetime.fromisoformat(value).timestamp()
+    return float(value)
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Record:
+    """
+    Base for __slots__ records with a dict-like interface.
+
+    Subclasses list their fields in __slots__. Fields named in
+    DATETIME_FIELDS read back as datetimes and fields in ISO_FIELDS as ISO
+    strings; both are stored as epoch floats. Unset fields behave like
+    missing dict keys.
+    """
+
+    __slots__ = ()
+    DATETIME_FIELDS: frozenset = frozenset()
+    ISO_FIELDS: frozenset = frozenset()
+    INTERNED_FIELDS: frozenset = frozenset()
+
+    def __init__(self, **fields):
+        for name, value in fields.items():
+            self[name] = value
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Record":
+        if isinstance(data, cls):
+            return data
+        return cls(**data)
+
+    def __setitem__(self, name: str, value: Any) -> None:
+        if name not in self.__slots__:
+            raise KeyError(name)
+        if name in self.DATETIME_FIELDS or name in self.ISO_FIELDS:
+            value = _to_epoch(value)
+        elif name in self.INTERNED_FIELDS:
+            value = _intern(value)
+        object.__setattr__(self, name, value)
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in self.__slots__:
+            raise KeyError(name)
+        value = getattr(self, name, _MISSING)
+        if value is _MISSING:
+            raise KeyError(name)
+        if value is not None:
+            if name in self.DATETIME_FIELDS:
+                return datetime.fromtimestamp(value)
+            if name in self.ISO_FIELDS:
+                return datetime.fromtimestamp(value).isoformat()
+        return value
+
+    def get(self, name: str, default: Any = None) -> Any:
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.__slots__ and hasattr(self, name)
+
+    def keys(self) -> Iterator[str]:
+        return (name for name in self.__slots__ if hasattr(self, name))
+
+    def __iter__(self) -> Iterator[str]:
+        return self.keys()
+
+    def items(self):
+        return ((name, self[name]) for name in self.keys())
+
+    def update(self, fields: dict = (), **more) -> None:
+        for name, value in dict(fields, **more).items():
+            self[name] = value
+
+    def to_dict(self) -> dict:
+        return dict(self.items())
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (dict, Record)):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class QARecord(Record):
+    """One question and answer in a session."""
+
+    __slots__ = ("question", "answer", "department", "role", "timestamp")
+    ISO_FIELDS = frozenset({"timestamp"})
+    INTERNED_FIELDS = frozenset({"department", "role"})
+
+
+class DocumentRecord(Record):
+    """One analysed document in a session."""
+
+    __slots__ = ("filename", "department", "role", "analysis", "file_size", "uploaded_at")
+    ISO_FIELDS = frozenset({"uploaded_at"})
+    INTERNED_FIELDS = frozenset({"department", "role"})
+
+
+class SessionRecord(Record):
+    """
+    A user session: Q&A history, analysed documents and, for /upload
+    sessions, the retrieval chunks of the uploaded PDF.
+    """
+
+    __slots__ = (
+        "created_at",
+        "last_accessed",
+        "questions",
+        "documents",
+        "filename",
+        "chunks",
+        "fingerprint",
+        "page_count",
+        "uploaded_at",
+        "is_asbuilt",
+        "version",
+    )
+    DATETIME_FIELDS = frozenset({"created_at", "last_accessed"})
+    ISO_FIELDS = frozenset({"uploaded_at"})
+
+    def __setitem__(self, name: str, value: Any) -> None:
+        if name == "questions" and isinstance(value, list):
+            value = [QARecord.from_dict(item) for item in value]
+        elif name == "documents" and isinstance(value, list):
+            value = [DocumentRecord.from_dict(item) for item in value]
+        super().__setitem__(name, value)
+
+
+def encode_session(session) -> str:
+    """Serialize a session to JSON, preserving datetimes."""
+    def default(value):
+        if isinstance(value, datetime):
+            return {"$datetime": value.isoformat()}
+        if isinstance(value, Record):
+            return value.to_dict()
+        if hasattr(value, "__iter__"):
+            return list(value)
+        raise TypeError(f"Cannot serialize {type(value).__name__}")
+    return json.dumps(session, default=default)
+
+
+def decode_session(data) -> dict:
+    """Deserialize a session produced by encode_session."""
+    def object_hook(obj):
+        if len(obj) == 1 and "$datetime" in obj:
+            return datetime.fromisoformat(obj["$datetime"])
+        return obj
+    return json.loads(data, object_hook=object_hook)
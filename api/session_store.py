@@ -0,0 +1,284 @@
+"""
+Session storage backends for PipeWrench AI.
+Sessions can live in process memory, in a local SQLite database or in a
+Redis-protocol server so they survive restarts and are shared by workers.
+Expiry is handled by each backend rather than by scanning in Python.
+"""
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Iterator, Optional
+
+from config import settings
+from session_memory import MemoryBudget, SpillStore
+from session_records import SessionRecord, decode_session, encode_session
+
+
+class SessionStore:
+    """
+    Interface for session backends.
+
+    Sessions are SessionRecords (or plain dicts). Mutating a returned session is only
+    guaranteed to persist after it is passed back to set().
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, session_id: str) -> Optional[dict]:
+        """Return the session, or None if missing or expired."""
+        raise NotImplementedError
+
+    def set(self, session_id: str, session: dict) -> None:
+        """Store the session and restart its TTL."""
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> bool:
+        """Delete the session, returning True if it existed."""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        """Return the number of live sessions."""
+        raise NotImplementedError
+
+    def cleanup_expired(self) -> int:
+        """Remove expired sessions the backend has not already dropped."""
+        return 0
+
+    def memory_metrics(self) -> Optional[dict]:
+        """Return resident/spilled byte counts for in-process backends."""
+        return None
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    def __getitem__(self, session_id: str) -> dict:
+        session = self.get(session_id)
+        if session is None:
+            raise KeyError(session_id)
+        return session
+
+    def __setitem__(self, session_id: str, session: dict) -> None:
+        self.set(session_id, session)
+
+    def __delitem__(self, session_id: str) -> None:
+        if not self.delete(session_id):
+            raise KeyError(session_id)
+
+    def __len__(self) -> int:
+        return self.count()
+
+
+class MemorySessionStore(SessionStore):
+    """
+    In-process session store.
+
+    Sessions are held as live dicts, so in-place changes are visible
+    immediately. Expiry is measured from each session's last_accessed time.
+    Sessions are kept in an OrderedDict ordered by last_accessed: set()
+    moves a session to the end only when its last_accessed changed, so
+    saving a session without touching it (e.g. adding a question) keeps its
+    place, the least recently accessed are at the front and cleanup stops
+    at the first live session.
+    With a MemoryBudget, documents and Q&A history beyond the budgets are
+    spilled to disk, least recently used sessions first.
+    """
+
+    def __init__(self, ttl_seconds: float, budget: Optional[MemoryBudget] = None):
+        super().__init__(ttl_seconds)
+        self.budget = budget
+        self._sessions: "OrderedDict[str, dict]" = OrderedDict()
+        self._accessed: dict = {}  # session_id -> last_accessed when last moved
+
+    def _drop(self, session_id: str) -> Optional[dict]:
+        session = self._sessions.pop(session_id, None)
+        self._accessed.pop(session_id, None)
+        if session is not None and self.budget is not None:
+            self.budget.release(session_id, session)
+        return session
+
+    def _expired(self, session: dict, now: datetime) -> bool:
+        last_accessed = session.get("last_accessed")
+        return last_accessed is not None and (now - last_accessed).total_seconds() > self.ttl_seconds
+
+    def get(self, session_id: str) -> Optional[dict]:
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        if self._expired(session, datetime.now()):
+            self._drop(session_id)
+            return None
+        return session
+
+    def set(self, session_id: str, session: dict) -> None:
+        last_accessed = session["last_accessed"] if "last_accessed" in session else None
+        self._sessions[session_id] = session
+        if session_id not in self._accessed or self._accessed[session_id] != last_accessed:
+            self._sessions.move_to_end(session_id)
+            self._accessed[session_id] = last_accessed
+        if self.budget is not None:
+            self.budget.enforce(session_id, session)
+            if self.budget.resident_bytes > self.budget.global_bytes:
+                self.budget.enforce_global(list(self._sessions.items()))
+
+    def delete(self, session_id: str) -> bool:
+        return self._drop(session_id) is not None
+
+    def count(self) -> int:
+        return len(self._sessions)
+
+    def cleanup_expired(self) -> int:
+        now = datetime.now()
+        removed = 0
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if not self._expired(session, now):
+                break
+            self._drop(session_id)
+            removed += 1
+        return removed
+
+    def memory_metrics(self) -> Optional[dict]:
+        if self.budget is None:
+            return None
+        return self.budget.metrics()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._sessions))
+
+
+class SQLiteSessionStore(SessionStore):
+    """Session store in a local SQLite database, shared by all processes on a host."""
+
+    def __init__(self, path: str, ttl_seconds: float, clock=time.time):
+        super().__init__(ttl_seconds)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " id TEXT PRIMARY KEY,"
+            " data TEXT NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires_at)")
+
+    def get(self, session_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM sessions WHERE id = ? AND expires_at > ?",
+                (session_id, self._clock()),
+            ).fetchone()
+        return SessionRecord.from_dict(decode_session(row[0])) if row else None
+
+    def set(self, session_id: str, session: dict) -> None:
+        data = encode_session(session)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, data, expires_at) VALUES (?, ?, ?)",
+                (session_id, data, self._clock() + self.ttl_seconds),
+            )
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+        return cursor.rowcount > 0
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM sessions WHERE expires_at > ?", (self._clock(),)
+            ).fetchone()[0]
+
+    def cleanup_expired(self) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM sessions WHERE expires_at <= ?", (self._clock(),)
+            )
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Session store on a Redis-protocol server; keys expire via SET EX.
+
+    A sorted set of session ids scored by expiry time sits next to the
+    session keys, so count() trims and reads it instead of SCANning the
+    whole keyspace.
+    """
+
+    def __init__(self, ttl_seconds: float, url: Optional[str] = None, client=None,
+                 prefix: str = "pipewrench:session:", clock=time.time):
+        super().__init__(ttl_seconds)
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self._client = client
+        self._prefix = prefix
+        self._clock = clock
+        # Session ids are UUIDs, so this cannot collide with a session key
+        self._index_key = prefix + "_expiry_index"
+
+    def _key(self, session_id: str) -> str:
+        return self._prefix + session_id
+
+    def get(self, session_id: str) -> Optional[dict]:
+        data = self._client.get(self._key(session_id))
+        return SessionRecord.from_dict(decode_session(data)) if data is not None else None
+
+    def set(self, session_id: str, session: dict) -> None:
+        ttl = max(1, int(self.ttl_seconds))
+        pipe = self._client.pipeline()
+        pipe.set(self._key(session_id), encode_session(session), ex=ttl)
+        pipe.zadd(self._index_key, {session_id: self._clock() + ttl})
+        pipe.execute()
+
+    def delete(self, session_id: str) -> bool:
+        pipe = self._client.pipeline()
+        pipe.delete(self._key(session_id))
+        pipe.zrem(self._index_key, session_id)
+        deleted, _ = pipe.execute()
+        return deleted > 0
+
+    def count(self) -> int:
+        pipe = self._client.pipeline()
+        pipe.zremrangebyscore(self._index_key, "-inf", self._clock())
+        pipe.zcard(self._index_key)
+        _, live = pipe.execute()
+        return live
+
+
+def create_session_store(backend: Optional[str] = None) -> SessionStore:
+    """
+    Create the session store selected by SESSION_BACKEND.
+
+    Args:
+        backend: "memory", "sqlite" or "redis"; defaults to the setting
+
+    Returns:
+        SessionStore instance
+    """
+    backend = (backend or settings.SESSION_BACKEND).lower()
+    ttl_seconds = settings.SESSION_TIMEOUT_HOURS * 3600
+    if backend == "memory":
+        budget = MemoryBudget(
+            SpillStore(settings.SESSION_SPILL_DIR),
+            session_bytes=settings.SESSION_MEMORY_BUDGET_MB * 1024 * 1024,
+            global_bytes=settings.SESSION_GLOBAL_MEMORY_BUDGET_MB * 1024 * 1024,
+            large_item_bytes=settings.SESSION_SPILL_ITEM_KB * 1024,
+            keep_recent=settings.SESSION_KEEP_RECENT_QUESTIONS,
+        )
+        return MemorySessionStore(ttl_seconds, budget=budget)
+    if backend == "sqlite":
+        return SQLiteSessionStore(settings.SESSION_SQLITE_PATH, ttl_seconds)
+    if backend == "redis":
+        return RedisSessionStore(ttl_seconds, url=settings.SESSION_REDIS_URL)
+    raise ValueError(f"Unknown session backend: {backend}")
@@ -0,0 +1,134 @@
+"""
+Incremental URL scanner for whitelist enforcement.
+Finds URLs in text fed chunk by chunk (e.g. as a model streams its answer),
+carrying partial URLs across chunk boundaries, and checks each one against
+the compiled whitelist through a verdict cache.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+from url_whitelist_config import get_whitelist_index
+from whitelist_index import WhitelistIndex
+
+
+URL_REGEX = re.compile(r'https?://[^\s<>"\']+')
+TRAILING_PUNCTUATION = '.,);]'
+# Longest text that can start a URL without matching yet ("https://")
+_SCHEME_TAIL = len("https://")
+VERDICT_CACHE_SIZE = 10000
+
+
+class VerdictCache:
+    """LRU of URL -> whitelisted verdicts for one compiled index."""
+
+    def __init__(self, max_entries: int = VERDICT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._index: Optional[WhitelistIndex] = None
+        self._verdicts: "OrderedDict[str, bool]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, index: WhitelistIndex, url: str) -> bool:
+        """Return whether url is whitelisted, caching the verdict."""
+        with self._lock:
+            if index is not self._index:
+                # The whitelist changed; earlier verdicts no longer apply
+                self._index = index
+                self._verdicts.clear()
+            verdict = self._verdicts.get(url)
+            if verdict is not None:
+                self._verdicts.move_to_end(url)
+                return verdict
+        verdict = index.matches(url)
+        with self._lock:
+            if index is self._index:
+                self._verdicts[url] = verdict
+                if len(self._verdicts) > self.max_entries:
+                    self._verdicts.popitem(last=False)
+        return verdict
+
+
+_verdict_cache = VerdictCache()
+
+
+def clean_url(url: str) -> str:
+    """Strip trailing punctuation picked up from surrounding prose."""
+    return url.rstrip(TRAILING_PUNCTUATION)
+
+
+def format_compliance_notice(bad_urls: Iterable[str]) -> str:
+    """Build the compliance notice for non-whitelisted URLs, or ""."""
+    bad_urls = sorted(bad_urls)
+    if not bad_urls:
+        return ""
+    return "\n\n[COMPLIANCE NOTICE]\n" \
+           "The following URLs are not in the approved whitelist and must not be cited:\n" + \
+           "\n".join(f"- {u}" for u in bad_urls) + \
+           "\n\nPlease revise citations to use only approved sources."
+
+
+class StreamingURLScanner:
+    """
+    Scan text for URLs incrementally.
+
+    feed() returns the URLs completed by each chunk; a URL running up to
+    the end of a chunk is held back until the next chunk (or finish())
+    shows where it ends. Non-whitelisted URLs are collected for notice().
+    """
+
+    def __init__(self, index: Optional[WhitelistIndex] = None, verdicts: Optional[VerdictCache] = None):
+        if verdicts is None:
+            # The shared cache serves the default whitelist; giving it other
+            # indexes (e.g. per-organization ones) would keep clearing it
+            verdicts = _verdict_cache if index is None else VerdictCache()
+        self.index = index if index is not None else get_whitelist_index()
+        self.verdicts = verdicts
+        self.bad_urls = set()
+        self._seen = set()
+        self._tail = ""
+
+    def _check(self, raw: str, found: List[str]) -> None:
+        url = clean_url(raw)
+        if url in self._seen:
+            return
+        self._seen.add(url)
+        found.append(url)
+        if not self.verdicts.check(self.index, url):
+            self.bad_urls.add(url)
+
+    def feed(self, chunk: str) -> List[str]:
+        """Scan a chunk of text, returning URLs completed so far."""
+        buffer = self._tail + chunk
+        found: List[str] = []
+        keep_from = max(0, len(buffer) - _SCHEME_TAIL)
+        for match in URL_REGEX.finditer(buffer):
+            if match.end() == len(buffer):
+                # May continue in the next chunk
+                keep_from = match.start()
+                break
+            self._check(match.group(), found)
+            keep_from = max(keep_from, match.end())
+        self._tail = buffer[keep_from:]
+        return found
+
+    def finish(self) -> List[str]:
+        """Flush any URL held back at the end of the text."""
+        found: List[str] = []
+        for match in URL_REGEX.finditer(self._tail):
+            self._check(match.group(), found)
+        self._tail = ""
+        return found
+
+    def notice(self) -> str:
+        """Return the compliance notice for the URLs seen so far, or ""."""
+        return format_compliance_notice(self.bad_urls)
+
+
+def scan_text(text: str, index: Optional[WhitelistIndex] = None) -> StreamingURLScanner:
+    """Scan a complete text in one call."""
+    scanner = StreamingURLScanner(index)
+    scanner.feed(text or "")
+    scanner.finish()
+    return scanner
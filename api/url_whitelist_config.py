@@ -6,10 +6,25 @@ Plus support for custom organization URLs
 Version: 2.0.1 - Vercel cache-bust fix (2025-10-31 13:15 UTC)
 """
 
+from collections import OrderedDict
+from contextlib import contextmanager
 from urllib.parse import urlparse
-from typing import List, Dict
+from types import MappingProxyType
+from typing import Container, Iterable, Iterator, List, Dict, Optional
+import hashlib
 import json
 import os
+import re
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: edits are only serialized within the process
+    fcntl = None
+
+from config import settings
+from whitelist_index import OverlayIndex, SortedWhitelist, WhitelistIndex, split_url
 
 # Base whitelisted URLs (federal and state sources)
 BASE_WHITELISTED_URLS = [
@@ -144,32 +159,233 @@ BASE_WHITELISTED_URLS = [
 # Path to custom URLs file
 CUSTOM_URLS_FILE = os.path.join(os.path.dirname(__file__), "custom_whitelist.json")
 
-def load_custom_urls() -> List[Dict[str, any]]:
-    """Load custom URLs from JSON file"""
-    try:
-        if os.path.exists(CUSTOM_URLS_FILE):
-            with open(CUSTOM_URLS_FILE, 'r') as f:
-                return json.load(f)
-    except Exception as e:
-        print(f"Error loading custom URLs: {e}")
-    return []
+# Per-organization custom URL files live here as <org_id>.json
+ORG_WHITELIST_DIR = os.getenv("ORG_WHITELIST_DIR", os.path.join(os.path.dirname(__file__), "org_whitelists"))
+ORG_CACHE_SIZE = int(os.getenv("ORG_WHITELIST_CACHE_SIZE", "256"))
+ORG_ID_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
 
-def save_custom_urls(custom_urls: List[Dict[str, any]]) -> bool:
-    """Save custom URLs to JSON file"""
-    try:
-        with open(CUSTOM_URLS_FILE, 'w') as f:
-            json.dump(custom_urls, f, indent=2)
+class CustomURLStore:
+    """
+    In-memory cache of the custom URLs file.
+    
+    The parsed list is kept in memory and only re-read when the file's
+    mtime/size/inode changes or the store is explicitly invalidated.
+    Saves are written to a temp file and atomically renamed into place so
+    readers never see a partially written file; edits hold locked() so
+    concurrent read-modify-write cycles cannot lose each other's changes.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._urls: List[Dict[str, any]] = []
+        self._signature: Optional[tuple] = None
+        self._loaded = False
+        self._version = 0
+        self._lock = threading.Lock()
+        self._edit_lock = threading.Lock()
+    
+    def _file_signature(self) -> Optional[tuple]:
+        """Return (mtime, size, inode) of the file, or None if absent."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+    
+    def _refresh(self) -> None:
+        """Reload the file if it changed since the last read."""
+        signature = self._file_signature()
+        if self._loaded and signature == self._signature:
+            return
+        with self._lock:
+            if self._loaded and signature == self._signature:
+                return
+            urls: List[Dict[str, any]] = []
+            if signature is not None:
+                try:
+                    with open(self.path, 'r') as f:
+                        urls = json.load(f)
+                except Exception as e:
+                    print(f"Error loading custom URLs: {e}")
+            if not self._loaded or urls != self._urls:
+                self._version += 1
+            self._urls = urls
+            self._signature = signature
+            self._loaded = True
+    
+    @property
+    def version(self) -> int:
+        """Generation counter, bumped whenever the custom list changes."""
+        self._refresh()
+        return self._version
+    
+    def load(self) -> List[Dict[str, any]]:
+        """Return a copy of the cached custom URL list."""
+        self._refresh()
+        return list(self._urls)
+    
+    def save(self, custom_urls: List[Dict[str, any]]) -> bool:
+        """Atomically write the custom URL list and update the cache."""
+        directory = os.path.dirname(self.path) or "."
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".custom_whitelist.", suffix=".tmp")
+            with os.fdopen(fd, 'w') as f:
+                json.dump(custom_urls, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            tmp_path = None
+        except Exception as e:
+            print(f"Error saving custom URLs: {e}")
+            return False
+        finally:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        
+        with self._lock:
+            self._urls = list(custom_urls)
+            self._signature = self._file_signature()
+            self._loaded = True
+            self._version += 1
         return True
-    except Exception as e:
-        print(f"Error saving custom URLs: {e}")
-        return False
+    
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """
+        Hold the store's edit lock: a thread lock plus an exclusive flock on
+        "<path>.lock", which also covers other worker processes.
+        """
+        with self._edit_lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path + ".lock", "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+    
+    def invalidate(self) -> None:
+        """Force the next read to reload from disk."""
+        with self._lock:
+            self._loaded = False
+
+
+_custom_store = CustomURLStore(CUSTOM_URLS_FILE)
+
+
+class UnknownOrganizationError(ValueError):
+    """A well-formed organization ID that is not registered."""
+
+
+def validate_org_id(org_id: str) -> str:
+    """Return org_id if it is a valid organization ID, else raise ValueError."""
+    if not isinstance(org_id, str) or not ORG_ID_PATTERN.match(org_id):
+        raise ValueError(f"Invalid organization ID: {org_id!r}")
+    return org_id
+
+
+class OrgWhitelists:
+    """
+    LRU of per-organization custom URL stores and their snapshots.
+    
+    Each organization's overlay sits on top of BASE_WHITELISTED_URLS in its
+    own file, and its snapshot shares the compiled base index rather than
+    rebuilding it. Looking up a tenant is a dict hit, so matching costs the
+    same with one organization or thousands; tenants that fall out of the
+    LRU are reloaded from disk on their next request.
+    
+    Only registered organizations (org_ids, by default the keys of
+    ORG_API_KEYS) get a tenant; other IDs raise UnknownOrganizationError.
+    """
+    
+    def __init__(
+        self,
+        directory: str,
+        max_tenants: int = ORG_CACHE_SIZE,
+        org_ids: Optional[Container[str]] = None,
+    ):
+        self.directory = directory
+        self.max_tenants = max_tenants
+        self.org_ids = org_ids
+        self._tenants: "OrderedDict[str, list]" = OrderedDict()  # org_id -> [store, key, snapshot]
+        self._lock = threading.Lock()
+    
+    def _tenant(self, org_id: str) -> list:
+        tenant = self._tenants.get(org_id)
+        if tenant is not None:
+            self._tenants.move_to_end(org_id)
+            return tenant
+        validate_org_id(org_id)
+        org_ids = settings.ORG_API_KEYS if self.org_ids is None else self.org_ids
+        if org_id not in org_ids:
+            raise UnknownOrganizationError(f"Unknown organization: {org_id}")
+        tenant = self._tenants[org_id] = [
+            CustomURLStore(os.path.join(self.directory, org_id + ".json")), None, None,
+        ]
+        if len(self._tenants) > self.max_tenants:
+            self._tenants.popitem(last=False)
+        return tenant
+    
+    def store(self, org_id: str) -> CustomURLStore:
+        """Get the custom URL store for an organization."""
+        with self._lock:
+            return self._tenant(org_id)[0]
+    
+    def snapshot(self, org_id: str) -> "WhitelistSnapshot":
+        """Get the whitelist snapshot for an organization."""
+        with self._lock:
+            tenant = self._tenant(org_id)
+            store = tenant[0]
+            base = get_base_snapshot()
+            key = (id(base), store.version)
+            if tenant[2] is None or tenant[1] != key:
+                tenant[2] = WhitelistSnapshot(store.load(), base=base)
+                tenant[1] = key
+            return tenant[2]
+    
+    def __len__(self) -> int:
+        return len(self._tenants)
+
+
+_org_whitelists = OrgWhitelists(ORG_WHITELIST_DIR)
 
-def get_all_whitelisted_urls() -> List[Dict[str, any]]:
+
+def _store_for(org_id: Optional[str]) -> CustomURLStore:
+    """Get the custom URL store for an organization, or the shared one."""
+    return _custom_store if org_id is None else _org_whitelists.store(org_id)
+
+def load_custom_urls(org_id: Optional[str] = None) -> List[Dict[str, any]]:
+    """Load custom URLs (cached, reloaded only when the file changes)"""
+    return _store_for(org_id).load()
+
+def save_custom_urls(custom_urls: List[Dict[str, any]], org_id: Optional[str] = None) -> bool:
+    """Save custom URLs to JSON file"""
+    store = _store_for(org_id)
+    if org_id is not None:
+        os.makedirs(os.path.dirname(store.path), exist_ok=True)
+    return store.save(custom_urls)
+
+def get_whitelist_version(org_id: Optional[str] = None) -> int:
+    """
+    Get the whitelist generation counter
+    
+    Args:
+        org_id: Organization whose custom whitelist to check (None for the shared one)
+    
+    Returns:
+        Integer that changes whenever that custom whitelist changes
+    """
+    return _store_for(org_id).version
+
+def get_all_whitelisted_urls(org_id: Optional[str] = None) -> List[Dict[str, any]]:
     """Get combined list of base + custom URLs"""
-    custom_urls = load_custom_urls()
+    custom_urls = load_custom_urls(org_id)
     return BASE_WHITELISTED_URLS + custom_urls
 
-def get_total_whitelisted_urls() -> int:
+def get_total_whitelisted_urls(org_id: Optional[str] = None) -> int:
     """
     Get total count of whitelisted URLs (base + custom)
     
@@ -178,12 +394,17 @@ def get_total_whitelisted_urls() -> int:
     
     Note: This function is imported by main.py for display purposes
     """
-    return len(get_all_whitelisted_urls())
+    return get_whitelist_snapshot(org_id).count
 
 # Dynamic WHITELISTED_URLS that includes custom URLs
 WHITELISTED_URLS = get_all_whitelisted_urls()
 
-def add_custom_url(url: str, include_children: bool = True, description: str = "") -> Dict[str, any]:
+def add_custom_url(
+    url: str,
+    include_children: bool = True,
+    description: str = "",
+    org_id: Optional[str] = None,
+) -> Dict[str, any]:
     """
     Add a custom URL to the whitelist
     
@@ -191,6 +412,7 @@ def add_custom_url(url: str, include_children: bool = True, description: str = "
         url: The URL to add
         include_children: Whether to include child pages
         description: Optional description of the source
+        org_id: Organization whose whitelist to change (None for the shared one)
         
     Returns:
         Dictionary with success status and message
@@ -203,76 +425,231 @@ def add_custom_url(url: str, include_children: bool = True, description: str = "
     except Exception as e:
         return {"success": False, "message": f"Invalid URL: {str(e)}"}
     
-    # Load existing custom URLs
-    custom_urls = load_custom_urls()
-    
-    # Check if URL already exists
-    for entry in custom_urls:
-        if entry["url"] == url:
-            return {"success": False, "message": "URL already in custom whitelist"}
-    
     # Check if URL is in base whitelist
     for entry in BASE_WHITELISTED_URLS:
         if entry["url"] == url:
             return {"success": False, "message": "URL already in base whitelist"}
     
-    # Add new URL
-    new_entry = {
-        "url": url,
-        "include_children": include_children,
-        "description": description,
-        "added_date": None  # Will be set by backend
-    }
-    
-    custom_urls.append(new_entry)
+    try:
+        store = _store_for(org_id)
+    except ValueError as e:
+        return {"success": False, "message": str(e)}
+    with store.locked():
+        # Re-read under the lock in case another worker changed the list
+        store.invalidate()
+        custom_urls = store.load()
+        
+        # Check if URL already exists
+        for entry in custom_urls:
+            if entry["url"] == url:
+                return {"success": False, "message": "URL already in custom whitelist"}
+        
+        # Add new URL
+        custom_urls.append({
+            "url": url,
+            "include_children": include_children,
+            "description": description,
+            "added_date": None  # Will be set by backend
+        })
+        saved = store.save(custom_urls)
     
-    # Save to file
-    if save_custom_urls(custom_urls):
+    if not saved:
+        return {"success": False, "message": "Failed to save custom URL"}
+    if org_id is None:
         # Refresh the global WHITELISTED_URLS
         global WHITELISTED_URLS
         WHITELISTED_URLS = get_all_whitelisted_urls()
-        return {"success": True, "message": "URL added successfully"}
-    else:
-        return {"success": False, "message": "Failed to save custom URL"}
+    return {"success": True, "message": "URL added successfully"}
 
-def remove_custom_url(url: str) -> Dict[str, any]:
+def remove_custom_url(url: str, org_id: Optional[str] = None) -> Dict[str, any]:
     """
     Remove a custom URL from the whitelist
     
     Args:
         url: The URL to remove
+        org_id: Organization whose whitelist to change (None for the shared one)
         
     Returns:
         Dictionary with success status and message
     """
-    custom_urls = load_custom_urls()
-    
-    # Find and remove the URL
-    original_length = len(custom_urls)
-    custom_urls = [entry for entry in custom_urls if entry["url"] != url]
-    
-    if len(custom_urls) == original_length:
-        return {"success": False, "message": "URL not found in custom whitelist"}
+    try:
+        store = _store_for(org_id)
+    except ValueError as e:
+        return {"success": False, "message": str(e)}
+    with store.locked():
+        # Re-read under the lock in case another worker changed the list
+        store.invalidate()
+        custom_urls = store.load()
+        
+        # Find and remove the URL
+        original_length = len(custom_urls)
+        custom_urls = [entry for entry in custom_urls if entry["url"] != url]
+        
+        if len(custom_urls) == original_length:
+            return {"success": False, "message": "URL not found in custom whitelist"}
+        saved = store.save(custom_urls)
     
-    # Save updated list
-    if save_custom_urls(custom_urls):
+    if not saved:
+        return {"success": False, "message": "Failed to save changes"}
+    if org_id is None:
         # Refresh the global WHITELISTED_URLS
         global WHITELISTED_URLS
         WHITELISTED_URLS = get_all_whitelisted_urls()
-        return {"success": True, "message": "URL removed successfully"}
-    else:
-        return {"success": False, "message": "Failed to save changes"}
+    return {"success": True, "message": "URL removed successfully"}
 
-def get_custom_urls() -> List[Dict[str, any]]:
+def get_custom_urls(org_id: Optional[str] = None) -> List[Dict[str, any]]:
     """Get list of custom URLs only"""
-    return load_custom_urls()
+    return load_custom_urls(org_id)
 
-def is_url_whitelisted(url: str) -> bool:
+class WhitelistSnapshot:
+    """
+    Immutable view of the whitelist at one version.
+    
+    Holds the entries, their parsed (host, path) tuples, the sorted domain
+    list, counts, a content hash, the compiled index and a sorted index for
+    browsing. One snapshot is
+    built per whitelist change and shared by every reader, so nothing
+    re-parses the list per request.
+    
+    With a base snapshot, entries are custom URLs added on top of it: the
+    base's parsed entries and compiled index are shared, and only the
+    custom entries are parsed, indexed and merged into the sorted view.
+    """
+    
+    __slots__ = ("entries", "parsed", "domains", "count", "custom_count", "version", "index", "sorted_index")
+    
+    def __init__(
+        self,
+        entries: Iterable[Dict[str, any]],
+        custom_count: int = 0,
+        base: Optional["WhitelistSnapshot"] = None,
+    ):
+        entries = tuple(MappingProxyType(dict(entry)) for entry in entries)
+        parsed = tuple(split_url(entry["url"]) for entry in entries)
+        digest = hashlib.sha256(
+            json.dumps([dict(entry) for entry in entries], sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+        index = WhitelistIndex(entries)
+        items = ((host, path, entry["url"]) for (host, path), entry in zip(parsed, entries))
+        if base is None:
+            sorted_index = SortedWhitelist(items)
+        else:
+            custom_count = base.custom_count + len(entries)
+            sorted_index = base.sorted_index.extended(items, base.count)
+            digest = hashlib.sha256((base.version + digest).encode("utf-8")).hexdigest()
+            index = OverlayIndex(base.index, index)
+            entries = base.entries + entries
+            parsed = base.parsed + parsed
+        init = super().__setattr__
+        init("entries", entries)
+        init("parsed", parsed)
+        init("domains", tuple(sorted({host for host, _ in parsed if host})))
+        init("count", len(entries))
+        init("custom_count", custom_count)
+        init("version", digest[:16])
+        init("index", index)
+        init("sorted_index", sorted_index)
+    
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError("WhitelistSnapshot is immutable")
+    
+    @property
+    def base_count(self) -> int:
+        return self.count - self.custom_count
+    
+    @property
+    def etag(self) -> str:
+        """Strong ETag for responses derived only from this snapshot."""
+        return f'"{self.version}"'
+    
+    def browse(
+        self,
+        domain: Optional[str] = None,
+        prefix: Optional[str] = None,
+        query: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50,
+    ) -> Dict[str, any]:
+        """
+        Get one page of entries in (host, path) order
+        
+        Filters are combined; see SortedWhitelist.page for their meaning.
+        Raises ValueError for a malformed cursor.
+        
+        Returns:
+            Dictionary with the page's entries and next_cursor (None on the last page)
+        """
+        positions, next_cursor = self.sorted_index.page(domain, prefix, query, cursor, limit)
+        return {
+            "entries": [dict(self.entries[position]) for position in positions],
+            "next_cursor": next_cursor,
+        }
+
+
+# Snapshot caches, rebuilt only when the base list or custom list changes
+_base_snapshot: Optional[WhitelistSnapshot] = None
+_base_snapshot_key: Optional[tuple] = None
+_whitelist_snapshot: Optional[WhitelistSnapshot] = None
+_whitelist_snapshot_key: Optional[tuple] = None
+
+
+def get_base_snapshot() -> WhitelistSnapshot:
+    """
+    Get the snapshot of BASE_WHITELISTED_URLS alone
+    
+    Returns:
+        WhitelistSnapshot shared as the base of every custom overlay
+    """
+    global _base_snapshot, _base_snapshot_key
+    key = (id(BASE_WHITELISTED_URLS), len(BASE_WHITELISTED_URLS))
+    if _base_snapshot is None or key != _base_snapshot_key:
+        _base_snapshot = WhitelistSnapshot(BASE_WHITELISTED_URLS)
+        _base_snapshot_key = key
+    return _base_snapshot
+
+
+def get_whitelist_snapshot(org_id: Optional[str] = None) -> WhitelistSnapshot:
+    """
+    Get the current whitelist snapshot, rebuilding it if the whitelist changed
+    
+    Args:
+        org_id: Organization whose overlay to include (None for the shared
+            custom list); raises ValueError if invalid and
+            UnknownOrganizationError if not registered
+    
+    Returns:
+        WhitelistSnapshot covering base + custom URLs
+    """
+    global _whitelist_snapshot, _whitelist_snapshot_key
+    if org_id is not None:
+        return _org_whitelists.snapshot(org_id)
+    base = get_base_snapshot()
+    key = (id(base), id(_custom_store), get_whitelist_version())
+    if _whitelist_snapshot is None or key != _whitelist_snapshot_key:
+        _whitelist_snapshot = WhitelistSnapshot(load_custom_urls(), base=base)
+        _whitelist_snapshot_key = key
+    return _whitelist_snapshot
+
+
+def get_whitelist_index(org_id: Optional[str] = None) -> WhitelistIndex:
+    """
+    Get the compiled whitelist index for the current snapshot
+    
+    Returns:
+        WhitelistIndex covering base + custom URLs
+    """
+    return get_whitelist_snapshot(org_id).index
+
+def is_url_whitelisted(url: str, org_id: Optional[str] = None) -> bool:
     """
     Check if a URL is whitelisted
     
+    Matching is done per path segment: a URL is allowed if it is exactly a
+    whitelisted entry, or a child page of an entry with include_children.
+    
     Args:
         url: The URL to check
+        org_id: Organization whose overlay applies (None for the shared list)
         
     Returns:
         bool: True if URL is whitelisted, False otherwise
@@ -280,65 +657,102 @@ def is_url_whitelisted(url: str) -> bool:
     if not url:
         return False
     
-    # Refresh whitelist to include any new custom URLs
-    all_urls = get_all_whitelisted_urls()
-    
-    parsed_url = urlparse(url)
-    url_domain_path = f"{parsed_url.netloc}{parsed_url.path}".rstrip('/')
-    
-    for whitelist_entry in all_urls:
-        whitelist_url = whitelist_entry["url"]
-        parsed_whitelist = urlparse(whitelist_url)
-        whitelist_domain_path = f"{parsed_whitelist.netloc}{parsed_whitelist.path}".rstrip('/')
-        
-        # Exact match
-        if url_domain_path == whitelist_domain_path:
-            return True
-        
-        # Child page match if include_children is True
-        if whitelist_entry.get("include_children", False):
-            if url_domain_path.startswith(whitelist_domain_path):
-                return True
-    
-    return False
+    return get_whitelist_index(org_id).matches(url)
 
-def get_whitelisted_sources() -> List[Dict[str, str]]:
+def get_whitelisted_sources(org_id: Optional[str] = None) -> List[Dict[str, str]]:
     """
     Get list of all whitelisted sources (base + custom)
     
     Returns:
         List of dictionaries containing URL and metadata
     """
-    return get_all_whitelisted_urls()
+    return get_all_whitelisted_urls(org_id)
 
-def get_whitelisted_domains() -> set:
+def get_whitelisted_domains(org_id: Optional[str] = None) -> set:
     """
     Get set of unique whitelisted domains
     
     Returns:
-        Set of domain names
+        Set of domain names (get_whitelist_snapshot().domains is pre-sorted)
     """
-    all_urls = get_all_whitelisted_urls()
-    domains = set()
-    for entry in all_urls:
-        parsed = urlparse(entry["url"])
-        domains.add(parsed.netloc)
-    return domains
+    return set(get_whitelist_snapshot(org_id).domains)
+
+VALID_CITATION_MESSAGE = "Valid source"
+INVALID_CITATION_MESSAGE = "URL not in approved whitelist"
 
-def validate_citation(citation_url: str) -> Dict[str, any]:
+def validate_citation(citation_url: str, org_id: Optional[str] = None) -> Dict[str, any]:
     """
     Validate a citation URL against the whitelist
     
     Args:
         citation_url: The URL to validate
+        org_id: Organization whose overlay applies (None for the shared list)
         
     Returns:
         Dictionary with validation results
     """
-    is_valid = is_url_whitelisted(citation_url)
+    is_valid = is_url_whitelisted(citation_url, org_id)
     
     return {
         "url": citation_url,
         "is_valid": is_valid,
-        "message": "Valid source" if is_valid else "URL not in approved whitelist"
+        "message": VALID_CITATION_MESSAGE if is_valid else INVALID_CITATION_MESSAGE
     }
+
+class CitationValidator:
+    """
+    Validate a stream of citation URLs against one compiled index.
+    
+    Each distinct URL (after trimming whitespace) is reported once; repeats
+    and blank entries are counted but not re-checked. The index is fetched
+    once, so a batch sees a consistent whitelist even if it changes midway.
+    """
+    
+    def __init__(self, index: Optional[WhitelistIndex] = None, org_id: Optional[str] = None):
+        self.index = index if index is not None else get_whitelist_index(org_id)
+        self.total = 0
+        self.valid = 0
+        self._seen = set()
+    
+    def check(self, url: str) -> Optional[Dict[str, any]]:
+        """Validate one URL, returning None if it is blank or a repeat."""
+        self.total += 1
+        url = url.strip()
+        if not url or url in self._seen:
+            return None
+        self._seen.add(url)
+        is_valid = self.index.matches(url)
+        if is_valid:
+            self.valid += 1
+        return {
+            "url": url,
+            "is_valid": is_valid,
+            "message": VALID_CITATION_MESSAGE if is_valid else INVALID_CITATION_MESSAGE
+        }
+    
+    def summary(self) -> Dict[str, int]:
+        """Counts for the URLs checked so far."""
+        unique = len(self._seen)
+        return {
+            "total": self.total,
+            "unique": unique,
+            "valid": self.valid,
+            "invalid": unique - self.valid,
+        }
+
+def validate_citations(urls: Iterable[str], org_id: Optional[str] = None) -> Iterator[Dict[str, any]]:
+    """
+    Validate many citation URLs in one pass
+    
+    Args:
+        urls: Citation URLs; duplicates and blank entries are skipped
+        org_id: Organization whose overlay applies (None for the shared list)
+        
+    Yields:
+        validate_citation-style results, one per distinct URL in input order
+    """
+    validator = CitationValidator(org_id=org_id)
+    for url in urls:
+        result = validator.check(url)
+        if result is not None:
+            yield result
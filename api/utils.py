@@ -3,13 +3,18 @@ Utility functions for PipeWrench AI application.
 Includes logging setup, session management, and helper functions.
 """
 
+import asyncio
 import logging
+import time
 import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, Optional
+from typing import Iterator, Optional
 from pathlib import Path
 
 from config import settings
+from session_records import DocumentRecord, QARecord, SessionRecord
+from session_store import SessionStore, create_session_store
 
 
 # Configure logging
@@ -34,60 +39,85 @@ logger = setup_logging()
 
 
 class SessionManager:
-    """Manage application sessions with automatic cleanup."""
+    """Manage application sessions on a pluggable SessionStore."""
     
-    def __init__(self):
-        self.sessions: Dict[str, dict] = {}
+    def __init__(self, store: Optional[SessionStore] = None):
+        self.sessions: SessionStore = store if store is not None else create_session_store()
         self._last_cleanup = datetime.now()
     
-    def create_session(self) -> str:
-        """Create a new session and return its ID."""
-        session_id = str(uuid.uuid4())
-        self.sessions[session_id] = {
-            "created_at": datetime.now(),
-            "last_accessed": datetime.now(),
-            "questions": [],
-            "documents": []
-        }
+    def create_session(self, session_id: Optional[str] = None, **fields) -> str:
+        """Create a new session (with optional extra fields) and return its ID."""
+        session_id = session_id or str(uuid.uuid4())
+        now = time.time()
+        session = SessionRecord(created_at=now, last_accessed=now, questions=[], documents=[], version=0)
+        session.update(fields)
+        self.sessions.set(session_id, session)
         logger.info(f"Created new session: {session_id}")
         return session_id
     
     def get_session(self, session_id: str) -> Optional[dict]:
         """Get session data and update last accessed time."""
-        if session_id not in self.sessions:
+        session = self.sessions.get(session_id)
+        if session is None:
             logger.warning(f"Session not found: {session_id}")
             return None
         
-        session = self.sessions[session_id]
-        session["last_accessed"] = datetime.now()
+        session["last_accessed"] = time.time()
+        self.sessions.set(session_id, session)
         return session
     
+    def add_question(
+        self,
+        session_id: str,
+        question: str,
+        answer: str,
+        department: str,
+        role: Optional[str] = None,
+    ) -> bool:
+        """Append a Q&A entry to a session's history."""
+        session = self.sessions.get(session_id)
+        if session is None:
+            return False
+        session["questions"].append(QARecord(
+            question=question,
+            answer=answer,
+            department=department,
+            role=role,
+            timestamp=time.time(),
+        ))
+        session["version"] = session.get("version", 0) + 1
+        self.save_session(session_id, session)
+        return True
+    
+    def add_document(self, session_id: str, document: DocumentRecord) -> bool:
+        """Append an analysed document to a session."""
+        session = self.sessions.get(session_id)
+        if session is None:
+            return False
+        session["documents"].append(document)
+        session["version"] = session.get("version", 0) + 1
+        self.save_session(session_id, session)
+        return True
+    
+    def save_session(self, session_id: str, session: dict) -> None:
+        """Persist changes made to a session returned by get_session."""
+        self.sessions.set(session_id, session)
+    
     def delete_session(self, session_id: str) -> bool:
         """Delete a session."""
-        if session_id in self.sessions:
-            del self.sessions[session_id]
+        if self.sessions.delete(session_id):
             logger.info(f"Deleted session: {session_id}")
             return True
         return False
     
     def cleanup_expired_sessions(self) -> int:
         """Remove sessions older than SESSION_TIMEOUT_HOURS."""
-        now = datetime.now()
-        timeout_delta = timedelta(hours=settings.SESSION_TIMEOUT_HOURS)
-        
-        expired = [
-            sid for sid, session in self.sessions.items()
-            if now - session["last_accessed"] > timeout_delta
-        ]
+        count = self.sessions.cleanup_expired()
+        if count:
+            logger.info(f"Cleaned up {count} expired sessions")
         
-        for sid in expired:
-            del self.sessions[sid]
-        
-        if expired:
-            logger.info(f"Cleaned up {len(expired)} expired sessions")
-        
-        self._last_cleanup = now
-        return len(expired)
+        self._last_cleanup = datetime.now()
+        return count
     
     def maybe_cleanup(self) -> None:
         """Cleanup sessions if it's been long enough since last cleanup."""
@@ -96,9 +126,27 @@ class SessionManager:
         ):
             self.cleanup_expired_sessions()
     
+    async def run_cleanup_loop(self, interval_seconds: Optional[float] = None) -> None:
+        """Evict expired sessions on a schedule until cancelled."""
+        interval = interval_seconds or settings.SESSION_CLEANUP_INTERVAL_SECONDS
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.cleanup_expired_sessions()
+            except Exception as e:
+                logger.error(f"Session cleanup failed: {e}")
+    
     def get_session_count(self) -> int:
         """Get the number of active sessions."""
-        return len(self.sessions)
+        return self.sessions.count()
+    
+    def get_memory_stats(self) -> dict:
+        """Get session count and resident vs. spilled memory."""
+        stats = {"active_sessions": self.get_session_count()}
+        metrics = self.sessions.memory_metrics()
+        if metrics is not None:
+            stats.update(metrics)
+        return stats
     
     def get_session_status(self, session_id: str) -> Optional[dict]:
         """Get session status information."""
@@ -115,22 +163,41 @@ class SessionManager:
         }
 
 
+# Applied in order: & first so the entities themselves are not re-escaped
+HTML_ESCAPES = (
+    ("&", "&amp;"),
+    ("<", "&lt;"),
+    (">", "&gt;"),
+    ('"', "&quot;"),
+    ("'", "&#39;"),
+)
+
+
 def sanitize_html(text: str) -> str:
-    """Basic HTML sanitization to prevent injection in reports."""
+    """
+    Basic HTML sanitization to prevent injection in reports.
+    
+    Characters that do not occur are skipped after a scan, so typical text
+    is copied once or twice instead of once per escaped character.
+    """
     if not text:
         return ""
     
-    # Replace & first to avoid double-encoding
-    # Then replace other special characters
-    text = text.replace('&', '&amp;')
-    text = text.replace('<', '&lt;')
-    text = text.replace('>', '&gt;')
-    text = text.replace('"', '&quot;')
-    text = text.replace("'", '&#39;')
+    for char, entity in HTML_ESCAPES:
+        if char in text:
+            text = text.replace(char, entity)
     
     return text
 
 
+def iter_sanitized_html(text: str, chunk_chars: int = 64 * 1024) -> Iterator[str]:
+    """Yield sanitize_html(text) in pieces, escaping one slice at a time."""
+    if not text:
+        return
+    for start in range(0, len(text), chunk_chars):
+        yield sanitize_html(text[start:start + chunk_chars])
+
+
 def get_file_extension(filename: str) -> str:
     """Get lowercase file extension from filename."""
     return Path(filename).suffix.lower()
@@ -149,3 +216,18 @@ def format_file_size(size_bytes: int) -> str:
             return f"{size_bytes:.2f} {unit}"
         size_bytes /= 1024.0
     return f"{size_bytes:.2f} TB"
+
+
+def create_process_pool(max_workers: Optional[int], name: str) -> Executor:
+    """
+    Create a process pool, or a thread pool where processes are unavailable.
+    
+    Serverless runtimes such as Vercel have no /dev/shm, so the semaphores
+    a ProcessPoolExecutor needs cannot be created; work then runs on threads
+    in this process instead.
+    """
+    try:
+        return ProcessPoolExecutor(max_workers=max_workers)
+    except (OSError, ImportError, NotImplementedError) as e:
+        logger.warning(f"Process pool for {name} unavailable ({e}); using threads")
+        return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
@@ -0,0 +1,258 @@
+"""
+Compiled URL whitelist index for PipeWrench AI.
+Maps each whitelisted host to a trie of path segments so lookups cost
+O(len(url)) instead of a linear scan over every whitelist entry, and keeps
+a (host, path)-sorted view of the entries for paged browsing.
+"""
+
+import base64
+import binascii
+import heapq
+import json
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def split_url(url: str) -> Tuple[str, str]:
+    """
+    Split a URL into (host, path) without the overhead of urlparse.
+
+    The host is the lowercased netloc; the path excludes query and fragment.
+    Returns ("", "") if the URL has no scheme/netloc.
+    """
+    scheme_end = url.find("://")
+    if scheme_end <= 0:
+        return "", ""
+    start = scheme_end + 3
+    end = len(url)
+    host_end = end
+    for sep in ("/", "?", "#"):
+        pos = url.find(sep, start)
+        if pos != -1 and pos < host_end:
+            host_end = pos
+    host = url[start:host_end].lower()
+    path_end = end
+    for sep in ("?", "#"):
+        pos = url.find(sep, host_end)
+        if pos != -1 and pos < path_end:
+            path_end = pos
+    return host, url[host_end:path_end]
+
+
+def path_segments(path: str) -> List[str]:
+    """Split a URL path into its non-empty segments."""
+    return [segment for segment in path.split("/") if segment]
+
+
+class _Node:
+    """Trie node for one path segment."""
+
+    __slots__ = ("children", "terminal", "include_children")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.terminal = False
+        self.include_children = False
+
+
+class WhitelistIndex:
+    """
+    Host-keyed path-segment trie built from whitelist entries.
+
+    A URL matches if its host/path is exactly a whitelisted entry, or if a
+    whitelisted entry with include_children=True is a segment-wise prefix
+    of it.
+    """
+
+    def __init__(self, entries: Iterable[dict] = ()):
+        self._hosts: Dict[str, _Node] = {}
+        self._count = 0
+        for entry in entries:
+            self.add(entry["url"], entry.get("include_children", False))
+
+    def add(self, url: str, include_children: bool = False) -> None:
+        """Insert a single whitelist URL into the index."""
+        host, path = split_url(url)
+        if not host:
+            return
+        node = self._hosts.get(host)
+        if node is None:
+            node = self._hosts[host] = _Node()
+        for segment in path_segments(path):
+            child = node.children.get(segment)
+            if child is None:
+                child = node.children[segment] = _Node()
+            node = child
+        node.terminal = True
+        node.include_children = node.include_children or bool(include_children)
+        self._count += 1
+
+    def matches(self, url: str) -> bool:
+        """Return True if the URL is covered by the whitelist."""
+        if not url:
+            return False
+        host, path = split_url(url)
+        node: Optional[_Node] = self._hosts.get(host)
+        if node is None:
+            return False
+        for segment in path_segments(path):
+            if node.include_children:
+                return True
+            node = node.children.get(segment)
+            if node is None:
+                return False
+        return node.terminal
+
+    def hosts(self) -> List[str]:
+        """Return the indexed hosts."""
+        return list(self._hosts)
+
+    def __len__(self) -> int:
+        return self._count
+
+
+class OverlayIndex:
+    """
+    Union of a shared base index and a small overlay index.
+
+    Lets each organization add its own entries on top of the base
+    whitelist without compiling a copy of the base trie. Matches exactly
+    what one WhitelistIndex over both entry lists would.
+    """
+
+    def __init__(self, base: WhitelistIndex, overlay: WhitelistIndex):
+        self.base = base
+        self.overlay = overlay
+
+    def matches(self, url: str) -> bool:
+        """Return True if the URL is covered by the base or the overlay."""
+        return self.base.matches(url) or (len(self.overlay) > 0 and self.overlay.matches(url))
+
+    def hosts(self) -> List[str]:
+        """Return the indexed hosts."""
+        return list(dict.fromkeys(self.base.hosts() + self.overlay.hosts()))
+
+    def __len__(self) -> int:
+        return len(self.base) + len(self.overlay)
+
+
+# Upper bound for prefix ranges in sorted string keys
+_MAX_CHAR = "\U0010ffff"
+
+
+def encode_cursor(key: Tuple[str, str, str]) -> str:
+    """Encode a (host, path, url) sort key as an opaque page cursor."""
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str, str]:
+    """Decode a page cursor, raising ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key = tuple(json.loads(raw))
+    except (TypeError, ValueError, binascii.Error) as e:
+        raise ValueError("Invalid cursor") from e
+    if len(key) != 3 or not all(isinstance(part, str) for part in key):
+        raise ValueError("Invalid cursor")
+    return key
+
+
+class SortedWhitelist:
+    """
+    Whitelist entries sorted by (host, path) for paged browsing.
+
+    Domain and URL-prefix filters map to contiguous ranges found with
+    bisect, so a page costs O(log n + page size). Substring queries scan
+    forward from the cursor within that range. Cursors are sort keys, so
+    paging stays consistent when entries are added or removed in between.
+    """
+
+    def __init__(self, items: Iterable[Tuple[str, str, str]]):
+        """items are (host, path, url) per entry, in entry order."""
+        ordered = sorted((key, position) for position, key in enumerate(items))
+        self._keys: List[Tuple[str, str, str]] = [key for key, _ in ordered]
+        self._positions: List[int] = [position for _, position in ordered]
+        self._haystacks = [(host + path).lower() for host, path, _ in self._keys]
+
+    def extended(self, items: Iterable[Tuple[str, str, str]], offset: int) -> "SortedWhitelist":
+        """
+        Return a copy with more entries merged in.
+
+        Only the new items are sorted; they are merged with the existing
+        order in one linear pass. Their positions are numbered from offset.
+        """
+        extra = sorted(
+            (key, offset + position, (key[0] + key[1]).lower()) for position, key in enumerate(items)
+        )
+        merged = heapq.merge(zip(self._keys, self._positions, self._haystacks), extra)
+        result = SortedWhitelist(())
+        for key, position, haystack in merged:
+            result._keys.append(key)
+            result._positions.append(position)
+            result._haystacks.append(haystack)
+        return result
+
+    def _range(self, domain: Optional[str], prefix: Optional[str]) -> Tuple[int, int]:
+        lo, hi = 0, len(self._keys)
+        if domain:
+            domain = domain.lower()
+            lo = max(lo, bisect_left(self._keys, (domain,)))
+            hi = min(hi, bisect_left(self._keys, (domain + "\0",)))
+        if prefix:
+            if "://" in prefix:
+                prefix = prefix.split("://", 1)[1]
+            host, slash, path = prefix.partition("/")
+            host = host.lower()
+            if slash:
+                # Exact host, path prefix
+                lo = max(lo, bisect_left(self._keys, (host, "/" + path)))
+                hi = min(hi, bisect_left(self._keys, (host, "/" + path + _MAX_CHAR)))
+            else:
+                lo = max(lo, bisect_left(self._keys, (host,)))
+                hi = min(hi, bisect_left(self._keys, (host + _MAX_CHAR,)))
+        return lo, hi
+
+    def page(
+        self,
+        domain: Optional[str] = None,
+        prefix: Optional[str] = None,
+        query: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50,
+    ) -> Tuple[List[int], Optional[str]]:
+        """
+        Get one page of matching entries.
+
+        Args:
+            domain: Only entries on exactly this host
+            prefix: Host prefix ("osha") or host plus path prefix
+                ("www.osha.gov/constr"); a scheme is ignored
+            query: Case-insensitive substring of host + path
+            cursor: next_cursor from the previous page
+            limit: Maximum entries to return
+
+        Returns:
+            (positions of the entries in the input order, next_cursor or None)
+        """
+        lo, hi = self._range(domain, prefix)
+        if cursor:
+            lo = max(lo, bisect_right(self._keys, decode_cursor(cursor)))
+        query = query.lower() if query else None
+        positions: List[int] = []
+        last = None
+        i = lo
+        while i < hi and len(positions) < limit:
+            if query is None or query in self._haystacks[i]:
+                positions.append(self._positions[i])
+                last = i
+            i += 1
+        if query is not None:
+            # Only hand out a cursor if another match follows
+            while i < hi and query not in self._haystacks[i]:
+                i += 1
+        if last is None or i >= hi:
+            return positions, None
+        return positions, encode_cursor(self._keys[last])
+
+    def __len__(self) -> int:
+        return len(self._keys)
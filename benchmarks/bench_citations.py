@@ -0,0 +1,68 @@
+"""
+Throughput benchmark for bulk citation validation.
+
+Validates a synthetic audit (whitelisted pages, child pages, off-list URLs
+and repeats) against the real whitelist, through the Python API and through
+the NDJSON encoder used by /api/citations/validate, and compares with
+calling validate_citation per URL.
+
+Usage:
+    python benchmarks/bench_citations.py [--urls 500000] [--unique 0.5]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "api"))
+
+from citations import iter_ndjson_results
+from url_whitelist_config import (
+    CitationValidator,
+    get_all_whitelisted_urls,
+    validate_citation,
+    validate_citations,
+)
+
+
+def make_urls(count: int, unique_ratio: float, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    entries = [entry["url"].rstrip("/") for entry in get_all_whitelisted_urls()]
+    distinct = []
+    for i in range(max(1, int(count * unique_ratio))):
+        kind = i % 3
+        if kind == 0:
+            distinct.append(rng.choice(entries))
+        elif kind == 1:
+            distinct.append(f"{rng.choice(entries)}/section-{i}?ref=report")
+        else:
+            distinct.append(f"https://records.example.org/archive/{i}/citation.html")
+    return [distinct[i % len(distinct)] for i in range(count)]
+
+
+def timed(label: str, count: int, fn) -> None:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed * 1000:9.1f} ms  {count / elapsed:12,.0f} URLs/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--urls", type=int, default=500000, help="URLs in the audit")
+    parser.add_argument("--unique", type=float, default=0.5, help="Fraction of distinct URLs")
+    args = parser.parse_args()
+
+    urls = make_urls(args.urls, args.unique)
+    print(f"{len(urls):,} URLs, {len(set(urls)):,} distinct, "
+          f"{len(get_all_whitelisted_urls())} whitelist entries\n")
+
+    timed("validate_citation per URL", len(urls), lambda: [validate_citation(url) for url in urls])
+    timed("validate_citations", len(urls), lambda: list(validate_citations(urls)))
+    timed("NDJSON response", len(urls), lambda: "".join(iter_ndjson_results(CitationValidator(), urls)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark for session report generation.
+
+Compares the previous string-concatenation report builder with the
+streamed Jinja2 template on large sessions, reporting render time and
+peak traced memory.
+
+Usage:
+    python benchmarks/bench_report.py [--questions 1000] [--answer-chars 2000]
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "api"))
+
+from reports import render_report
+from session_records import QARecord, SessionRecord
+from utils import sanitize_html
+
+
+def make_session(questions: int, answer_chars: int) -> SessionRecord:
+    answer = ("Per OSHA 1926.652, trenches 5 ft or deeper need protective systems. " * 40)[:answer_chars]
+    return SessionRecord(
+        created_at=datetime.now(),
+        last_accessed=datetime.now(),
+        documents=[],
+        questions=[
+            QARecord(
+                question=f"Question {i} about trench shoring <depth>?",
+                answer=answer,
+                department="streets_highways",
+                role="inspector",
+                timestamp=datetime.now(),
+            )
+            for i in range(questions)
+        ],
+    )
+
+
+def concatenated_report(session) -> str:
+    """The previous approach: grow one string with += per question."""
+    html_report = f"<html><body><h2>Questions & Answers ({len(session['questions'])})</h2>\n"
+    for i, qa in enumerate(session["questions"], 1):
+        role_display = f" • {sanitize_html(qa['role'])}" if qa.get('role') else ""
+        html_report += f"""
+        <div class="question">
+            <strong>Q{i} ({sanitize_html(qa['department'])}{role_display}):</strong> {sanitize_html(qa['question'])}
+            <div class="answer">
+                <strong>Answer:</strong><br>
+                {sanitize_html(qa['answer'])}
+            </div>
+            <p class="metadata">Asked: {qa['timestamp']}</p>
+        </div>
+"""
+    html_report += "</body></html>"
+    return html_report
+
+
+def drain_stream(session) -> int:
+    """Consume the streamed report as a client would, keeping nothing."""
+    return sum(len(chunk) for chunk in render_report(session, "bench"))
+
+
+def measure(fn, session):
+    # Time without tracing, then trace a second run for peak memory
+    start = time.perf_counter()
+    result = fn(session)
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    fn(session)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    size = result if isinstance(result, int) else len(result)
+    return seconds, peak, size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=1000)
+    parser.add_argument("--answer-chars", type=int, default=2000)
+    args = parser.parse_args()
+
+    session = make_session(args.questions, args.answer_chars)
+    list(render_report(make_session(1, 10), "warmup"))  # compile the template outside the timing
+
+    for name, fn in (("concatenation", concatenated_report), ("streamed template", drain_stream)):
+        seconds, peak, size = measure(fn, session)
+        print(f"{name:18s} {seconds * 1000:8.1f} ms  peak {peak / 1024 / 1024:7.2f} MiB  output {size / 1024 / 1024:.2f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Micro-benchmark for utils.sanitize_html on multi-megabyte answers.
+
+Compares the current escaper with the previous five-pass version and with
+single-pass str.translate and regex escapers, on clean prose, typical model
+answers and markup-heavy text.
+
+Usage:
+    python benchmarks/bench_sanitize.py [--megabytes 4] [--repeat 5]
+"""
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "api"))
+
+from utils import HTML_ESCAPES, iter_sanitized_html, sanitize_html
+
+
+SAMPLES = {
+    "clean prose": "Per OSHA 1926.652, trenches 5 ft or deeper need protective systems. ",
+    "model answer": "Don't dig deeper than 5 ft without \"protective systems\"; see 29 CFR 1926.652 & local codes. ",
+    "markup heavy": "<b>Use \"Type A\" & 'B'</b> pipe. ",
+}
+
+_TABLE = str.maketrans(dict(HTML_ESCAPES))
+_PATTERN = re.compile("[&<>\"']")
+_ENTITIES = dict(HTML_ESCAPES)
+
+
+def five_pass(text):
+    """The previous implementation."""
+    text = text.replace('&', '&amp;')
+    text = text.replace('<', '&lt;')
+    text = text.replace('>', '&gt;')
+    text = text.replace('"', '&quot;')
+    return text.replace("'", '&#39;')
+
+
+def translate(text):
+    return text.translate(_TABLE)
+
+
+def regex(text):
+    return _PATTERN.sub(lambda m: _ENTITIES[m.group()], text)
+
+
+def chunked(text):
+    return "".join(iter_sanitized_html(text))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megabytes", type=float, default=4)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    escapers = [
+        ("sanitize_html", sanitize_html),
+        ("iter_sanitized_html", chunked),
+        ("five-pass replace", five_pass),
+        ("str.translate", translate),
+        ("regex sub", regex),
+    ]
+    for label, sample in SAMPLES.items():
+        text = sample * int(args.megabytes * 1024 * 1024 / len(sample))
+        expected = five_pass(text)
+        print(f"{label} ({len(text) / 1024 / 1024:.1f} MB)")
+        for name, fn in escapers:
+            assert fn(text) == expected, name
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                fn(text)
+            ms = (time.perf_counter() - start) / args.repeat * 1000
+            print(f"  {name:20s} {ms:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
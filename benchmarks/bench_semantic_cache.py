@@ -0,0 +1,70 @@
+"""
+Offline benchmark for the semantic answer cache.
+
+Measures add/lookup latency and paraphrase hit rate with the local
+embedder. Makes no network calls.
+
+Usage:
+    python benchmarks/bench_semantic_cache.py [--entries 1000] [--model PATH]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "api"))
+
+from semantic_cache import SemanticCache, get_embedder
+
+
+TOPICS = [
+    "trench shoring", "confined space entry", "stormwater permit", "asphalt patching",
+    "water main flushing", "sewer lateral inspection", "lead service line replacement",
+    "snow plow route planning", "traffic control plan", "hydrant maintenance",
+]
+TEMPLATES = [
+    ("What are the {topic} requirements for site {n}?", "{topic} requirements for site {n}"),
+    ("How do we document {topic} at site {n}?", "how should we document {topic} for site {n}"),
+    ("Which OSHA rules cover {topic} at site {n}?", "what OSHA rules apply to {topic} at site {n}"),
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=1000)
+    parser.add_argument("--model", default=None, help="Local sentence-transformers model path")
+    parser.add_argument("--threshold", type=float, default=0.85)
+    args = parser.parse_args()
+
+    cache = SemanticCache(get_embedder(args.model), threshold=args.threshold, max_entries_per_scope=args.entries)
+    pairs = []
+    for i in range(args.entries):
+        original, paraphrase = TEMPLATES[i % len(TEMPLATES)]
+        topic = TOPICS[(i // len(TEMPLATES)) % len(TOPICS)]
+        pairs.append((original.format(topic=topic, n=i), paraphrase.format(topic=topic, n=i)))
+
+    start = time.perf_counter()
+    for i, (question, _) in enumerate(pairs):
+        cache.add("safety", question, {"answer": i})
+    add_seconds = time.perf_counter() - start
+
+    hits = correct = 0
+    start = time.perf_counter()
+    for i, (_, paraphrase) in enumerate(pairs):
+        match = cache.lookup("safety", paraphrase)
+        if match is not None:
+            hits += 1
+            correct += match[0]["answer"] == i
+    lookup_seconds = time.perf_counter() - start
+
+    n = len(pairs)
+    print(f"embedder:        {type(cache.embedder).__name__}")
+    print(f"entries:         {n}")
+    print(f"add latency:     {add_seconds / n * 1e6:.1f} us/question")
+    print(f"lookup latency:  {lookup_seconds / n * 1e6:.1f} us/question")
+    print(f"paraphrase hits: {hits}/{n} ({hits / n:.1%}), correct: {correct}/{hits or 1}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Memory benchmark for session records.
+
+Builds the same sessions as plain dicts (the previous layout) and as
+__slots__ records, and reports the traced allocation per session.
+
+Usage:
+    python benchmarks/bench_session_memory.py [--sessions 2000] [--questions 20]
+"""
+
+import argparse
+import sys
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "api"))
+
+from session_records import DocumentRecord, QARecord, SessionRecord
+
+
+DEPARTMENTS = ["general_public_works", "water_sewer", "streets_highways", "stormwater", "solid_waste"]
+ROLES = [None, "engineer", "inspector", "maintenance"]
+
+
+def text(kind: str, i: int) -> str:
+    # Build fresh strings so neither layout benefits from literal sharing
+    return "".join([kind, " ", str(i)])
+
+
+def build_dicts(sessions: int, questions: int) -> list:
+    out = []
+    for s in range(sessions):
+        out.append({
+            "created_at": datetime.now(),
+            "last_accessed": datetime.now(),
+            "questions": [
+                {
+                    "question": text("question", q),
+                    "answer": text("answer", q),
+                    "department": text(DEPARTMENTS[q % len(DEPARTMENTS)], 0)[:-2],
+                    "role": ROLES[q % len(ROLES)],
+                    "timestamp": datetime.now().isoformat(),
+                }
+                for q in range(questions)
+            ],
+            "documents": [{
+                "filename": text("file", s),
+                "department": text(DEPARTMENTS[s % len(DEPARTMENTS)], 0)[:-2],
+                "role": None,
+                "analysis": text("analysis", s),
+                "file_size": "1.00 MB",
+                "uploaded_at": datetime.now().isoformat(),
+            }],
+        })
+    return out
+
+
+def build_records(sessions: int, questions: int) -> list:
+    out = []
+    for s in range(sessions):
+        out.append(SessionRecord(
+            created_at=datetime.now(),
+            last_accessed=datetime.now(),
+            questions=[
+                QARecord(
+                    question=text("question", q),
+                    answer=text("answer", q),
+                    department=text(DEPARTMENTS[q % len(DEPARTMENTS)], 0)[:-2],
+                    role=ROLES[q % len(ROLES)],
+                    timestamp=datetime.now(),
+                )
+                for q in range(questions)
+            ],
+            documents=[DocumentRecord(
+                filename=text("file", s),
+                department=text(DEPARTMENTS[s % len(DEPARTMENTS)], 0)[:-2],
+                role=None,
+                analysis=text("analysis", s),
+                file_size="1.00 MB",
+                uploaded_at=datetime.now(),
+            )],
+        ))
+    return out
+
+
+def measure(builder, sessions: int, questions: int) -> int:
+    tracemalloc.start()
+    data = builder(sessions, questions)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--questions", type=int, default=20)
+    args = parser.parse_args()
+
+    before = measure(build_dicts, args.sessions, args.questions)
+    after = measure(build_records, args.sessions, args.questions)
+    print(f"sessions:          {args.sessions} x {args.questions} questions")
+    print(f"dict sessions:     {before / args.sessions / 1024:.1f} KiB/session")
+    print(f"record sessions:   {after / args.sessions / 1024:.1f} KiB/session")
+    print(f"reduction:         {1 - after / before:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""
+Local test double of the drawing processing /parse service.
+
+Returns deterministic "OCR" text for uploaded PDFs, with form-feed page
+breaks, and can be told to fail to exercise retries and the circuit breaker.
+
+Run standalone for local development:
+    uvicorn tests.drawing_service_stub:app --port 8001
+"""
+
+from typing import List
+
+from fastapi import FastAPI, File, Form, UploadFile
+from fastapi.responses import PlainTextResponse
+
+app = FastAPI(title="Drawing processing stub")
+
+# Status codes to return for the next requests before succeeding, e.g. [503, 503]
+app.state.failures: List[int] = []
+app.state.calls = 0
+
+
+@app.post("/parse", response_class=PlainTextResponse)
+async def parse(file: UploadFile = File(...), ocr_method: str = Form("textract")):
+    """Return fake OCR text for the uploaded drawing."""
+    app.state.calls += 1
+    if app.state.failures:
+        status = app.state.failures.pop(0)
+        return PlainTextResponse("stub failure", status_code=status)
+    content = await file.read()
+    return f"OCR ({ocr_method}) of {file.filename}: {len(content)} bytes\fSheet 2 notes"
@@ -7,6 +7,7 @@ from fastapi.testclient import TestClient
 import sys
 from pathlib import Path
 import os
+import json
 
 # Add api directory to path
 api_path = Path(__file__).parent.parent / "api"
@@ -33,6 +34,26 @@ class TestHealthEndpoint:
         assert "version" in data
 
 
+class TestLifespan:
+    """Tests for application startup and shutdown."""
+
+    def test_background_tasks_started_and_stopped(self, monkeypatch):
+        """Test the job workers start on startup and stop on shutdown."""
+        import main
+        events = []
+
+        async def stop():
+            events.append("stop")
+
+        monkeypatch.setattr(main.job_workers, "start", lambda: events.append("start"))
+        monkeypatch.setattr(main.job_workers, "stop", stop)
+        with TestClient(app) as lifespan_client:
+            assert lifespan_client.get("/health").status_code == 200
+            assert events == ["start"]
+        assert events == ["start", "stop"]
+        assert client.get("/health").status_code == 200
+
+
 class TestSessionEndpoints:
     """Tests for session management endpoints."""
     
@@ -163,6 +184,98 @@ class TestQueryEndpoint:
         assert response.status_code == 400
 
 
+def parse_sse(text):
+    """Split a Server-Sent Events body into (event, data) pairs."""
+    frames = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        frames.append((fields.get("event"), json.loads(fields["data"])))
+    return frames
+
+
+class TestQueryStream:
+    """Tests for the streaming query endpoint."""
+
+    @pytest.fixture(autouse=True)
+    def caches(self, monkeypatch, tmp_path):
+        """Use a fresh response cache and no semantic cache."""
+        import main
+        from response_cache import ResponseCache
+        monkeypatch.setattr(main, "response_cache", ResponseCache(str(tmp_path / "responses.db"), 3600, 100))
+        monkeypatch.setattr(main, "semantic_cache", None)
+
+    @pytest.fixture
+    def answer(self, monkeypatch):
+        """Replace the model stream with a canned answer; returns the recorded calls."""
+        import main
+        calls = []
+
+        async def fake_stream_message(api_key=None, usage_out=None, **kwargs):
+            calls.append(kwargs)
+            usage_out.update({"input_tokens": 10, "output_tokens": 2})
+            yield "Hello "
+            yield "world"
+
+        monkeypatch.setattr(main, "stream_message", fake_stream_message)
+        return calls
+
+    def test_stream_deltas_then_done(self, answer):
+        """Test the answer streams as delta events followed by a done event."""
+        response = client.post("/query/stream", json={"query": "What is a culvert?"})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        frames = parse_sse(response.text)
+        assert frames[:2] == [("delta", {"text": "Hello "}), ("delta", {"text": "world"})]
+        event, done = frames[-1]
+        assert event == "done"
+        assert done["cached"] is False
+        assert done["usage"] == {"input_tokens": 10, "output_tokens": 2}
+        assert done["sources"] == ["whitelisted_urls"]
+
+    def test_stream_error_event(self, monkeypatch):
+        """Test a failure while streaming ends with an error event."""
+        import main
+
+        async def failing_stream_message(api_key=None, usage_out=None, **kwargs):
+            yield "Partial"
+            raise RuntimeError("connection reset")
+
+        monkeypatch.setattr(main, "stream_message", failing_stream_message)
+        response = client.post("/query/stream", json={"query": "What is a culvert?"})
+        frames = parse_sse(response.text)
+        assert frames[0] == ("delta", {"text": "Partial"})
+        assert frames[-1] == ("error", {"detail": "An unexpected error occurred. Please try again."})
+        assert all(event != "done" for event, _ in frames)
+
+    def test_repeated_query_served_from_cache(self, answer):
+        """Test a repeated query is answered from the response cache without calling the model."""
+        first = parse_sse(client.post("/query/stream", json={"query": "What is a culvert?"}).text)
+        second = parse_sse(client.post("/query/stream", json={"query": "What is a culvert?"}).text)
+        assert len(answer) == 1
+        assert second[0] == ("delta", {"text": "Hello world"})
+        assert second[-1][0] == "done"
+        assert second[-1][1]["cached"] is True
+        assert second[-1][1]["usage"] == first[-1][1]["usage"]
+
+    def test_no_cache_bypasses_cache(self, answer):
+        """Test no_cache skips the response cache."""
+        client.post("/query/stream", json={"query": "What is a culvert?"})
+        client.post("/query/stream", json={"query": "What is a culvert?", "no_cache": True})
+        assert len(answer) == 2
+
+    def test_empty_query_rejected(self, answer):
+        """Test an empty query is rejected before calling the model."""
+        response = client.post("/query/stream", json={"query": ""})
+        assert response.status_code == 422
+        assert answer == []
+
+    def test_query_too_long_rejected(self, answer):
+        """Test a query over the length limit is rejected before calling the model."""
+        response = client.post("/query/stream", json={"query": "A" * 2001})
+        assert response.status_code == 422
+        assert answer == []
+
+
 class TestDocumentUpload:
     """Tests for document upload endpoint."""
     
@@ -190,6 +303,155 @@ class TestDocumentUpload:
         assert response.status_code == 400
 
 
+    @pytest.mark.parametrize("content", [b"", b"not a pdf at all"])
+    def test_upload_unreadable_pdf(self, content):
+        """Test empty or corrupt PDFs are rejected with 400."""
+        response = client.post(
+            "/upload",
+            files={"file": ("broken.pdf", content, "application/pdf")}
+        )
+        assert response.status_code == 400
+
+    def test_upload_too_large(self, monkeypatch):
+        """Test a PDF over the size limit is rejected with 413."""
+        from config import settings
+        monkeypatch.setattr(settings, "MAX_FILE_SIZE_BYTES", 1000)
+        response = client.post(
+            "/upload",
+            files={"file": ("large.pdf", b"%PDF" + b"x" * 2000, "application/pdf")}
+        )
+        assert response.status_code == 413
+
+    def test_asbuilt_upload_moved_to_jobs_dir(self, monkeypatch, tmp_path):
+        """Test an as-built upload is moved into JOBS_DIR and queued."""
+        import main
+        from config import settings
+        queued = []
+        monkeypatch.setattr(settings, "JOBS_DIR", str(tmp_path))
+        monkeypatch.setattr(main, "extraction_cache", None)
+        monkeypatch.setattr(main, "count_pages", lambda path: 3)
+        monkeypatch.setattr(main.job_queue, "enqueue", lambda kind, payload, callback_url=None: queued.append(payload) or "job-1")
+        monkeypatch.setattr(main.job_workers, "notify", lambda: None)
+        response = client.post(
+            "/upload",
+            params={"is_asbuilt": "true"},
+            files={"file": ("plans.pdf", b"%PDF-1.4 scanned", "application/pdf")}
+        )
+        assert response.status_code == 200
+        assert response.json()["job_id"] == "job-1"
+        job_path = queued[0]["path"]
+        assert os.path.dirname(job_path) == str(tmp_path)
+        with open(job_path, "rb") as f:
+            assert f.read() == b"%PDF-1.4 scanned"
+
+
+class TestCustomURLAuth:
+    """Tests for authorization of custom whitelist changes."""
+
+    URL = "https://www.springfield.gov/public-works"
+
+    @pytest.fixture(autouse=True)
+    def org_keys(self, tmp_path, monkeypatch):
+        """Register one organization and keep its whitelist in a temp dir."""
+        import url_whitelist_config
+        from config import settings
+        monkeypatch.setattr(settings, "ORG_API_KEYS", {"springfield": "spring-key"})
+        monkeypatch.setattr(settings, "WHITELIST_ADMIN_KEY", None)
+        monkeypatch.setattr(
+            url_whitelist_config, "_org_whitelists",
+            url_whitelist_config.OrgWhitelists(str(tmp_path / "orgs")),
+        )
+
+    def post(self, action, key=None, org_id="springfield"):
+        headers = {"X-Org-Key": key} if key else {}
+        return client.post(f"/api/custom-url/{action}", json={"url": self.URL, "org_id": org_id}, headers=headers)
+
+    def test_key_required(self):
+        """Test changes without a key are rejected."""
+        assert self.post("add").status_code == 401
+        assert self.post("remove").status_code == 401
+
+    def test_wrong_key_rejected(self):
+        """Test another key cannot change the organization's list."""
+        assert self.post("add", key="wrong").status_code == 403
+        assert self.post("add", key="spring-key", org_id=None).status_code == 403
+
+    def test_org_key_allows_changes(self):
+        """Test the organization's key can add and remove URLs."""
+        assert self.post("add", key="spring-key").status_code == 200
+        assert self.post("remove", key="spring-key").status_code == 200
+
+
+class TestCitationLimits:
+    """Tests for bulk citation request size limits."""
+
+    @pytest.fixture(autouse=True)
+    def small_limits(self, monkeypatch):
+        """Cap both body limits at 1 MB."""
+        from config import settings
+        monkeypatch.setattr(settings, "CITATIONS_MAX_JSON_MB", 1)
+        monkeypatch.setattr(settings, "CITATIONS_MAX_STREAM_MB", 1)
+
+    def test_json_body_too_large(self):
+        """Test an oversized JSON body is rejected with 413."""
+        urls = ["https://example.com/%d" % i for i in range(60000)]
+        response = client.post("/api/citations/validate", json={"urls": urls})
+        assert response.status_code == 413
+
+    def test_ndjson_content_length_too_large(self):
+        """Test an NDJSON body declaring too large a length is rejected with 413."""
+        body = b"https://example.com/page\n" * 50000
+        response = client.post(
+            "/api/citations/validate", content=body,
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        assert response.status_code == 413
+
+    def test_small_json_body_accepted(self):
+        """Test a JSON body under the limit is validated."""
+        response = client.post("/api/citations/validate", json={"urls": ["https://www.osha.gov/"]})
+        assert response.status_code == 200
+
+    def test_ndjson_body_validated(self):
+        """Test an NDJSON body streams one result per URL, then a summary."""
+        body = (
+            b"https://www.osha.gov/construction\n"
+            b'{"url": "https://example.com/page"}\n'
+            b"https://www.osha.gov/construction\n"
+        )
+        response = client.post(
+            "/api/citations/validate", content=body,
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        assert response.status_code == 200
+        records = [json.loads(line) for line in response.text.splitlines()]
+        assert [(r["url"], r["is_valid"]) for r in records[:-1]] == [
+            ("https://www.osha.gov/construction", True),
+            ("https://example.com/page", False),
+        ]
+        assert records[-1]["summary"]["total"] == 3
+
+    def test_ndjson_line_too_long(self):
+        """Test an NDJSON body with an over-long line is rejected with 413."""
+        response = client.post(
+            "/api/citations/validate", content=b"x" * 20000,
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        assert response.status_code == 413
+
+    def test_ndjson_chunked_body_too_large(self):
+        """Test an NDJSON body without a Content-Length is cut off at the limit with 413."""
+        def chunks():
+            for _ in range(50):
+                yield b"https://example.com/page\n" * 1000
+
+        response = client.post(
+            "/api/citations/validate", content=chunks(),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        assert response.status_code == 413
+
+
 class TestReportGeneration:
     """Tests for report generation endpoint."""
     
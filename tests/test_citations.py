@@ -0,0 +1,131 @@
+"""
+Unit tests for bulk citation validation.
+"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add api directory to path
+api_path = Path(__file__).parent.parent / "api"
+sys.path.insert(0, str(api_path))
+
+from citations import (
+    CitationLimitError,
+    encode_result,
+    iter_ndjson_batches,
+    iter_ndjson_results,
+    iter_url_batches,
+    parse_citation_line,
+    spool_body,
+)
+from url_whitelist_config import CitationValidator, validate_citation, validate_citations
+from whitelist_index import WhitelistIndex
+
+
+GOOD = "https://www.osha.gov/trenching"
+GOOD_CHILD = "https://www.osha.gov/trenching/protective-systems"
+BAD = "https://example.com/page"
+
+
+@pytest.fixture
+def index():
+    return WhitelistIndex([{"url": GOOD, "include_children": True}])
+
+
+def decode(chunks):
+    return [json.loads(line) for line in "".join(chunks).splitlines()]
+
+
+async def agen(items):
+    for item in items:
+        yield item
+
+
+class TestValidateCitations:
+    """Tests for the bulk Python API."""
+
+    def test_matches_single_validation(self):
+        """Test results are the same as validate_citation."""
+        urls = ["https://www.osha.gov/construction", BAD]
+        assert list(validate_citations(urls)) == [validate_citation(url) for url in urls]
+
+    def test_deduplicates_in_input_order(self, index):
+        """Test each distinct URL is reported once, first occurrence first."""
+        validator = CitationValidator(index)
+        results = [validator.check(url) for url in [BAD, GOOD, " " + BAD + "\n", "", GOOD_CHILD]]
+        assert [r["url"] for r in results if r] == [BAD, GOOD, GOOD_CHILD]
+        assert validator.summary() == {"total": 5, "unique": 3, "valid": 2, "invalid": 1}
+
+    def test_uses_one_index(self, index):
+        """Test a validator keeps the index it started with."""
+        validator = CitationValidator(index)
+        assert validator.check(GOOD_CHILD)["is_valid"]
+        assert not validator.check(BAD)["is_valid"]
+
+
+class TestNDJSON:
+    """Tests for NDJSON parsing and encoding."""
+
+    def test_parse_line_forms(self):
+        """Test JSON strings, objects and bare URLs are accepted."""
+        assert parse_citation_line('"%s"' % GOOD) == GOOD
+        assert parse_citation_line('{"url": "%s", "report": 7}' % GOOD) == GOOD
+        assert parse_citation_line(GOOD + "\r") == GOOD
+        assert parse_citation_line("   ") is None
+        assert parse_citation_line('{"report": 7}') is None
+
+    def test_malformed_json_kept_as_text(self):
+        """Test a malformed line is reported rather than dropped."""
+        assert parse_citation_line('{"url": ') == '{"url":'
+
+    def test_encode_matches_json_dumps(self):
+        """Test the fast encoder produces the same line as json.dumps."""
+        result = {"url": 'https://a.gov/café?q="x"\\', "is_valid": False, "message": "URL not in approved whitelist"}
+        assert encode_result(result) == json.dumps(result) + "\n"
+
+    def test_list_results_and_summary(self, index, monkeypatch):
+        """Test list input streams results then a summary line."""
+        monkeypatch.setattr("citations.RESULT_BATCH_LINES", 2)
+        chunks = list(iter_ndjson_results(CitationValidator(index), [GOOD, BAD, GOOD, GOOD_CHILD]))
+        assert len(chunks) == 3
+        records = decode(chunks)
+        assert [r["url"] for r in records[:-1]] == [GOOD, BAD, GOOD_CHILD]
+        assert records[-1] == {"summary": {"total": 4, "unique": 3, "valid": 2, "invalid": 1}}
+
+    def test_stream_split_across_chunks(self, index):
+        """Test lines split between body chunks are reassembled."""
+        body = ("%s\n%s\n{\"url\": \"%s\"}" % (GOOD, BAD, GOOD_CHILD)).encode()
+        chunks = [body[i:i + 7] for i in range(0, len(body), 7)]
+        spooled = asyncio.run(spool_body(agen(chunks)))
+
+        stream = iter_ndjson_batches(CitationValidator(index), iter_url_batches(spooled, block_bytes=5))
+        records = decode(list(stream))
+        assert [(r["url"], r["is_valid"]) for r in records[:-1]] == [(GOOD, True), (BAD, False), (GOOD_CHILD, True)]
+        assert records[-1]["summary"]["unique"] == 3
+        assert spooled.closed
+
+    def test_stream_line_limit(self):
+        """Test a body without newlines stops at the line limit."""
+        chunks = [b"x" * 100] * 50
+        with pytest.raises(CitationLimitError, match="Line exceeds 1000 bytes"):
+            asyncio.run(spool_body(agen(chunks), max_line_bytes=1000))
+
+    def test_stream_body_limit(self):
+        """Test a body over the size limit is rejected."""
+        chunks = [(GOOD + "\n").encode(), (BAD + "\n").encode() * 10]
+        with pytest.raises(CitationLimitError, match="Request body exceeds"):
+            asyncio.run(spool_body(agen(chunks), max_body_bytes=len(chunks[0]) + 1))
+
+    def test_long_line_split_across_chunks(self):
+        """Test a line over the limit is rejected even when its newline arrives in a later chunk."""
+        with pytest.raises(CitationLimitError):
+            asyncio.run(spool_body(agen([b"a" * 60, b"a" * 60 + b"\n"]), max_line_bytes=100))
+
+    def test_lines_within_limit_accepted(self):
+        """Test many short lines in one chunk do not add up to a line limit error."""
+        spooled = asyncio.run(spool_body(agen([b"a" * 60 + b"\n", b"b" * 60 + b"\n" + b"c" * 60]), max_line_bytes=100))
+        assert [url for urls in iter_url_batches(spooled) for url in urls] == ["a" * 60, "b" * 60, "c" * 60]
@@ -0,0 +1,171 @@
+"""
+Unit tests for the drawing processing client, using the local /parse stub.
+"""
+
+import asyncio
+import httpx
+import pytest
+import sys
+from pathlib import Path
+
+# Add api directory to path
+api_path = Path(__file__).parent.parent / "api"
+sys.path.insert(0, str(api_path))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from drawing_client import CircuitBreaker, CircuitOpenError, DrawingProcessingClient, DrawingServiceError
+import drawing_service_stub
+
+
+@pytest.fixture
+def stub():
+    """Reset the stub service state."""
+    drawing_service_stub.app.state.failures = []
+    drawing_service_stub.app.state.calls = 0
+    return drawing_service_stub.app
+
+
+def make_client(breaker=None, max_retries=2, transport=None):
+    """Create a client with fast backoff pointed at the stub service."""
+    return DrawingProcessingClient(
+        "http://drawing-stub/parse",
+        max_retries=max_retries,
+        backoff_base=0.001,
+        backoff_max=0.002,
+        breaker=breaker,
+        transport=transport or httpx.ASGITransport(app=drawing_service_stub.app),
+    )
+
+
+def parse(client, content=b"%PDF-1.4 fake"):
+    """Run client.parse to completion and close the client."""
+    async def run():
+        try:
+            return await client.parse("plan.pdf", content)
+        finally:
+            await client.aclose()
+    return asyncio.run(run())
+
+
+class TestDrawingProcessingClient:
+    """Tests for DrawingProcessingClient against the stub service."""
+
+    def test_success(self, stub):
+        """Test extracted text is returned."""
+        text = parse(make_client())
+        assert text == "OCR (textract) of plan.pdf: 13 bytes\fSheet 2 notes"
+        assert stub.state.calls == 1
+
+    def test_retries_transient_failures(self, stub):
+        """Test 5xx responses are retried until success."""
+        stub.state.failures = [503, 502]
+        assert parse(make_client(max_retries=2)).startswith("OCR")
+        assert stub.state.calls == 3
+
+    def test_gives_up_after_retries(self, stub):
+        """Test persistent failures raise after the retry budget."""
+        stub.state.failures = [503] * 5
+        with pytest.raises(DrawingServiceError):
+            parse(make_client(max_retries=1))
+        assert stub.state.calls == 2
+
+    def test_client_error_not_retried(self, stub):
+        """Test 4xx responses fail immediately."""
+        stub.state.failures = [422]
+        with pytest.raises(DrawingServiceError):
+            parse(make_client())
+        assert stub.state.calls == 1
+
+    def test_transport_errors_retried(self):
+        """Test connection errors are retried."""
+        attempts = []
+
+        def handler(request):
+            attempts.append(request)
+            if len(attempts) < 2:
+                raise httpx.ConnectError("refused")
+            return httpx.Response(200, text="ok")
+
+        assert parse(make_client(transport=httpx.MockTransport(handler))) == "ok"
+        assert len(attempts) == 2
+
+    def test_circuit_opens_and_fails_fast(self, stub):
+        """Test an open circuit rejects calls without contacting the service."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        stub.state.failures = [503]
+        with pytest.raises(DrawingServiceError):
+            parse(make_client(breaker=breaker, max_retries=0))
+        with pytest.raises(CircuitOpenError):
+            parse(make_client(breaker=breaker))
+        assert stub.state.calls == 1
+
+
+class TestCircuitBreaker:
+    """Tests for CircuitBreaker state transitions."""
+
+    def test_half_open_after_timeout(self):
+        """Test the circuit half-opens after the reset timeout and closes on success."""
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED
+        breaker.record_failure()
+        assert breaker.allow() is False
+
+        now[0] = 10.0
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_half_open_failure_reopens(self):
+        """Test a failed trial call re-opens the circuit."""
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+        breaker.record_failure()
+        now[0] = 10.0
+        assert breaker.allow() is True
+        breaker.record_failure()
+        assert breaker.allow() is False
+
+    def test_half_open_allows_one_probe(self):
+        """Test only one trial call is let through while half-open."""
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+        breaker.record_failure()
+        now[0] = 10.0
+        assert breaker.allow() is True
+        assert breaker.allow() is False
+        breaker.release()
+        assert breaker.allow() is True
+        breaker.record_success()
+        assert breaker.allow() is True
+        assert breaker.allow() is True
+
+    def test_concurrent_calls_single_probe(self):
+        """Test concurrent calls on a half-open circuit send one request."""
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+        breaker.record_failure()
+        now[0] = 10.0
+        attempts = []
+
+        async def handler(request):
+            attempts.append(request)
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, text="ok")
+
+        client = make_client(breaker=breaker, transport=httpx.MockTransport(handler))
+
+        async def run():
+            try:
+                return await asyncio.gather(
+                    *(client.parse("plan.pdf", b"%PDF") for _ in range(5)), return_exceptions=True
+                )
+            finally:
+                await client.aclose()
+
+        results = asyncio.run(run())
+        assert results.count("ok") == 1
+        assert sum(isinstance(result, CircuitOpenError) for result in results) == 4
+        assert len(attempts) == 1
+        assert breaker.state == CircuitBreaker.CLOSED
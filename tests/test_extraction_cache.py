@@ -0,0 +1,71 @@
+"""
+Unit tests for the content-addressed extraction cache.
+"""
+
+import os
+import pytest
+import sys
+from pathlib import Path
+
+# Add api directory to path
+api_path = Path(__file__).parent.parent / "api"
+sys.path.insert(0, str(api_path))
+
+from extraction_cache import ExtractionCache
+
+
+class TestExtractionCache:
+    """Tests for ExtractionCache."""
+
+    def test_key_depends_on_version_and_mode(self):
+        """Test extractor version and mode are part of the key."""
+        key = ExtractionCache.make_key("abc", "v1", "text")
+        assert key == ExtractionCache.make_key("abc", "v1", "text")
+        assert key != ExtractionCache.make_key("abc", "v2", "text")
+        assert key != ExtractionCache.make_key("abc", "v1", "asbuilt")
+        assert key != ExtractionCache.make_key("abd", "v1", "text")
+
+    def test_key_depends_on_chunking(self):
+        """Test chunk size and overlap are part of the key."""
+        key = ExtractionCache.make_key("abc", "v1", "text", 1500, 200)
+        assert key == ExtractionCache.make_key("abc", "v1", "text", 1500, 200)
+        assert key != ExtractionCache.make_key("abc", "v1", "text", 1000, 200)
+        assert key != ExtractionCache.make_key("abc", "v1", "text", 1500, 100)
+
+    def test_round_trip(self, tmp_path):
+        """Test stored extraction results are returned intact."""
+        cache = ExtractionCache(str(tmp_path), max_bytes=10 * 1024 * 1024)
+        value = {"pages": ["a", "b"], "page_count": 2, "chunks": [{"page": 1, "text": "a"}], "fingerprint": "f"}
+        cache.set("k", value)
+        assert cache.get("k") == value
+        assert cache.get("missing") is None
+
+    def test_corrupt_entry_discarded(self, tmp_path):
+        """Test unreadable entries are treated as misses and removed."""
+        cache = ExtractionCache(str(tmp_path), max_bytes=1024 * 1024)
+        (tmp_path / "bad.json.gz").write_bytes(b"not gzip")
+        assert cache.get("bad") is None
+        assert not (tmp_path / "bad.json.gz").exists()
+
+    def test_size_bounded_lru_eviction(self, tmp_path):
+        """Test least recently used entries are evicted over the size limit."""
+        payload = {"pages": [os.urandom(600).hex()]}
+        probe = ExtractionCache(str(tmp_path / "probe"), max_bytes=1024 * 1024)
+        probe.set("p", payload)
+        entry_size = (tmp_path / "probe" / "p.json.gz").stat().st_size
+        limit = int(entry_size * 3.5)
+
+        cache_dir = tmp_path / "cache"
+        cache = ExtractionCache(str(cache_dir), max_bytes=limit)
+        for i, key in enumerate(("a", "b", "c")):
+            cache.set(key, payload)
+            os.utime(cache_dir / f"{key}.json.gz", (1000 + i, 1000 + i))
+        # Reading "a" makes it most recently used
+        assert cache.get("a") is not None
+        cache.set("d", payload)
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("d") is not None
+        total = sum(p.stat().st_size for p in cache_dir.glob("*.json.gz"))
+        assert total <= limit
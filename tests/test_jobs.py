@@ -0,0 +1,327 @@
+"""
+Unit tests for the SQLite-backed background job queue and worker pool.
+"""
+
+import asyncio
+import pytest
+import sys
+from pathlib import Path
+
+# Add api directory to path
+api_path = Path(__file__).parent.parent / "api"
+sys.path.insert(0, str(api_path))
+
+import jobs
+from jobs import (
+    COMPLETED,
+    FAILED,
+    QUEUED,
+    RUNNING,
+    CallbackURLError,
+    JobQueue,
+    JobWorkerPool,
+    check_callback_url,
+    gather_or_cancel,
+    validate_callback_url,
+)
+from pdf_extraction import split_pdf_pages
+
+
+@pytest.fixture
+def queue(tmp_path):
+    """Create a job queue in a temporary database."""
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    yield queue
+    queue.close()
+
+
+class TestJobQueue:
+    """Tests for JobQueue."""
+
+    def test_enqueue_and_get(self, queue):
+        """Test a new job is queued with its payload."""
+        job_id = queue.enqueue("ocr", {"path": "/tmp/a.pdf"}, callback_url="http://hook")
+        job = queue.get(job_id)
+        assert job["status"] == QUEUED
+        assert job["payload"] == {"path": "/tmp/a.pdf"}
+        assert job["callback_url"] == "http://hook"
+        assert queue.get("missing") is None
+
+    def test_claim_in_order(self, queue):
+        """Test jobs are claimed oldest first and only once."""
+        first = queue.enqueue("ocr", {"n": 1})
+        second = queue.enqueue("ocr", {"n": 2})
+        assert queue.claim()["job_id"] == first
+        assert queue.claim()["job_id"] == second
+        assert queue.claim() is None
+        assert queue.get(first)["status"] == RUNNING
+
+    def test_page_progress(self, queue):
+        """Test per-page status and done count."""
+        job_id = queue.enqueue("ocr", {})
+        queue.set_pages_total(job_id, 3)
+        queue.set_page_status(job_id, 0, COMPLETED)
+        queue.set_page_status(job_id, 2, "running")
+        job = queue.get(job_id)
+        assert job["pages_total"] == 3
+        assert job["pages"] == [COMPLETED, "pending", "running"]
+        assert job["pages_done"] == 1
+
+    def test_expired_lease_reclaimed(self, queue, tmp_path):
+        """Test a running job is claimed again only once its lease lapses."""
+        job_id = queue.enqueue("ocr", {})
+        queue.claim("worker-a", lease_seconds=60)
+        other = JobQueue(str(tmp_path / "jobs.sqlite3"))
+        assert other.claim("worker-b") is None
+        other._conn.execute("UPDATE jobs SET lease_expires = 0 WHERE id = ?", (job_id,))
+        assert other.claim("worker-b")["job_id"] == job_id
+        assert other.get(job_id)["owner"] == "worker-b"
+        other.close()
+
+    def test_renew_and_finish_require_owner(self, queue):
+        """Test a worker that lost its lease cannot renew or finish the job."""
+        job_id = queue.enqueue("ocr", {})
+        queue.claim("worker-a")
+        assert queue.renew(job_id, "worker-a")
+        assert not queue.renew(job_id, "worker-b")
+        assert not queue.complete(job_id, {}, owner="worker-b")
+        assert queue.get(job_id)["status"] == RUNNING
+        assert queue.complete(job_id, {"ok": True}, owner="worker-a")
+        assert queue.get(job_id)["status"] == COMPLETED
+        assert not queue.renew(job_id, "worker-a")
+
+    def test_migrates_old_schema(self, tmp_path):
+        """Test a database created before leases gains the new columns."""
+        import sqlite3
+        path = str(tmp_path / "old.sqlite3")
+        conn = sqlite3.connect(path)
+        conn.execute(
+            "CREATE TABLE jobs (id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL,"
+            " payload TEXT NOT NULL, callback_url TEXT, result TEXT, error TEXT,"
+            " pages_total INTEGER NOT NULL DEFAULT 0, pages TEXT NOT NULL DEFAULT '[]',"
+            " created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.commit()
+        conn.close()
+        queue = JobQueue(path)
+        job_id = queue.enqueue("ocr", {})
+        assert queue.claim("worker-a")["job_id"] == job_id
+        queue.close()
+
+
+class TestJobWorkerPool:
+    """Tests for JobWorkerPool."""
+
+    def run_pool(self, queue, handler, job_ids, monkeypatch, **options):
+        """Run a pool until the given jobs finish, returning webhook calls."""
+        hooks = []
+
+        async def fake_webhook(url, job, allowed_hosts):
+            hooks.append((url, job["status"]))
+
+        monkeypatch.setattr(jobs, "send_webhook", fake_webhook)
+
+        async def main():
+            pool = JobWorkerPool(queue, handler, concurrency=2, poll_interval=0.01, **options)
+            pool.start()
+            pool.notify()
+            for _ in range(500):
+                if all(queue.get(j)["status"] in (COMPLETED, FAILED) for j in job_ids):
+                    break
+                await asyncio.sleep(0.01)
+            await pool.stop()
+
+        asyncio.run(main())
+        return hooks
+
+    def test_completes_with_result(self, queue, monkeypatch):
+        """Test handler results are stored and the webhook is called."""
+        async def handler(job, q):
+            q.set_pages_total(job["job_id"], 1)
+            q.set_page_status(job["job_id"], 0, COMPLETED)
+            return {"pages": 1}
+
+        job_id = queue.enqueue("ocr", {}, callback_url="http://hook")
+        hooks = self.run_pool(queue, handler, [job_id], monkeypatch)
+        job = queue.get(job_id)
+        assert job["status"] == COMPLETED
+        assert job["result"] == {"pages": 1}
+        assert hooks == [("http://hook", COMPLETED)]
+
+    def test_failure_recorded(self, queue, monkeypatch):
+        """Test handler errors mark the job failed."""
+        async def handler(job, q):
+            raise RuntimeError("ocr down")
+
+        job_id = queue.enqueue("ocr", {})
+        hooks = self.run_pool(queue, handler, [job_id], monkeypatch)
+        job = queue.get(job_id)
+        assert job["status"] == FAILED
+        assert job["error"] == "ocr down"
+        assert hooks == []
+
+
+    def test_cleanup_after_terminal_state(self, queue, monkeypatch):
+        """Test cleanup runs once the job is completed or failed."""
+        cleaned = []
+
+        async def handler(job, q):
+            if job["payload"]["n"] == 2:
+                raise RuntimeError("bad page")
+            return {}
+
+        job_ids = [queue.enqueue("ocr", {"n": 1}), queue.enqueue("ocr", {"n": 2})]
+        self.run_pool(queue, handler, job_ids, monkeypatch, cleanup=lambda job: cleaned.append(job["payload"]["n"]))
+        assert sorted(cleaned) == [1, 2]
+
+    def test_no_cleanup_when_cancelled(self, queue, tmp_path):
+        """Test a job cancelled at shutdown is requeued with its input kept."""
+        spooled = tmp_path / "job.pdf"
+        spooled.write_bytes(b"%PDF")
+        started = []
+
+        async def handler(job, q):
+            started.append(job["job_id"])
+            await asyncio.sleep(60)
+
+        async def main():
+            pool = JobWorkerPool(queue, handler, concurrency=1, poll_interval=0.01,
+                                 cleanup=lambda job: spooled.unlink())
+            pool.start()
+            for _ in range(200):
+                if started:
+                    break
+                await asyncio.sleep(0.01)
+            await pool.stop()
+
+        job_id = queue.enqueue("ocr", {})
+        asyncio.run(main())
+        assert started == [job_id]
+        assert spooled.exists()
+        assert queue.get(job_id)["status"] == QUEUED
+
+    def test_lost_lease_cancels_handler(self, queue):
+        """Test a worker stops a job another worker has taken over."""
+        cancelled = []
+
+        async def handler(job, q):
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.append(job["job_id"])
+                raise
+
+        async def main():
+            pool = JobWorkerPool(queue, handler, concurrency=1, poll_interval=0.01, lease_seconds=0.06)
+            pool.start()
+            for _ in range(200):
+                if queue.get(job_id)["owner"]:
+                    break
+                await asyncio.sleep(0.01)
+            queue._conn.execute("UPDATE jobs SET owner = 'other', lease_expires = 1e12 WHERE id = ?", (job_id,))
+            for _ in range(200):
+                if cancelled:
+                    break
+                await asyncio.sleep(0.01)
+            await pool.stop()
+
+        job_id = queue.enqueue("ocr", {})
+        asyncio.run(main())
+        assert cancelled == [job_id]
+        job = queue.get(job_id)
+        assert job["status"] == RUNNING
+        assert job["owner"] == "other"
+
+
+class TestGatherOrCancel:
+    """Tests for gather_or_cancel."""
+
+    def test_results_in_order(self):
+        """Test results come back in argument order."""
+        async def value(n, delay):
+            await asyncio.sleep(delay)
+            return n
+
+        results = asyncio.run(gather_or_cancel([value(1, 0.02), value(2, 0), value(3, 0.01)]))
+        assert results == [1, 2, 3]
+
+    def test_first_failure_cancels_rest(self):
+        """Test one failure cancels the awaitables still running."""
+        cancelled = []
+
+        async def slow(n):
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.append(n)
+                raise
+
+        async def fail():
+            raise RuntimeError("page failed")
+
+        with pytest.raises(RuntimeError, match="page failed"):
+            asyncio.run(gather_or_cancel([slow(1), fail(), slow(2)]))
+        assert sorted(cancelled) == [1, 2]
+
+
+class TestCallbackURL:
+    """Tests for webhook URL restrictions."""
+
+    HOSTS = ["hooks.example.com", ".city.gov"]
+
+    @pytest.fixture
+    def resolve(self, monkeypatch):
+        """Resolve every host to the given address."""
+        answer = {"address": "93.184.216.34"}
+
+        def fake_getaddrinfo(host, port, *args, **kwargs):
+            return [(2, 1, 6, "", (answer["address"], port))]
+
+        monkeypatch.setattr(jobs.socket, "getaddrinfo", fake_getaddrinfo)
+        return answer
+
+    def test_allowed_public_host(self, resolve):
+        """Test an allowlisted https host with a public address passes."""
+        validate_callback_url("https://hooks.example.com/done", self.HOSTS)
+        validate_callback_url("https://ops.city.gov:8443/jobs", self.HOSTS)
+
+    @pytest.mark.parametrize("url", [
+        "http://hooks.example.com/done",
+        "https://evil.example.net/",
+        "https://city.gov.evil.net/",
+        "https://user:pw@hooks.example.com/",
+        "file:///etc/passwd",
+    ])
+    def test_rejects_scheme_host_and_credentials(self, resolve, url):
+        """Test non-https, unlisted and credentialed URLs are refused."""
+        with pytest.raises(CallbackURLError):
+            validate_callback_url(url, self.HOSTS)
+
+    @pytest.mark.parametrize("address", ["127.0.0.1", "10.0.0.5", "169.254.169.254", "::1", "fe80::1", "::ffff:192.168.1.1"])
+    def test_rejects_non_public_addresses(self, resolve, address):
+        """Test hosts resolving to internal or metadata addresses are refused."""
+        resolve["address"] = address
+        with pytest.raises(CallbackURLError):
+            validate_callback_url("https://hooks.example.com/", self.HOSTS)
+
+    def test_empty_allowlist_refuses_everything(self, resolve):
+        """Test no host is allowed when the allowlist is empty."""
+        with pytest.raises(CallbackURLError):
+            validate_callback_url("https://hooks.example.com/", [])
+
+    def test_rechecked_before_sending(self):
+        """Test the async check applies the same rules."""
+        with pytest.raises(CallbackURLError):
+            asyncio.run(check_callback_url("https://127.0.0.1/", ["127.0.0.1"]))
+
+
+class TestSplitPDFPages:
+    """Tests for splitting a PDF into single-page documents."""
+
+    def test_split(self, tmp_path, make_pdf):
+        """Test each page becomes its own PDF."""
+        path = tmp_path / "set.pdf"
+        path.write_bytes(make_pdf(["Sheet one", "Sheet two"]))
+        pages = split_pdf_pages(str(path))
+        assert len(pages) == 2
+        assert all(page.startswith(b"%PDF") for page in pages)
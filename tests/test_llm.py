@@ -0,0 +1,144 @@
+"""
+Unit tests for the shared async LLM client.
+"""
+
+import asyncio
+import pytest
+import sys
+from pathlib import Path
+
+# Add api directory to path
+api_path = Path(__file__).parent.parent / "api"
+sys.path.insert(0, str(api_path))
+
+import llm
+from config import settings
+
+
+@pytest.fixture(autouse=True)
+def reset_llm(monkeypatch):
+    """Reset module-level client state between tests."""
+    monkeypatch.setattr(llm, "_client", None)
+    monkeypatch.setattr(llm, "_semaphore", None)
+    monkeypatch.setattr(settings, "ANTHROPIC_API_KEY", "test-key-12345")
+
+
+class TestAsyncClient:
+    """Tests for get_async_client."""
+
+    def test_client_shared(self):
+        """Test the same client is returned on each call."""
+        assert llm.get_async_client() is llm.get_async_client()
+
+    def test_api_key_override_shares_pool(self):
+        """Test a per-request key reuses the shared HTTP pool."""
+        shared = llm.get_async_client()
+        override = llm.get_async_client(api_key="user-key")
+        assert override is not shared
+        assert override.api_key == "user-key"
+        assert override._client is shared._client
+
+
+class TestConcurrencyLimit:
+    """Tests for the per-process LLM concurrency limit."""
+
+    def test_limit_enforced(self, monkeypatch):
+        """Test no more than LLM_MAX_CONCURRENCY calls run at once."""
+        monkeypatch.setattr(settings, "LLM_MAX_CONCURRENCY", 3)
+        state = {"active": 0, "peak": 0}
+
+        class FakeMessages:
+            async def create(self, **kwargs):
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+                await asyncio.sleep(0.01)
+                state["active"] -= 1
+                return kwargs["model"]
+
+        class FakeClient:
+            messages = FakeMessages()
+
+        monkeypatch.setattr(llm, "get_async_client", lambda api_key=None: FakeClient())
+
+        async def run():
+            return await asyncio.gather(*(llm.create_message(model="m") for _ in range(10)))
+
+        results = asyncio.run(run())
+        assert results == ["m"] * 10
+        assert state["peak"] == 3
+
+
+class TestStreamMessage:
+    """Tests for stream_message."""
+
+    def test_yields_deltas(self, monkeypatch):
+        """Test text deltas are yielded in order."""
+
+        class FakeStream:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            @property
+            async def text_stream(self):
+                for delta in ["Trench ", "shoring ", "required."]:
+                    yield delta
+
+        class FakeMessages:
+            def stream(self, **kwargs):
+                return FakeStream()
+
+        class FakeClient:
+            messages = FakeMessages()
+
+        monkeypatch.setattr(llm, "get_async_client", lambda api_key=None: FakeClient())
+
+        async def run():
+            return [delta async for delta in llm.stream_message(model="m")]
+
+        assert asyncio.run(run()) == ["Trench ", "shoring ", "required."]
+
+
+class TestPromptCaching:
+    """Tests for cache-aware request building and usage reporting."""
+
+    def test_system_prompt_cacheable(self):
+        """Test the system prompt is sent as a cacheable block."""
+        request = llm.build_message_request("Q?", "", "SYSTEM")
+        assert request["system"] == [
+            {"type": "text", "text": "SYSTEM", "cache_control": {"type": "ephemeral"}}
+        ]
+        user_content = request["messages"][-1]["content"]
+        assert user_content == [{"type": "text", "text": "User query: Q?"}]
+
+    def test_document_context_not_cached(self):
+        """Test per-query document context precedes the question uncached."""
+        request = llm.build_message_request("Q?", "DOC", "SYSTEM")
+        first, second = request["messages"][-1]["content"]
+        assert first == {"type": "text", "text": "Document context: DOC"}
+        assert "cache_control" not in second
+        assert request["system"][0]["cache_control"] == {"type": "ephemeral"}
+
+    def test_model_defaults_to_settings(self, monkeypatch):
+        """Test the configured model is used unless one is passed."""
+        monkeypatch.setattr(settings, "CLAUDE_MODEL", "configured-model")
+        assert llm.build_message_request("Q?", "", "SYSTEM")["model"] == "configured-model"
+        assert llm.build_message_request("Q?", "", "SYSTEM", model="other")["model"] == "other"
+
+    def test_summarize_usage(self):
+        """Test cache hit, write and miss classification."""
+
+        class Usage:
+            def __init__(self, read, write):
+                self.input_tokens = 10
+                self.output_tokens = 5
+                self.cache_read_input_tokens = read
+                self.cache_creation_input_tokens = write
+
+        assert llm.summarize_usage(Usage(2000, 0))["cache_status"] == "hit"
+        assert llm.summarize_usage(Usage(0, 2000))["cache_status"] == "write"
+        summary = llm.summarize_usage(Usage(None, None))
+        assert summary["cache_status"] == "miss"
+        assert summary["cache_read_input_tokens"] == 0
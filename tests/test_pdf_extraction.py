@@ -0,0 +1,98 @@
+"""
+Unit tests for the page-parallel PDF extraction engine.
+"""
+
+import asyncio
+import io
+import os
+import pytest
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+# Add api directory to path
+api_path = Path(__file__).parent.parent / "api"
+sys.path.insert(0, str(api_path))
+
+import pdf_extraction
+import utils
+from config import settings
+
+
+@pytest.fixture
+def spooled_pdf(make_pdf):
+    """Spool a 20-page PDF to disk and clean it up afterwards."""
+    content = make_pdf([f"Page {i} text" for i in range(1, 21)])
+    path, _ = pdf_extraction.spool_to_disk(io.BytesIO(content))
+    yield path
+    pdf_extraction.remove_spooled(path)
+
+
+class TestPDFExtraction:
+    """Tests for spooling and page extraction."""
+
+    def test_spool_and_count(self, spooled_pdf):
+        """Test the spooled file has the expected page count."""
+        assert pdf_extraction.count_pages(spooled_pdf) == 20
+
+    def test_inline_extraction(self, spooled_pdf, monkeypatch):
+        """Test small documents are extracted inline in order."""
+        monkeypatch.setattr(settings, "PDF_PARALLEL_MIN_PAGES", 100)
+        pages = list(pdf_extraction.iter_pdf_pages(spooled_pdf))
+        assert pages == [(i, f"Page {i} text") for i in range(1, 21)]
+
+    def test_parallel_extraction_in_order(self, spooled_pdf, monkeypatch):
+        """Test pages come back in order when extracted on a process pool."""
+        monkeypatch.setattr(settings, "PDF_PARALLEL_MIN_PAGES", 1)
+        monkeypatch.setattr(settings, "PDF_EXTRACT_BATCH_PAGES", 3)
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            pages = list(pdf_extraction.iter_pdf_pages(spooled_pdf, executor))
+        assert pages == [(i, f"Page {i} text") for i in range(1, 21)]
+
+    def test_async_extraction(self, spooled_pdf, monkeypatch):
+        """Test the async iterator yields every page in order."""
+        monkeypatch.setattr(settings, "PDF_PARALLEL_MIN_PAGES", 1)
+        monkeypatch.setattr(settings, "PDF_EXTRACT_BATCH_PAGES", 4)
+
+        async def run():
+            with ProcessPoolExecutor(max_workers=2) as executor:
+                return [page async for page in pdf_extraction.aiter_pdf_pages(spooled_pdf, executor)]
+
+        assert asyncio.run(run()) == [(i, f"Page {i} text") for i in range(1, 21)]
+
+    def test_remove_spooled(self, make_pdf):
+        """Test spooled files are deleted."""
+        path, digest = pdf_extraction.spool_to_disk(io.BytesIO(make_pdf(["x"])))
+        assert len(digest) == 64
+        pdf_extraction.remove_spooled(path)
+        assert not os.path.exists(path)
+
+    def test_spool_size_limit(self, monkeypatch, tmp_path):
+        """Test an upload over max_bytes is rejected and its partial file removed."""
+        monkeypatch.setattr(pdf_extraction.tempfile, "tempdir", str(tmp_path))
+        with pytest.raises(pdf_extraction.UploadTooLargeError):
+            pdf_extraction.spool_to_disk(io.BytesIO(b"x" * 3 * 1024 * 1024), max_bytes=2 * 1024 * 1024)
+        assert os.listdir(tmp_path) == []
+
+    @pytest.mark.parametrize("content", [b"", b"not a pdf at all"])
+    def test_unreadable_pdf(self, content):
+        """Test empty and corrupt files raise PDFExtractionError."""
+        path, _ = pdf_extraction.spool_to_disk(io.BytesIO(content))
+        try:
+            with pytest.raises(pdf_extraction.PDFExtractionError):
+                pdf_extraction.count_pages(path)
+        finally:
+            pdf_extraction.remove_spooled(path)
+
+    def test_thread_pool_fallback(self, spooled_pdf, monkeypatch):
+        """Test extraction falls back to threads when processes are unavailable."""
+        def no_processes(max_workers=None):
+            raise OSError(38, "Function not implemented")
+
+        monkeypatch.setattr(utils, "ProcessPoolExecutor", no_processes)
+        pool = utils.create_process_pool(2, "test")
+        assert isinstance(pool, ThreadPoolExecutor)
+        monkeypatch.setattr(settings, "PDF_PARALLEL_MIN_PAGES", 1)
+        with pool:
+            pages = list(pdf_extraction.iter_pdf_pages(spooled_pdf, pool))
+        assert pages == [(i, f"Page {i} text") for i in range(1, 21)]
@@ -0,0 +1,184 @@
+"""
+Unit tests for streamed session report rendering.
+"""
+
+import gzip
+import io
+import json
+import pytest
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import PyPDF2
+
+# Add api directory to path
+api_path = Path(__file__).parent.parent / "api"
+sys.path.insert(0, str(api_path))
+
+from reports import (
+    CachedReport,
+    ReportCache,
+    choose_encoding,
+    etag_matches,
+    iter_compressed,
+    render_export,
+    render_report,
+    report_etag,
+    report_payload,
+)
+from session_records import DocumentRecord, QARecord, SessionRecord
+from utils import SessionManager
+
+
+def make_session(questions=2):
+    return SessionRecord(
+        created_at=datetime(2025, 1, 1),
+        last_accessed=datetime(2025, 1, 1),
+        documents=[DocumentRecord(
+            filename="<plan>.pdf",
+            department="water_sewer",
+            role="engineer",
+            analysis="Uses \"Type A\" & 'Type B' pipe",
+            file_size="1.00 MB",
+            uploaded_at=datetime(2025, 1, 1, 9, 30),
+        )],
+        questions=[
+            QARecord(
+                question=f"Question {i} <b>?</b>",
+                answer=f"Answer {i}",
+                department="streets_highways",
+                role=None,
+                timestamp=datetime(2025, 1, 1, 10, 0),
+            )
+            for i in range(1, questions + 1)
+        ],
+    )
+
+
+def render(session, **kwargs):
+    return "".join(render_report(session, "abc-123", generated_at=datetime(2025, 1, 2), **kwargs))
+
+
+class TestRenderReport:
+    """Tests for render_report."""
+
+    def test_escaping_matches_sanitize_html(self):
+        """Test user content is escaped exactly as sanitize_html does."""
+        html = render(make_session())
+        assert "&lt;plan&gt;.pdf" in html
+        assert "Uses &quot;Type A&quot; &amp; &#39;Type B&#39; pipe" in html
+        assert "Question 1 &lt;b&gt;?&lt;/b&gt;" in html
+
+    def test_content(self):
+        """Test counts, numbering and metadata are rendered."""
+        html = render(make_session(3))
+        assert "Documents Analyzed (1)" in html
+        assert "Questions & Answers (3)" in html
+        assert "<strong>Q3 (streets_highways):</strong>" in html
+        assert "water_sewer • engineer" in html
+        assert " (1.00 MB)" in html
+        assert "Uploaded: 2025-01-01T09:30:00" in html
+        assert "Generated:</strong> 2025-01-02 00:00:00" in html
+
+    def test_no_frontend_ui(self):
+        """Test the report carries no upload form or scripts."""
+        html = render(make_session())
+        assert "<script" not in html
+        assert "fileInput" not in html
+        assert html.rstrip().endswith("</html>")
+
+    def test_streams_in_chunks(self):
+        """Test large sessions are yielded as several chunks."""
+        chunks = list(render_report(make_session(500), "abc-123", chunk_chars=4096))
+        assert len(chunks) > 10
+        assert "Q500 (" in "".join(chunks)
+
+    def test_plain_dict_session(self):
+        """Test plain dict sessions still render."""
+        html = render({"documents": [], "questions": [{"question": "q", "answer": "a", "department": "d", "timestamp": "t"}]})
+        assert "Questions & Answers (1)" in html
+
+
+class TestExports:
+    """Tests for the JSON and PDF exports."""
+
+    def test_json(self):
+        """Test the JSON export carries every entry as plain data."""
+        payload = report_payload(make_session(2), "abc-123", generated_at=datetime(2025, 1, 2))
+        data = json.loads(render_export("json", payload))
+        assert data["session_id"] == "abc-123"
+        assert data["questions"][1]["question"] == "Question 2 <b>?</b>"
+        assert data["documents"][0]["uploaded_at"] == "2025-01-01T09:30:00"
+
+    def test_pdf(self):
+        """Test the PDF export is readable and paginates long sessions."""
+        payload = report_payload(make_session(100), "abc-123")
+        reader = PyPDF2.PdfReader(io.BytesIO(render_export("pdf", payload)))
+        assert len(reader.pages) > 1
+        first = reader.pages[0].extract_text()
+        assert "Knowledge Capture Report" in first
+        assert "<plan>.pdf" in first
+
+    def test_unknown_format(self):
+        """Test unsupported formats are rejected."""
+        with pytest.raises(ValueError):
+            render_export("docx", {})
+
+
+class TestCaching:
+    """Tests for report caching, ETags and compression."""
+
+    def test_etag_matching(self):
+        """Test weak comparison against If-None-Match."""
+        etag = report_etag("abc", 3, "html")
+        assert etag_matches(etag, etag)
+        assert etag_matches('"other", ' + etag[2:], etag)
+        assert etag_matches("*", etag)
+        assert not etag_matches(report_etag("abc", 4, "html"), etag)
+        assert not etag_matches(None, etag)
+
+    def test_choose_encoding(self):
+        """Test encoding negotiation."""
+        assert choose_encoding("gzip, deflate") == "gzip"
+        assert choose_encoding("gzip;q=0") == "identity"
+        assert choose_encoding(None) == "identity"
+
+    def test_streaming_gzip(self):
+        """Test incremental gzip output decompresses to the input."""
+        chunks = [b"<p>%d</p>" % i for i in range(1000)]
+        assert gzip.decompress(b"".join(iter_compressed(chunks, "gzip"))) == b"".join(chunks)
+
+    def test_cached_variants(self):
+        """Test compressed variants are computed once and kept."""
+        report = CachedReport(b"x" * 1000, "text/html")
+        encoded = report.encoded("gzip")
+        assert gzip.decompress(encoded) == b"x" * 1000
+        assert report.encoded("gzip") is encoded
+
+    def test_stale_versions_replaced(self):
+        """Test a new version replaces the previous one for the same format."""
+        cache = ReportCache(max_bytes=10_000)
+        cache.set(("s", 1, "html"), CachedReport(b"v1", "text/html"))
+        cache.set(("s", 1, "pdf"), CachedReport(b"p1", "application/pdf"))
+        cache.set(("s", 2, "html"), CachedReport(b"v2", "text/html"))
+        assert cache.get(("s", 1, "html")) is None
+        assert cache.get(("s", 1, "pdf")) is not None
+        assert len(cache) == 2
+
+    def test_lru_eviction(self):
+        """Test the least recently used reports go first."""
+        cache = ReportCache(max_bytes=250)
+        for name in ("a", "b", "c"):
+            cache.set((name, 0, "html"), CachedReport(b"x" * 100, "text/html"))
+        assert cache.get(("a", 0, "html")) is None
+        assert cache.get(("c", 0, "html")) is not None
+
+    def test_session_version_bumps(self):
+        """Test adding a question or document changes the session version."""
+        manager = SessionManager()
+        session_id = manager.create_session()
+        assert manager.get_session(session_id)["version"] == 0
+        manager.add_question(session_id, "q", "a", "water_sewer")
+        manager.add_document(session_id, DocumentRecord(filename="a.pdf"))
+        assert manager.get_session(session_id)["version"] == 2
@@ -0,0 +1,94 @@
+"""
+Unit tests for the SQLite response cache.
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Add api directory to path
+api_path = Path(__file__).parent.parent / "api"
+sys.path.insert(0, str(api_path))
+
+import response_cache
+from response_cache import ResponseCache, make_cache_key, normalize_question, document_fingerprint
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Create a cache backed by a temporary database."""
+    cache = ResponseCache(str(tmp_path / "responses.sqlite3"), ttl_seconds=60, max_entries=3)
+    yield cache
+    cache.close()
+
+
+class TestCacheKey:
+    """Tests for question normalization and key building."""
+
+    def test_normalize_question(self):
+        """Test case, whitespace and trailing punctuation are ignored."""
+        assert normalize_question("  Trench  shoring requirements for 6 ft?? ") == \
+            "trench shoring requirements for 6 ft"
+
+    def test_equivalent_questions_share_key(self):
+        """Test normalized-equal questions map to the same key."""
+        a = make_cache_key("What is OSHA 1926?", "safety", None, "", "v1")
+        b = make_cache_key("what is  osha 1926", "safety", None, "", "v1")
+        assert a == b
+
+    def test_context_changes_key(self):
+        """Test department, role, document and whitelist version are part of the key."""
+        base = make_cache_key("q", "safety", "engineer", "", "v1")
+        assert base != make_cache_key("q", "water_distribution", "engineer", "", "v1")
+        assert base != make_cache_key("q", "safety", "director", "", "v1")
+        assert base != make_cache_key("q", "safety", "engineer", document_fingerprint("doc"), "v1")
+        assert base != make_cache_key("q", "safety", "engineer", "", "v2")
+
+    def test_document_fingerprint_empty(self):
+        """Test no document yields an empty fingerprint."""
+        assert document_fingerprint("") == ""
+        assert document_fingerprint(None) == ""
+
+
+class TestResponseCache:
+    """Tests for ResponseCache storage, TTL and eviction."""
+
+    def test_set_and_get(self, cache):
+        """Test a stored value is returned."""
+        cache.set("k", {"answer": "a"})
+        assert cache.get("k") == {"answer": "a"}
+        assert cache.get("missing") is None
+
+    def test_persists_across_instances(self, tmp_path):
+        """Test entries survive reopening the database."""
+        path = str(tmp_path / "responses.sqlite3")
+        first = ResponseCache(path, ttl_seconds=60, max_entries=10)
+        first.set("k", {"answer": "a"})
+        first.close()
+        second = ResponseCache(path, ttl_seconds=60, max_entries=10)
+        assert second.get("k") == {"answer": "a"}
+        second.close()
+
+    def test_ttl_expiry(self, cache, monkeypatch):
+        """Test entries older than the TTL are not returned."""
+        now = [1000.0]
+        monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+        cache.set("k", {"answer": "a"})
+        now[0] += 61
+        assert cache.get("k") is None
+
+    def test_lru_eviction(self, cache, monkeypatch):
+        """Test the least recently used entry is evicted first."""
+        now = [1000.0]
+        monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+        for key in ("a", "b", "c"):
+            now[0] += 1
+            cache.set(key, {"answer": key})
+        now[0] += 1
+        cache.get("a")
+        now[0] += 1
+        cache.set("d", {"answer": "d"})
+
+        assert len(cache) == 3
+        assert cache.get("b") is None
+        assert cache.get("a") == {"answer": "a"}
@@ -0,0 +1,76 @@
+"""
+Unit tests for document chunking and BM25 retrieval.
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Add api directory to path
+api_path = Path(__file__).parent.parent / "api"
+sys.path.insert(0, str(api_path))
+
+from retrieval import BM25Index, build_retrieval_context, chunk_pages
+
+
+class TestChunkPages:
+    """Tests for page-aware chunking."""
+
+    def test_short_pages_one_chunk_each(self):
+        """Test short pages become one chunk tagged with their page number."""
+        chunks = chunk_pages(["first page", "", "third page"], chunk_chars=100, overlap=10)
+        assert chunks == [{"page": 1, "text": "first page"}, {"page": 3, "text": "third page"}]
+
+    def test_long_page_split_with_overlap(self):
+        """Test long pages split on whitespace within the size limit."""
+        text = " ".join(f"word{i}" for i in range(200))
+        chunks = chunk_pages([text], chunk_chars=100, overlap=20)
+        assert len(chunks) > 1
+        assert all(len(chunk["text"]) <= 100 for chunk in chunks)
+        assert all(chunk["page"] == 1 for chunk in chunks)
+        # Consecutive chunks share some words
+        assert set(chunks[0]["text"].split()) & set(chunks[1]["text"].split())
+        # No words are lost
+        covered = set(word for chunk in chunks for word in chunk["text"].split())
+        assert covered == set(text.split())
+
+
+class TestBM25Index:
+    """Tests for BM25 ranking."""
+
+    def test_relevant_chunk_ranked_first(self):
+        """Test the chunk mentioning the query terms ranks first."""
+        chunks = [
+            {"page": 1, "text": "Asphalt patching procedures for potholes."},
+            {"page": 2, "text": "Trench shoring is required for excavations deeper than 5 feet."},
+            {"page": 3, "text": "Hydrant flushing schedule and records."},
+        ]
+        results = BM25Index(chunks).search("trench shoring depth", k=2)
+        assert results[0][0] == 1
+
+    def test_no_match(self):
+        """Test unknown terms return no results."""
+        assert BM25Index([{"page": 1, "text": "alpha"}]).search("zulu", k=3) == []
+
+
+class TestBuildRetrievalContext:
+    """Tests for context assembly."""
+
+    def test_page_references_and_order(self):
+        """Test selected chunks are labelled with pages in document order."""
+        chunks = [
+            {"page": 1, "text": "confined space permit"},
+            {"page": 2, "text": "unrelated text"},
+            {"page": 5, "text": "confined space rescue plan"},
+        ]
+        context = build_retrieval_context("confined space", "fp-order", chunks, k=2)
+        assert context == "[Page 1]\nconfined space permit\n\n[Page 5]\nconfined space rescue plan"
+
+    def test_fallback_to_leading_chunks(self):
+        """Test the first chunks are used when nothing matches."""
+        chunks = [{"page": 1, "text": "alpha"}, {"page": 2, "text": "bravo"}]
+        assert build_retrieval_context("zulu", "fp-fallback", chunks, k=1) == "[Page 1]\nalpha"
+
+    def test_empty_document(self):
+        """Test no chunks yields no context."""
+        assert build_retrieval_context("q", "fp-empty", []) == ""
@@ -0,0 +1,104 @@
+"""
+Unit tests for the semantic near-duplicate cache.
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add api directory to path
+api_path = Path(__file__).parent.parent / "api"
+sys.path.insert(0, str(api_path))
+
+from semantic_cache import HashingEmbedder, SemanticCache, get_embedder
+
+
+class TestHashingEmbedder:
+    """Tests for the hashing vectorizer fallback."""
+
+    def test_normalized(self):
+        """Test vectors are unit length."""
+        vector = HashingEmbedder().embed("Trench shoring requirements")
+        assert np.isclose(np.linalg.norm(vector), 1.0)
+
+    def test_deterministic(self):
+        """Test the same text always embeds the same way."""
+        a = HashingEmbedder().embed("confined space entry permit")
+        b = HashingEmbedder().embed("confined space entry permit")
+        assert np.array_equal(a, b)
+
+    def test_empty_text(self):
+        """Test empty text embeds to a zero vector."""
+        assert not HashingEmbedder().embed("").any()
+
+    def test_fallback_when_model_missing(self):
+        """Test an unavailable local model falls back to hashing."""
+        assert isinstance(get_embedder("/nonexistent/model"), HashingEmbedder)
+        assert isinstance(get_embedder(None), HashingEmbedder)
+
+
+class TestSemanticCache:
+    """Tests for SemanticCache lookups."""
+
+    def test_paraphrase_hit(self):
+        """Test a paraphrase returns the cached answer."""
+        cache = SemanticCache(threshold=0.85)
+        cache.add("safety", "What are the trench shoring requirements for 6 ft?", {"answer": "a"})
+        match = cache.lookup("safety", "what are trench shoring requirements for 6 ft trenches")
+        assert match is not None
+        assert match[0] == {"answer": "a"}
+
+    def test_unrelated_miss(self):
+        """Test an unrelated question misses."""
+        cache = SemanticCache(threshold=0.85)
+        cache.add("safety", "What PPE is required for confined space entry?", {"answer": "a"})
+        assert cache.lookup("safety", "How do I repair a water main break?") is None
+
+    def test_numbers_must_match(self):
+        """Test questions differing only in a number do not share answers."""
+        cache = SemanticCache(threshold=0.5)
+        cache.add("safety", "trench shoring requirements for 6 ft", {"answer": "6"})
+        assert cache.lookup("safety", "trench shoring requirements for 12 ft") is None
+
+    def test_scopes_isolated(self):
+        """Test entries are only visible within their scope."""
+        cache = SemanticCache(threshold=0.85)
+        cache.add("safety", "confined space entry permit", {"answer": "a"})
+        assert cache.lookup("water_distribution", "confined space entry permit") is None
+
+    def test_capacity_bounded(self):
+        """Test the oldest entries are overwritten once a scope is full."""
+        cache = SemanticCache(threshold=0.99, max_entries_per_scope=2)
+        cache.add("s", "alpha procedure", {"answer": "alpha"})
+        cache.add("s", "bravo procedure", {"answer": "bravo"})
+        cache.add("s", "charlie procedure", {"answer": "charlie"})
+        assert len(cache) == 2
+        assert cache.lookup("s", "alpha procedure") is None
+        assert cache.lookup("s", "charlie procedure")[0] == {"answer": "charlie"}
+
+    def test_index_grows_on_demand(self):
+        """Test a scope's vector array grows with its entries, up to capacity."""
+        cache = SemanticCache(threshold=0.99, max_entries_per_scope=40)
+        cache.add("s", "question 0", {"answer": 0})
+        index = cache._indexes["s"]
+        assert len(index.vectors) == 16
+        for i in range(1, 50):
+            cache.add("s", f"question {i}", {"answer": i})
+        assert len(index.vectors) == 40
+        assert len(cache) == 40
+        assert cache.lookup("s", "question 49")[0] == {"answer": 49}
+        assert cache.lookup("s", "question 20")[0] == {"answer": 20}
+        assert cache.lookup("s", "question 5") is None
+
+    def test_scopes_lru_bounded(self):
+        """Test the least recently used scope is dropped past max_scopes."""
+        cache = SemanticCache(threshold=0.99, max_scopes=2)
+        cache.add("a", "alpha procedure", {"answer": "a"})
+        cache.add("b", "alpha procedure", {"answer": "b"})
+        assert cache.lookup("a", "alpha procedure") is not None
+        cache.add("c", "alpha procedure", {"answer": "c"})
+        assert cache.lookup("b", "alpha procedure") is None
+        assert cache.lookup("a", "alpha procedure")[0] == {"answer": "a"}
+        assert cache.lookup("c", "alpha procedure")[0] == {"answer": "c"}
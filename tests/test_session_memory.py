@@ -0,0 +1,145 @@
+"""
+Unit tests for session memory budgets and spill-to-disk.
+"""
+
+import pytest
+import socket
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add api directory to path
+api_path = Path(__file__).parent.parent / "api"
+sys.path.insert(0, str(api_path))
+
+from session_memory import MemoryBudget, SpillableList, SpillStore, estimate_size
+from session_store import MemorySessionStore
+
+
+@pytest.fixture
+def spill_store(tmp_path):
+    """Create a spill store in a temporary directory."""
+    return SpillStore(str(tmp_path / "spill"))
+
+
+def qa(i, size=100):
+    return {"question": f"q{i}", "answer": "a" * size}
+
+
+def make_budget(spill_store, session_bytes=10_000, global_bytes=100_000, large_item_bytes=50_000):
+    return MemoryBudget(
+        spill_store,
+        session_bytes=session_bytes,
+        global_bytes=global_bytes,
+        large_item_bytes=large_item_bytes,
+        keep_recent=2,
+    )
+
+
+class TestSpillableList:
+    """Tests for SpillableList."""
+
+    def test_spilled_items_read_back(self, spill_store):
+        """Test spilled items are paged back transparently."""
+        items = SpillableList(spill_store, [qa(i) for i in range(5)])
+        before = items.resident_bytes
+        freed = items.spill(1) + items.spill(3)
+        assert freed == estimate_size(qa(1)) * 2
+        assert items.resident_bytes == before - freed
+        assert items == [qa(i) for i in range(5)]
+        assert items[3] == qa(3)
+        assert items[1:3] == [qa(1), qa(2)]
+        assert items.spilled_count == 2
+        assert spill_store.spilled_bytes > 0
+
+    def test_reads_stay_spilled(self, spill_store):
+        """Test reading does not make items resident again."""
+        items = SpillableList(spill_store, [qa(0)])
+        items.spill(0)
+        list(items)
+        assert items.resident_bytes == 0
+
+    def test_spill_oldest_keeps_recent(self, spill_store):
+        """Test the newest items stay resident."""
+        items = SpillableList(spill_store, [qa(i) for i in range(6)])
+        items.spill_oldest(0, keep_recent=2)
+        assert items.spilled_count == 4
+        assert items.resident_bytes == estimate_size(qa(4)) + estimate_size(qa(5))
+
+    def test_release_deletes_files(self, spill_store):
+        """Test release removes spilled blobs."""
+        items = SpillableList(spill_store, [qa(0), qa(1)])
+        items.spill(0)
+        items.release()
+        assert spill_store.spilled_bytes == 0
+        assert list(Path(spill_store.directory).iterdir()) == []
+
+
+    def test_purges_stale_blobs(self, tmp_path):
+        """Test blobs left by dead processes and older layouts are removed."""
+        root = tmp_path / "spill"
+        dead = root / f"{socket.gethostname()}-999999999-abcd1234"
+        dead.mkdir(parents=True)
+        (dead / "old.z").write_bytes(b"x")
+        (root / "legacy.z").write_bytes(b"x")
+        store = SpillStore(str(root))
+        assert not dead.exists()
+        assert not (root / "legacy.z").exists()
+        assert Path(store.directory).is_dir()
+        ref, _ = store.put(qa(0))
+        SpillStore(str(root))
+        assert store.get(ref) == qa(0)
+
+
+class TestMemoryBudget:
+    """Tests for MemoryBudget."""
+
+    def test_large_documents_spilled(self, spill_store):
+        """Test document entries over the item threshold go to disk."""
+        budget = make_budget(spill_store, large_item_bytes=1000)
+        session = {"documents": [{"filename": "big.pdf", "analysis": "x" * 5000}], "questions": []}
+        budget.enforce("s", session)
+        assert isinstance(session["documents"], SpillableList)
+        assert session["documents"].spilled_count == 1
+        assert session["documents"][0]["analysis"] == "x" * 5000
+        assert budget.resident_bytes == 0
+
+    def test_session_budget(self, spill_store):
+        """Test old Q&A entries are spilled to fit the session budget."""
+        budget = make_budget(spill_store, session_bytes=1000)
+        session = {"documents": [], "questions": [qa(i, 300) for i in range(10)]}
+        budget.enforce("s", session)
+        assert budget.resident_bytes <= 1000
+        assert session["questions"][0] == qa(0, 300)
+        assert len(session["questions"]) == 10
+
+    def test_chunks_budgeted(self, spill_store):
+        """Test retrieval chunks count toward the budget and are spilled last."""
+        budget = make_budget(spill_store, session_bytes=2000)
+        chunks = [{"page": i + 1, "text": "t" * 300} for i in range(10)]
+        session = {"questions": [qa(0, 300)], "chunks": list(chunks)}
+        budget.enforce("s", session)
+        assert budget.resident_bytes <= 2000
+        assert isinstance(session["chunks"], SpillableList)
+        assert session["chunks"].spilled_count > 0
+        assert session["chunks"] == chunks
+
+    def test_global_budget_spills_lru_first(self, spill_store):
+        """Test the least recently used sessions are spilled first."""
+        budget = make_budget(spill_store, global_bytes=5000)
+        store = MemorySessionStore(ttl_seconds=3600, budget=budget)
+        for name in ("old", "mid", "new"):
+            store.set(name, {"last_accessed": datetime.now(), "questions": [qa(i, 400) for i in range(5)]})
+        assert budget.resident_bytes <= 5000
+        assert store.get("old")["questions"].spilled_count == 5
+        assert store.get("new")["questions"].spilled_count == 0
+
+    def test_delete_releases(self, spill_store):
+        """Test deleting a session frees its resident and spilled bytes."""
+        budget = make_budget(spill_store, session_bytes=500)
+        store = MemorySessionStore(ttl_seconds=3600, budget=budget)
+        store.set("s", {"last_accessed": datetime.now(), "questions": [qa(i, 300) for i in range(5)]})
+        assert spill_store.spilled_bytes > 0
+        store.delete("s")
+        assert budget.metrics()["resident_bytes"] == 0
+        assert budget.metrics()["spilled_bytes"] == 0
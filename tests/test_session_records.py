@@ -0,0 +1,91 @@
+"""
+Unit tests for the compact session record types.
+"""
+
+import pytest
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add api directory to path
+api_path = Path(__file__).parent.parent / "api"
+sys.path.insert(0, str(api_path))
+
+from session_records import DocumentRecord, QARecord, SessionRecord, decode_session, encode_session
+from utils import SessionManager
+
+
+class TestRecord:
+    """Tests for the mapping interface of records."""
+
+    def test_item_access(self):
+        """Test fields read and write like dict keys."""
+        qa = QARecord(question="q", answer="a", department="water")
+        assert qa["question"] == "q"
+        assert qa.get("role") is None
+        assert "role" not in qa
+        qa["role"] = "engineer"
+        assert "role" in qa
+        assert set(qa.keys()) == {"question", "answer", "department", "role"}
+
+    def test_unknown_field(self):
+        """Test fields outside __slots__ are rejected."""
+        with pytest.raises(KeyError):
+            QARecord(colour="blue")
+        with pytest.raises(KeyError):
+            QARecord()["question"]
+
+    def test_no_instance_dict(self):
+        """Test records carry no per-instance __dict__."""
+        assert not hasattr(QARecord(question="q"), "__dict__")
+
+    def test_interned(self):
+        """Test department and role strings are shared."""
+        a = QARecord(department="".join(["stormwater_", "management"]))
+        b = QARecord(department="".join(["stormwater", "_management"]))
+        assert a.department is b.department
+
+    def test_timestamps(self):
+        """Test timestamps are epoch floats that read back as before."""
+        when = datetime(2025, 3, 4, 5, 6, 7)
+        session = SessionRecord(created_at=when, last_accessed=when.timestamp())
+        assert isinstance(session.created_at, float)
+        assert session["created_at"] == when
+        assert session["last_accessed"] == when
+
+        doc = DocumentRecord(uploaded_at=when.isoformat())
+        assert isinstance(doc.uploaded_at, float)
+        assert doc["uploaded_at"] == when.isoformat()
+
+    def test_equality_with_dict(self):
+        """Test records compare equal to the equivalent dict."""
+        assert QARecord(question="q", answer="a") == {"question": "q", "answer": "a"}
+
+    def test_nested_records(self):
+        """Test session lists are converted to records."""
+        session = SessionRecord(questions=[{"question": "q"}], documents=[{"filename": "a.pdf"}])
+        assert isinstance(session["questions"][0], QARecord)
+        assert isinstance(session["documents"][0], DocumentRecord)
+
+    def test_encode_round_trip(self):
+        """Test a session survives JSON serialization."""
+        session = SessionRecord(
+            created_at=datetime(2025, 1, 1), last_accessed=datetime(2025, 1, 1),
+            questions=[QARecord(question="q", answer="a", timestamp=datetime(2025, 1, 1))],
+            documents=[],
+        )
+        assert SessionRecord.from_dict(decode_session(encode_session(session))) == session
+
+
+class TestSessionManagerRecords:
+    """Tests for SessionManager with records."""
+
+    def test_add_question(self):
+        """Test Q&A entries are stored as records."""
+        manager = SessionManager()
+        session_id = manager.create_session()
+        assert manager.add_question(session_id, "q", "a", "water_sewer", None) is True
+        qa = manager.get_session(session_id)["questions"][0]
+        assert qa["question"] == "q"
+        assert qa["department"] == "water_sewer"
+        assert manager.add_question("missing", "q", "a", "water_sewer") is False
@@ -0,0 +1,212 @@
+"""
+Unit tests for the pluggable session store backends.
+"""
+
+import asyncio
+import pytest
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add api directory to path
+api_path = Path(__file__).parent.parent / "api"
+sys.path.insert(0, str(api_path))
+
+from session_store import (
+    MemorySessionStore,
+    RedisSessionStore,
+    SQLiteSessionStore,
+    create_session_store,
+    decode_session,
+    encode_session,
+)
+from utils import SessionManager
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def sample_session():
+    now = datetime(2025, 1, 2, 3, 4, 5)
+    return {"created_at": now, "last_accessed": now, "questions": [], "documents": [{"filename": "a.pdf"}]}
+
+
+class TestEncoding:
+    """Tests for session serialization."""
+
+    def test_round_trip(self):
+        """Test datetimes survive a JSON round trip."""
+        session = sample_session()
+        assert decode_session(encode_session(session)) == session
+
+
+class TestMemorySessionStore:
+    """Tests for MemorySessionStore."""
+
+    def test_set_get_delete(self):
+        """Test basic storage operations."""
+        store = MemorySessionStore(ttl_seconds=60)
+        store.set("a", {"last_accessed": datetime.now()})
+        assert "a" in store
+        assert store.count() == 1
+        assert store.delete("a") is True
+        assert store.get("a") is None
+
+    def test_expired_on_read(self):
+        """Test a stale session is dropped when read."""
+        store = MemorySessionStore(ttl_seconds=60)
+        store.set("a", {"last_accessed": datetime.now() - timedelta(minutes=5)})
+        assert store.get("a") is None
+        assert store.count() == 0
+
+    def test_cleanup_stops_at_first_live_session(self):
+        """Test cleanup removes the expired prefix without visiting live sessions."""
+        store = MemorySessionStore(ttl_seconds=60)
+        old = datetime.now() - timedelta(minutes=5)
+        store.set("old-1", {"last_accessed": old})
+        store.set("old-2", {"last_accessed": old})
+        store.set("live", {"last_accessed": datetime.now()})
+
+        class Tripwire(dict):
+            def get(self, key, default=None):
+                raise AssertionError("visited a session after the first live one")
+
+        store.set("after", Tripwire(last_accessed=datetime.now()))
+        assert store.cleanup_expired() == 2
+        assert list(store) == ["live", "after"]
+
+    def test_set_moves_to_end(self):
+        """Test re-saving a session moves it behind newer ones."""
+        store = MemorySessionStore(ttl_seconds=60)
+        store.set("a", {"last_accessed": datetime.now()})
+        store.set("b", {"last_accessed": datetime.now()})
+        store.set("a", {"last_accessed": datetime.now()})
+        assert list(store) == ["b", "a"]
+
+    def test_save_without_access_keeps_order(self):
+        """Test saving a session whose last_accessed is unchanged keeps its place."""
+        store = MemorySessionStore(ttl_seconds=60)
+        old = datetime.now() - timedelta(minutes=5)
+        session = {"last_accessed": old, "questions": []}
+        store.set("old", session)
+        store.set("live", {"last_accessed": datetime.now()})
+        session["questions"].append("q")
+        store.set("old", session)
+        assert list(store) == ["old", "live"]
+        assert store.cleanup_expired() == 1
+        assert list(store) == ["live"]
+
+    def test_add_question_keeps_expiry_order(self):
+        """Test SessionManager writes do not reorder sessions ahead of their expiry."""
+        manager = SessionManager(MemorySessionStore(ttl_seconds=60))
+        first = manager.create_session()
+        second = manager.create_session()
+        manager.add_question(first, "q", "a", "general")
+        assert list(manager.sessions) == [first, second]
+
+
+class TestSQLiteSessionStore:
+    """Tests for SQLiteSessionStore."""
+
+    def test_persists_across_instances(self, tmp_path):
+        """Test sessions are visible to another store on the same file."""
+        path = str(tmp_path / "sessions.sqlite3")
+        SQLiteSessionStore(path, ttl_seconds=60).set("a", sample_session())
+        assert SQLiteSessionStore(path, ttl_seconds=60).get("a") == sample_session()
+
+    def test_ttl(self, tmp_path):
+        """Test sessions expire after the TTL and set() refreshes it."""
+        clock = FakeClock()
+        store = SQLiteSessionStore(str(tmp_path / "s.sqlite3"), ttl_seconds=60, clock=clock)
+        store.set("a", sample_session())
+        store.set("b", sample_session())
+        clock.now += 50
+        store.set("b", sample_session())
+        clock.now += 20
+        assert store.get("a") is None
+        assert store.get("b") is not None
+        assert store.count() == 1
+        assert store.cleanup_expired() == 1
+
+    def test_delete(self, tmp_path):
+        """Test delete reports whether the session existed."""
+        store = SQLiteSessionStore(str(tmp_path / "s.sqlite3"), ttl_seconds=60)
+        store.set("a", sample_session())
+        assert store.delete("a") is True
+        assert store.delete("a") is False
+
+
+class TestRedisSessionStore:
+    """Tests for RedisSessionStore against fakeredis."""
+
+    @pytest.fixture
+    def store(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        return RedisSessionStore(ttl_seconds=60, client=fakeredis.FakeRedis())
+
+    def test_set_get(self, store):
+        """Test sessions round-trip through Redis."""
+        store.set("a", sample_session())
+        assert store.get("a") == sample_session()
+        assert store.count() == 1
+        assert store.delete("a") is True
+        assert store.get("a") is None
+
+    def test_count_drops_expired_sessions(self):
+        """Test count uses the expiry index and ignores sessions past their TTL."""
+        fakeredis = pytest.importorskip("fakeredis")
+        clock = FakeClock()
+        store = RedisSessionStore(ttl_seconds=60, client=fakeredis.FakeRedis(), clock=clock)
+        store.set("a", sample_session())
+        clock.now += 30
+        store.set("b", sample_session())
+        assert store.count() == 2
+        clock.now += 45
+        assert store.count() == 1
+        store.delete("b")
+        assert store.count() == 0
+
+    def test_ttl_set_by_backend(self, store):
+        """Test keys carry a Redis expiry."""
+        store.set("a", sample_session())
+        assert 0 < store._client.ttl("pipewrench:session:a") <= 60
+
+
+class TestSessionManagerBackends:
+    """Tests for SessionManager on persistent backends."""
+
+    def test_save_session(self, tmp_path):
+        """Test changes persist after save_session."""
+        manager = SessionManager(SQLiteSessionStore(str(tmp_path / "s.sqlite3"), ttl_seconds=60))
+        session_id = manager.create_session(filename="a.pdf")
+        session = manager.get_session(session_id)
+        assert session["filename"] == "a.pdf"
+        session["questions"].append({"question": "q", "answer": "a"})
+        manager.save_session(session_id, session)
+        assert manager.get_session_status(session_id)["question_count"] == 1
+
+    def test_cleanup_loop(self):
+        """Test the background task evicts expired sessions."""
+        manager = SessionManager(MemorySessionStore(ttl_seconds=60))
+        session_id = manager.create_session()
+        manager.sessions[session_id]["last_accessed"] = datetime.now() - timedelta(minutes=5)
+
+        async def main():
+            task = asyncio.create_task(manager.run_cleanup_loop(0.01))
+            await asyncio.sleep(0.05)
+            task.cancel()
+
+        asyncio.run(main())
+        assert manager.get_session_count() == 0
+
+    def test_unknown_backend(self):
+        """Test an unknown backend name is rejected."""
+        with pytest.raises(ValueError):
+            create_session_store("memcached")
@@ -0,0 +1,126 @@
+"""
+Unit tests for the incremental URL scanner.
+"""
+
+import random
+import re
+import pytest
+import sys
+from pathlib import Path
+
+# Add api directory to path
+api_path = Path(__file__).parent.parent / "api"
+sys.path.insert(0, str(api_path))
+
+from url_scanner import StreamingURLScanner, VerdictCache, format_compliance_notice, scan_text
+from whitelist_index import WhitelistIndex
+
+
+INDEX = WhitelistIndex([
+    {"url": "https://www.osha.gov", "include_children": True},
+    {"url": "https://www.epa.gov/npdes", "include_children": True},
+])
+
+ANSWER = (
+    "See https://www.osha.gov/laws-regs/1926.651, and the EPA page "
+    "(https://www.epa.gov/npdes/stormwater). Avoid https://example.com/blog. "
+    "Also http://bad.example.org/x?y=1; and https://www.osha.gov/trenching."
+)
+
+
+def reference_bad_urls(text):
+    """The previous findall-based check, for comparison."""
+    bad = set()
+    for url in set(re.findall(r'https?://[^\s<>"\']+', text)):
+        url = url.rstrip('.,);]')
+        if not INDEX.matches(url):
+            bad.add(url)
+    return bad
+
+
+def scan_in_chunks(text, sizes):
+    scanner = StreamingURLScanner(index=INDEX, verdicts=VerdictCache())
+    found = []
+    pos = 0
+    for size in sizes:
+        found += scanner.feed(text[pos:pos + size])
+        pos += size
+    found += scanner.feed(text[pos:])
+    found += scanner.finish()
+    return scanner, found
+
+
+class TestStreamingURLScanner:
+    """Tests for StreamingURLScanner."""
+
+    def test_whole_text(self):
+        """Test a single feed finds the same URLs as findall."""
+        scanner, found = scan_in_chunks(ANSWER, [])
+        assert scanner.bad_urls == reference_bad_urls(ANSWER)
+        assert scanner.bad_urls == {"https://example.com/blog", "http://bad.example.org/x?y=1"}
+        assert len(found) == 5
+
+    def test_every_split_point(self):
+        """Test URLs split at any position are reassembled."""
+        for split in range(len(ANSWER) + 1):
+            scanner, found = scan_in_chunks(ANSWER, [split])
+            assert scanner.bad_urls == reference_bad_urls(ANSWER), split
+            assert len(found) == 5, split
+
+    def test_tiny_random_chunks(self):
+        """Test token-sized chunks give the same result."""
+        rng = random.Random(7)
+        for _ in range(50):
+            sizes = [rng.randint(1, 6) for _ in range(len(ANSWER))]
+            scanner, _ = scan_in_chunks(ANSWER, sizes)
+            assert scanner.bad_urls == reference_bad_urls(ANSWER)
+
+    def test_url_completed_by_finish(self):
+        """Test a URL at the very end is only reported on finish."""
+        scanner = StreamingURLScanner(index=INDEX, verdicts=VerdictCache())
+        assert scanner.feed("read https://example.com/a") == []
+        assert scanner.finish() == ["https://example.com/a"]
+
+    def test_notice(self):
+        """Test the notice lists bad URLs sorted, once each."""
+        scanner, _ = scan_in_chunks("https://b.example.com https://a.example.com. https://a.example.com", [])
+        assert scanner.notice() == format_compliance_notice(["https://a.example.com", "https://b.example.com"])
+        assert scanner.notice().startswith("\n\n[COMPLIANCE NOTICE]\n")
+        assert "- https://a.example.com\n- https://b.example.com\n" in scanner.notice()
+
+    def test_no_urls(self):
+        """Test text without URLs yields no notice."""
+        assert scan_text("No links here.").notice() == ""
+        assert scan_text(None).notice() == ""
+
+
+class TestVerdictCache:
+    """Tests for VerdictCache."""
+
+    def test_cached(self):
+        """Test verdicts are reused for the same index."""
+        calls = []
+
+        class CountingIndex(WhitelistIndex):
+            def matches(self, url):
+                calls.append(url)
+                return super().matches(url)
+
+        index = CountingIndex([{"url": "https://a.gov", "include_children": True}])
+        cache = VerdictCache()
+        assert cache.check(index, "https://a.gov/x") is True
+        assert cache.check(index, "https://a.gov/x") is True
+        assert calls == ["https://a.gov/x"]
+
+    def test_reset_on_new_index(self):
+        """Test a rebuilt whitelist invalidates verdicts."""
+        cache = VerdictCache()
+        assert cache.check(WhitelistIndex([]), "https://a.gov") is False
+        assert cache.check(WhitelistIndex([{"url": "https://a.gov"}]), "https://a.gov") is True
+
+    def test_bounded(self):
+        """Test the cache evicts beyond its size."""
+        cache = VerdictCache(max_entries=2)
+        for i in range(5):
+            cache.check(INDEX, f"https://x{i}.com")
+        assert len(cache._verdicts) == 2
@@ -11,7 +11,7 @@ from pathlib import Path
 api_path = Path(__file__).parent.parent / "api"
 sys.path.insert(0, str(api_path))
 
-from utils import SessionManager, sanitize_html, validate_file_extension, format_file_size
+from utils import SessionManager, iter_sanitized_html, sanitize_html, validate_file_extension, format_file_size
 
 
 class TestSessionManager:
@@ -114,6 +114,26 @@ class TestSanitizeHTML:
         """Test None sanitization."""
         result = sanitize_html(None)
         assert result == ""
+    
+    def test_sanitize_matches_sequential_replace(self):
+        """Test output is identical to escaping with five sequential replaces."""
+        def reference(text):
+            text = text.replace('&', '&amp;')
+            text = text.replace('<', '&lt;')
+            text = text.replace('>', '&gt;')
+            text = text.replace('"', '&quot;')
+            return text.replace("'", '&#39;')
+        
+        for text in ["plain text", "&amp; already", "<a href=\"x\">'y'</a> & z", "–•✓ <é>"]:
+            assert sanitize_html(text) == reference(text)
+    
+    def test_iter_sanitized_html(self):
+        """Test the chunked variant joins to the same output."""
+        text = "<b>Tom & Jerry's \"pipe\"</b> " * 500
+        pieces = list(iter_sanitized_html(text, chunk_chars=100))
+        assert len(pieces) > 1
+        assert "".join(pieces) == sanitize_html(text)
+        assert list(iter_sanitized_html("")) == []
 
 
 class TestValidateFileExtension:
@@ -0,0 +1,411 @@
+"""
+Unit tests for URL whitelist configuration and compiled index.
+"""
+
+import pytest
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add api directory to path
+api_path = Path(__file__).parent.parent / "api"
+sys.path.insert(0, str(api_path))
+
+import url_whitelist_config
+from url_whitelist_config import CustomURLStore, OrgWhitelists, WhitelistSnapshot
+from whitelist_index import SortedWhitelist, WhitelistIndex, decode_cursor, encode_cursor, split_url
+
+
+@pytest.fixture
+def custom_file(tmp_path, monkeypatch):
+    """Point the custom whitelist at a temporary file."""
+    path = tmp_path / "custom_whitelist.json"
+    monkeypatch.setattr(url_whitelist_config, "CUSTOM_URLS_FILE", str(path))
+    monkeypatch.setattr(url_whitelist_config, "_custom_store", CustomURLStore(str(path)))
+    return path
+
+
+@pytest.fixture
+def org_dir(tmp_path, monkeypatch, custom_file):
+    """Keep per-organization whitelists in a temporary directory."""
+    directory = tmp_path / "orgs"
+    org_ids = {"springfield", "shelbyville", "a", "b", "c"}
+    monkeypatch.setattr(
+        url_whitelist_config, "_org_whitelists", OrgWhitelists(str(directory), max_tenants=2, org_ids=org_ids)
+    )
+    return directory
+
+
+class TestSplitURL:
+    """Tests for the fast URL splitter."""
+
+    def test_host_and_path(self):
+        """Test splitting host and path."""
+        assert split_url("https://www.osha.gov/construction/x") == ("www.osha.gov", "/construction/x")
+
+    def test_query_and_fragment_dropped(self):
+        """Test query and fragment are excluded from the path."""
+        assert split_url("https://a.gov/p?x=1#frag") == ("a.gov", "/p")
+        assert split_url("https://a.gov?x=1") == ("a.gov", "")
+
+    def test_host_lowercased(self):
+        """Test host is lowercased."""
+        assert split_url("https://WWW.OSHA.gov/Path") == ("www.osha.gov", "/Path")
+
+    def test_no_scheme(self):
+        """Test URLs without scheme yield empty parts."""
+        assert split_url("www.osha.gov/construction") == ("", "")
+
+
+class TestWhitelistIndex:
+    """Tests for WhitelistIndex matching."""
+
+    def test_exact_match(self):
+        """Test exact entry matches."""
+        index = WhitelistIndex([{"url": "https://a.gov/docs", "include_children": False}])
+        assert index.matches("https://a.gov/docs") is True
+        assert index.matches("https://a.gov/docs/") is True
+        assert index.matches("https://a.gov/docs/child") is False
+
+    def test_child_match(self):
+        """Test child pages match when include_children is set."""
+        index = WhitelistIndex([{"url": "https://a.gov/docs", "include_children": True}])
+        assert index.matches("https://a.gov/docs/child/page.html") is True
+        assert index.matches("https://a.gov/other") is False
+
+    def test_segment_boundary(self):
+        """Test partial segments do not match as children."""
+        index = WhitelistIndex([{"url": "https://a.gov/docs", "include_children": True}])
+        assert index.matches("https://a.gov/docsevil") is False
+        assert index.matches("https://a.govevil.com/docs") is False
+
+    def test_host_root(self):
+        """Test a bare host entry covers the whole site."""
+        index = WhitelistIndex([{"url": "https://www.ansi.org", "include_children": True}])
+        assert index.matches("https://www.ansi.org") is True
+        assert index.matches("https://www.ansi.org/standards/a") is True
+
+    def test_empty_url(self):
+        """Test empty URL is rejected."""
+        index = WhitelistIndex([{"url": "https://a.gov", "include_children": True}])
+        assert index.matches("") is False
+
+    def test_len(self):
+        """Test entry count."""
+        index = WhitelistIndex(url_whitelist_config.BASE_WHITELISTED_URLS)
+        assert len(index) == len(url_whitelist_config.BASE_WHITELISTED_URLS)
+
+
+class TestIsURLWhitelisted:
+    """Tests for is_url_whitelisted."""
+
+    def test_base_url(self, custom_file):
+        """Test base whitelist entries and children."""
+        assert url_whitelist_config.is_url_whitelisted(
+            "https://www.osha.gov/laws-regs/regulations/standardnumber/1926/1926.651"
+        ) is True
+        assert url_whitelist_config.is_url_whitelisted("https://example.com/") is False
+        assert url_whitelist_config.is_url_whitelisted("") is False
+
+    def test_custom_url_picked_up(self, custom_file):
+        """Test index is rebuilt after a custom URL is added."""
+        assert url_whitelist_config.is_url_whitelisted("https://city.example.gov/specs/a") is False
+        result = url_whitelist_config.add_custom_url("https://city.example.gov/specs")
+        assert result["success"] is True
+        assert url_whitelist_config.is_url_whitelisted("https://city.example.gov/specs/a") is True
+
+        url_whitelist_config.remove_custom_url("https://city.example.gov/specs")
+        assert url_whitelist_config.is_url_whitelisted("https://city.example.gov/specs/a") is False
+
+    def test_index_reused(self, custom_file):
+        """Test index is not rebuilt when nothing changed."""
+        first = url_whitelist_config.get_whitelist_index()
+        assert url_whitelist_config.get_whitelist_index() is first
+
+
+class TestWhitelistSnapshot:
+    """Tests for the shared whitelist snapshot."""
+
+    def test_precomputed_fields(self):
+        """Test parsed tuples, sorted domains and counts."""
+        snapshot = WhitelistSnapshot([
+            {"url": "https://B.gov/x", "include_children": True},
+            {"url": "https://a.gov/y/z"},
+            {"url": "https://a.gov/"},
+        ], custom_count=1)
+        assert snapshot.parsed == (("b.gov", "/x"), ("a.gov", "/y/z"), ("a.gov", "/"))
+        assert snapshot.domains == ("a.gov", "b.gov")
+        assert (snapshot.count, snapshot.base_count, snapshot.custom_count) == (3, 2, 1)
+        assert snapshot.index.matches("https://b.gov/x/child")
+
+    def test_immutable(self):
+        """Test neither the snapshot nor its entries can be changed."""
+        snapshot = WhitelistSnapshot([{"url": "https://a.gov"}])
+        with pytest.raises(AttributeError):
+            snapshot.count = 5
+        with pytest.raises(TypeError):
+            snapshot.entries[0]["url"] = "https://evil.example"
+
+    def test_version_is_content_hash(self):
+        """Test equal entries give equal versions and ETags."""
+        entries = [{"url": "https://a.gov", "include_children": True}]
+        assert WhitelistSnapshot(entries).version == WhitelistSnapshot(list(entries)).version
+        assert WhitelistSnapshot(entries).etag != WhitelistSnapshot([{"url": "https://b.gov"}]).etag
+
+    def test_shared_until_whitelist_changes(self, custom_file):
+        """Test one snapshot is shared until a custom URL is added."""
+        first = url_whitelist_config.get_whitelist_snapshot()
+        assert url_whitelist_config.get_whitelist_snapshot() is first
+        assert url_whitelist_config.get_whitelist_index() is first.index
+
+        url_whitelist_config.add_custom_url("https://city.example.gov/specs")
+        second = url_whitelist_config.get_whitelist_snapshot()
+        assert second is not first
+        assert second.count == first.count + 1
+        assert "city.example.gov" in second.domains
+        assert second.version != first.version
+
+
+    def test_overlay_matches_flat_snapshot(self):
+        """Test a snapshot built on a base behaves like one over all entries."""
+        base_entries = [{"url": "https://a.gov/x"}, {"url": "https://c.gov", "include_children": True}]
+        custom = [{"url": "https://b.gov/y", "include_children": True}, {"url": "https://a.gov/x/z"}]
+        base = WhitelistSnapshot(base_entries)
+        overlay = WhitelistSnapshot(custom, base=base)
+        flat = WhitelistSnapshot(base_entries + custom, custom_count=2)
+        assert overlay.index.base is base.index
+        assert (overlay.count, overlay.custom_count, overlay.domains) == (flat.count, flat.custom_count, flat.domains)
+        assert overlay.parsed == flat.parsed
+        assert overlay.browse(limit=10) == flat.browse(limit=10)
+        for url in ("https://a.gov/x", "https://a.gov/x/z", "https://a.gov/x/q", "https://b.gov/y/1", "https://c.gov/k"):
+            assert overlay.index.matches(url) == flat.index.matches(url)
+
+class TestSortedWhitelist:
+    """Tests for paged, filtered browsing."""
+
+    URLS = [
+        "https://www.osha.gov/trenching",
+        "https://www.epa.gov/npdes",
+        "https://www.osha.gov/construction",
+        "https://www.osha.gov.example.net/fake",
+        "https://www.epa.gov/",
+        "https://dot.ca.gov/programs/design",
+    ]
+
+    @pytest.fixture
+    def snapshot(self):
+        return WhitelistSnapshot([{"url": url} for url in self.URLS])
+
+    def urls(self, page):
+        return [entry["url"] for entry in page["entries"]]
+
+    def walk(self, snapshot, limit, **filters):
+        urls, cursor, pages = [], None, 0
+        while True:
+            page = snapshot.browse(cursor=cursor, limit=limit, **filters)
+            urls.extend(self.urls(page))
+            pages += 1
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return urls, pages
+
+    def test_sorted_by_host_and_path(self, snapshot):
+        """Test entries come back in (host, path) order."""
+        assert self.urls(snapshot.browse(limit=10)) == [
+            "https://dot.ca.gov/programs/design",
+            "https://www.epa.gov/",
+            "https://www.epa.gov/npdes",
+            "https://www.osha.gov/construction",
+            "https://www.osha.gov/trenching",
+            "https://www.osha.gov.example.net/fake",
+        ]
+
+    def test_cursor_walks_every_entry_once(self, snapshot):
+        """Test paging with a cursor covers the list without repeats."""
+        urls, pages = self.walk(snapshot, limit=4)
+        assert sorted(urls) == sorted(self.URLS)
+        assert pages == 2
+
+    def test_last_full_page_has_no_cursor(self, snapshot):
+        """Test no cursor is returned when nothing follows."""
+        assert snapshot.browse(limit=6)["next_cursor"] is None
+
+    def test_domain_is_exact_host(self, snapshot):
+        """Test domain filter excludes look-alike hosts."""
+        urls, _ = self.walk(snapshot, limit=1, domain="WWW.OSHA.GOV")
+        assert urls == ["https://www.osha.gov/construction", "https://www.osha.gov/trenching"]
+
+    def test_host_prefix(self, snapshot):
+        """Test a bare prefix matches host prefixes."""
+        assert self.urls(snapshot.browse(prefix="www.osha")) == [
+            "https://www.osha.gov/construction",
+            "https://www.osha.gov/trenching",
+            "https://www.osha.gov.example.net/fake",
+        ]
+
+    def test_url_prefix(self, snapshot):
+        """Test a prefix with a path matches within that host only."""
+        assert self.urls(snapshot.browse(prefix="https://www.osha.gov/tren")) == ["https://www.osha.gov/trenching"]
+        assert self.urls(snapshot.browse(prefix="www.epa.gov/")) == ["https://www.epa.gov/", "https://www.epa.gov/npdes"]
+
+    def test_substring_query(self, snapshot):
+        """Test substring search is case-insensitive and pages with a cursor."""
+        urls, pages = self.walk(snapshot, limit=1, query="GOV/")
+        assert len(urls) == 5 and pages == 5
+        first = snapshot.browse(limit=1, query="design")
+        assert self.urls(first) == ["https://dot.ca.gov/programs/design"]
+        assert first["next_cursor"] is None
+
+    def test_cursor_survives_changes(self):
+        """Test a cursor resumes after the same key in a changed list."""
+        index = SortedWhitelist([("b.gov", "/1", "https://b.gov/1"), ("d.gov", "", "https://d.gov")])
+        _, cursor = index.page(limit=1)
+        grown = SortedWhitelist([
+            ("a.gov", "", "https://a.gov"),
+            ("b.gov", "/1", "https://b.gov/1"),
+            ("c.gov", "", "https://c.gov"),
+            ("d.gov", "", "https://d.gov"),
+        ])
+        positions, _ = grown.page(cursor=cursor, limit=1)
+        assert positions == [2]
+
+    def test_cursor_roundtrip_and_rejects_garbage(self):
+        """Test cursors decode back and malformed ones raise ValueError."""
+        assert decode_cursor(encode_cursor(("a.gov", "/x", "https://a.gov/x"))) == ("a.gov", "/x", "https://a.gov/x")
+        for bad in ["not-a-cursor", encode_cursor(("a.gov", "/x", "https://a.gov/x"))[:-3], "WzEsMiwzXQ"]:
+            with pytest.raises(ValueError):
+                decode_cursor(bad)
+
+
+class TestCustomURLStore:
+    """Tests for the cached custom URL store."""
+
+    def test_missing_file(self, tmp_path):
+        """Test a missing file loads as an empty list."""
+        store = CustomURLStore(str(tmp_path / "missing.json"))
+        assert store.load() == []
+
+    def test_save_and_load(self, tmp_path):
+        """Test saved URLs are returned without leaving temp files."""
+        store = CustomURLStore(str(tmp_path / "custom.json"))
+        assert store.save([{"url": "https://a.gov", "include_children": True}]) is True
+        assert store.load() == [{"url": "https://a.gov", "include_children": True}]
+        assert [p.name for p in tmp_path.iterdir()] == ["custom.json"]
+
+    def test_cached_between_calls(self, tmp_path, monkeypatch):
+        """Test the file is not re-read when unchanged."""
+        path = tmp_path / "custom.json"
+        store = CustomURLStore(str(path))
+        store.save([{"url": "https://a.gov"}])
+
+        def fail(*args, **kwargs):
+            raise AssertionError("file should not be re-read")
+
+        monkeypatch.setattr(url_whitelist_config.json, "load", fail)
+        assert store.load() == [{"url": "https://a.gov"}]
+
+    def test_external_change_detected(self, tmp_path):
+        """Test a change made by another writer is picked up."""
+        path = tmp_path / "custom.json"
+        store = CustomURLStore(str(path))
+        store.save([])
+        version = store.version
+
+        other = CustomURLStore(str(path))
+        other.save([{"url": "https://b.gov"}, {"url": "https://c.gov"}])
+
+        assert store.load() == [{"url": "https://b.gov"}, {"url": "https://c.gov"}]
+        assert store.version > version
+
+    def test_load_returns_copy(self, tmp_path):
+        """Test callers cannot mutate the cached list."""
+        store = CustomURLStore(str(tmp_path / "custom.json"))
+        store.load().append({"url": "https://x.gov"})
+        assert store.load() == []
+
+    def test_version_bumps_on_add(self, custom_file):
+        """Test add_custom_url bumps the whitelist version."""
+        version = url_whitelist_config.get_whitelist_version()
+        url_whitelist_config.add_custom_url("https://city.example.gov/a")
+        assert url_whitelist_config.get_whitelist_version() > version
+
+
+    def test_concurrent_adds_not_lost(self, custom_file):
+        """Test concurrent add_custom_url calls all land in the saved list."""
+        urls = [f"https://city{i}.example.gov/a" for i in range(20)]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(url_whitelist_config.add_custom_url, urls))
+        assert all(result["success"] for result in results)
+        saved = CustomURLStore(str(custom_file)).load()
+        assert sorted(entry["url"] for entry in saved) == sorted(urls)
+
+class TestOrgWhitelists:
+    """Tests for per-organization whitelist overlays."""
+
+    URL = "https://city.example.gov/specs"
+    CHILD = "https://city.example.gov/specs/a"
+
+    def test_overlay_is_per_organization(self, org_dir):
+        """Test an org's custom URL applies to that org only."""
+        assert url_whitelist_config.add_custom_url(self.URL, org_id="springfield")["success"] is True
+        assert url_whitelist_config.is_url_whitelisted(self.CHILD, org_id="springfield") is True
+        assert url_whitelist_config.is_url_whitelisted(self.CHILD, org_id="shelbyville") is False
+        assert url_whitelist_config.is_url_whitelisted(self.CHILD) is False
+        assert (org_dir / "springfield.json").exists()
+
+    def test_overlay_includes_base(self, org_dir):
+        """Test org snapshots keep the base whitelist."""
+        base = url_whitelist_config.get_whitelist_snapshot()
+        url_whitelist_config.add_custom_url(self.URL, org_id="springfield")
+        org = url_whitelist_config.get_whitelist_snapshot("springfield")
+        assert org.count == base.count + 1
+        assert org.custom_count == 1
+        assert set(base.domains) < set(org.domains)
+        assert org.browse(domain="city.example.gov")["entries"][0]["url"] == self.URL
+
+    def test_overlay_shares_base_index(self, org_dir):
+        """Test org snapshots reuse the compiled base index instead of copying it."""
+        base = url_whitelist_config.get_base_snapshot()
+        url_whitelist_config.add_custom_url(self.URL, org_id="springfield")
+        springfield = url_whitelist_config.get_whitelist_snapshot("springfield")
+        shelbyville = url_whitelist_config.get_whitelist_snapshot("shelbyville")
+        assert springfield.index.base is base.index
+        assert shelbyville.index.base is base.index
+        assert len(springfield.index.overlay) == 1
+        assert springfield.index.matches("https://www.osha.gov/construction/x") is True
+
+    def test_unknown_org_rejected(self, org_dir):
+        """Test only registered organizations get a tenant."""
+        with pytest.raises(url_whitelist_config.UnknownOrganizationError):
+            url_whitelist_config.get_whitelist_snapshot("ogdenville")
+        assert url_whitelist_config.add_custom_url(self.URL, org_id="ogdenville")["success"] is False
+        assert len(url_whitelist_config._org_whitelists) == 0
+        assert not (org_dir / "ogdenville.json").exists()
+
+    def test_remove(self, org_dir):
+        """Test removing a URL from one org."""
+        url_whitelist_config.add_custom_url(self.URL, org_id="springfield")
+        assert url_whitelist_config.remove_custom_url(self.URL, org_id="shelbyville")["success"] is False
+        assert url_whitelist_config.remove_custom_url(self.URL, org_id="springfield")["success"] is True
+        assert url_whitelist_config.get_custom_urls("springfield") == []
+
+    def test_snapshot_cached_per_org(self, org_dir):
+        """Test an unchanged org reuses its snapshot."""
+        first = url_whitelist_config.get_whitelist_snapshot("springfield")
+        assert url_whitelist_config.get_whitelist_snapshot("springfield") is first
+        assert url_whitelist_config.get_whitelist_index("springfield") is first.index
+
+    def test_lru_eviction_reloads_from_disk(self, org_dir):
+        """Test an evicted org is rebuilt with its saved overlay."""
+        url_whitelist_config.add_custom_url(self.URL, org_id="a")
+        for org_id in ("b", "c"):
+            url_whitelist_config.get_whitelist_snapshot(org_id)
+        assert len(url_whitelist_config._org_whitelists) == 2
+        assert url_whitelist_config.is_url_whitelisted(self.CHILD, org_id="a") is True
+
+    @pytest.mark.parametrize("org_id", ["", "../etc", "a/b", "x" * 65])
+    def test_invalid_org_id(self, org_dir, org_id):
+        """Test IDs that could escape the directory are rejected."""
+        with pytest.raises(ValueError):
+            url_whitelist_config.get_whitelist_snapshot(org_id)
+        assert url_whitelist_config.add_custom_url(self.URL, org_id=org_id)["success"] is False